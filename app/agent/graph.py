@@ -1,22 +1,17 @@
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, START, END
 from .state import AgentState
 from .nodes import price_search_node, PLATFORMS
 
 def build_graph():
     graph = StateGraph(AgentState)
 
+    # one node per platform, all run in parallel under the request deadline
     for platform in PLATFORMS.keys():
         graph.add_node(
             platform,
             lambda state, p=platform: price_search_node(state, p)
         )
-
-    graph.set_entry_point("Amazon")
-
-    platforms = list(PLATFORMS.keys())
-    for i in range(len(platforms) - 1):
-        graph.add_edge(platforms[i], platforms[i + 1])
-
-    graph.set_finish_point(platforms[-1])
+        graph.add_edge(START, platform)
+        graph.add_edge(platform, END)
 
     return graph.compile()
@@ -1,27 +1,34 @@
 from .state import AgentState
-from ..services.serper import search_product
-from ..services.parser import extract_price
+from ..services.breaker import get_breakers
+from ..services.budget import Deadline
+from ..services.platforms import PLATFORMS as ADAPTERS
+from ..services.platform_yield import get_platform_yield
 
-PLATFORMS = {
-    "Amazon": "site:amazon.in",
-    "Flipkart": "site:flipkart.com",
-    "Blinkit": "site:blinkit.com",
-    "Zepto": "site:zepto.in",
-    "BigBasket": "site:bigbasket.com"
-}
+# graph node name (display name) -> adapter
+PLATFORMS = {adapter.name: adapter for adapter in ADAPTERS.values()}
 
 def price_search_node(state: AgentState, platform: str):
-    query = f"{state['product_name']} {PLATFORMS[platform]}"
-    data = search_product(query)
+    if platform in state.get("pruned_platforms", ()):
+        return {}
 
-    for result in data.get("organic", []):
-        price = extract_price(result.get("snippet", ""))
-        if price:
-            state["results"].append({
-                "platform": platform,
-                "price": price,
-                "link": result.get("link")
-            })
-            break
+    adapter = PLATFORMS[platform]
+    category = state.get("category")
+    if get_breakers().is_open(adapter.key, category):
+        return {"skipped_platforms": [platform]}
 
-    return state
+    deadline = state.get("deadline") or Deadline()
+    data = adapter.search(state["product_name"], deadline, category)
+    if data is None:
+        return {"missing_platforms": [platform]}
+
+    hit = adapter.first_price(data.get("organic", []))
+    get_platform_yield().record(adapter.key, bool(hit), category, state.get("master_category"))
+    if hit:
+        result, price = hit
+        return {"results": [{
+            "platform": platform,
+            "price": price,
+            "link": result.get("link")
+        }]}
+
+    return {}
@@ -1,4 +1,5 @@
-from typing import Dict, List, TypedDict
+import operator
+from typing import Annotated, Any, Dict, List, TypedDict
 
 class PriceResult(TypedDict):
     platform: str
@@ -6,6 +7,12 @@ class PriceResult(TypedDict):
     link: str
 
 class AgentState(TypedDict):
-    product_name: str
+    master_category: str
     category: str
-    results: List[PriceResult]
+    product_name: str
+    deadline: Any                                              # services.budget.Deadline
+    # platform nodes run in parallel, so list updates are merged
+    results: Annotated[List[PriceResult], operator.add]
+    missing_platforms: Annotated[List[str], operator.add]
+    skipped_platforms: Annotated[List[str], operator.add]      # circuit breaker open
+    pruned_platforms: List[str]                                # input: low yield for this category
@@ -1,3 +1,5 @@
-from .graph import create_anomaly_graph
+from .graph import anomaly_run_id, create_anomaly_graph, run_anomaly_graph, run_status
 
 anomaly_graph = create_anomaly_graph()
+
+__all__ = ["anomaly_graph", "anomaly_run_id", "create_anomaly_graph", "run_anomaly_graph", "run_status"]
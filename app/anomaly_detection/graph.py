@@ -1,3 +1,10 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional
+
 from langgraph.graph import StateGraph, END
 from .state import PriceAnomalyState
 from .nodes import (
@@ -5,14 +12,33 @@ from .nodes import (
     variant_discovery_node,
     price_collection_node,
     normalization_node,
-    anomaly_detection_node
+    anomaly_detection_node,
+    pending_variants,
+    PRICE_BATCH,
 )
 
-def create_anomaly_graph():
+# Checkpoints of anomaly runs: every finished step is saved under the run id, so
+# a run that dies halfway (timeout, Serper outage, restart) resumes from the
+# last step instead of re-paying for every search and LLM call before it.
+# Finished runs are deleted, so the database only holds runs that can resume.
+CHECKPOINT_DB = os.getenv("ANOMALY_CHECKPOINT_DB", ".cache/anomaly_checkpoints.sqlite")
+RECURSION_LIMIT = int(os.getenv("ANOMALY_RECURSION_LIMIT", 200))  # floor; grows with the variant count
+
+
+def recursion_limit(pending: int) -> int:
+    """Steps for the fixed nodes plus one price_collection loop per PRICE_BATCH pending variants"""
+    return max(RECURSION_LIMIT, 10 + math.ceil(pending / max(PRICE_BATCH, 1)) * 2)
+
+
+def prices_pending(state: PriceAnomalyState) -> str:
+    return "more" if pending_variants(state) else "done"
+
+
+def create_anomaly_graph(checkpointer=None):
     """
     Build LangGraph for anomaly detection
-    Flow: ProductDiscovery → VariantDiscovery → PriceCollection → 
-          Normalization → AnomalyDetection
+    Flow: ProductDiscovery → VariantDiscovery → PriceCollection (loops until
+          every variant is priced) → Normalization → AnomalyDetection
     """
     builder = StateGraph(PriceAnomalyState)
     
@@ -27,8 +53,104 @@ def create_anomaly_graph():
     builder.set_entry_point("product_discovery")
     builder.add_edge("product_discovery", "variant_discovery")
     builder.add_edge("variant_discovery", "price_collection")
-    builder.add_edge("price_collection", "normalization")
+    builder.add_conditional_edges("price_collection", prices_pending,
+                                  {"more": "price_collection", "done": "normalization"})
     builder.add_edge("normalization", "anomaly_detection")
     builder.add_edge("anomaly_detection", END)
     
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer)
+
+
+def get_checkpointer():
+    """SQLite checkpointer (in-memory if langgraph-checkpoint-sqlite isn't installed)"""
+    if not hasattr(get_checkpointer, "_saver"):
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+
+            os.makedirs(os.path.dirname(CHECKPOINT_DB) or ".", exist_ok=True)
+            conn = sqlite3.connect(CHECKPOINT_DB, check_same_thread=False)
+            get_checkpointer._saver = SqliteSaver(conn)
+        except ImportError:
+            from langgraph.checkpoint.memory import InMemorySaver
+
+            print("[anomaly] langgraph-checkpoint-sqlite not installed; checkpoints won't survive a restart")
+            get_checkpointer._saver = InMemorySaver()
+    return get_checkpointer._saver
+
+
+def get_checkpointed_graph():
+    if not hasattr(get_checkpointed_graph, "_graph"):
+        get_checkpointed_graph._graph = create_anomaly_graph(get_checkpointer())
+    return get_checkpointed_graph._graph
+
+
+def anomaly_run_id(category: str, products: List[Any]) -> str:
+    """Same input -> same run id, so re-submitting a failed run resumes it"""
+    blob = json.dumps([category, products], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def run_status(run_id: str) -> Optional[Dict[str, Any]]:
+    """Where a checkpointed run stands, or None if there is no such run"""
+    graph = get_checkpointed_graph()
+    snapshot = graph.get_state({"configurable": {"thread_id": run_id}})
+    if not snapshot.values:
+        return None
+    values = snapshot.values
+    return {
+        "run_id": run_id,
+        "complete": not snapshot.next,
+        "next": list(snapshot.next),
+        "variants_priced": len(values.get("prices", {})),
+        "variants_pending": len(pending_variants(values)) if values.get("variants") else None,
+    }
+
+
+def run_anomaly_graph(
+    category: str,
+    products: List[Any],
+    run_id: Optional[str] = None,
+    on_node: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run (or resume) the anomaly graph under `run_id`. If an earlier run with that
+    id stopped partway, it continues from its last checkpoint; a finished run
+    starts over so prices are fresh. Returns the final state plus run_id/resumed.
+    """
+    graph = get_checkpointed_graph()
+    run_id = run_id or anomaly_run_id(category, products)
+    config = {"configurable": {"thread_id": run_id}, "recursion_limit": RECURSION_LIMIT}
+
+    snapshot = graph.get_state(config)
+    resumed = bool(snapshot.values and snapshot.next)
+    if snapshot.values and not resumed:
+        get_checkpointer().delete_thread(run_id)  # finished earlier (and not cleaned up): start clean
+    if resumed:
+        print(f"[anomaly] resuming run {run_id} at {list(snapshot.next)} "
+              f"({len(snapshot.values.get('prices', {}))} variants already priced)")
+        if on_node:
+            for node in ("product_discovery", "variant_discovery"):
+                if node not in snapshot.next:
+                    on_node(node)
+        graph_input = None
+    else:
+        graph_input = {"category": category, "products": products,
+                       "variants": {}, "prices": {}, "unit_prices": {}, "anomalies": []}
+
+    if graph_input is not None or not snapshot.values.get("variants"):
+        # discovery first: how long the price loop runs depends on the variants it finds
+        _stream(graph, graph_input, config, on_node, interrupt_after=["variant_discovery"])
+    pending = len(pending_variants(graph.get_state(config).values))
+    _stream(graph, None, {**config, "recursion_limit": recursion_limit(pending)}, on_node)
+
+    final_state = graph.get_state(config).values
+    get_checkpointer().delete_thread(run_id)  # done; nothing left to resume
+    return {**final_state, "run_id": run_id, "resumed": resumed}
+
+
+def _stream(graph, graph_input, config, on_node, **kwargs) -> None:
+    for node_updates in graph.stream(graph_input, config, stream_mode="updates", **kwargs):
+        if on_node:
+            for node in node_updates:
+                if node != "__interrupt__":
+                    on_node(node)
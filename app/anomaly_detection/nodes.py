@@ -1,5 +1,8 @@
+import os
+
 from .state import PriceAnomalyState
 from ..services.serper import search_product
+from ..services.canonical import canonical_key
 from .parser import (
     parse_product_variants,
     parse_prices_from_results,
@@ -8,13 +11,31 @@ from .parser import (
 
 # ✅ REMOVE async - make it synchronous
 
+# variants priced per price_collection step; each step is checkpointed, so a
+# failure only repeats the searches of the step it happened in
+PRICE_BATCH = int(os.getenv("ANOMALY_PRICE_BATCH", 4))
+
+
+def variant_id(product_name: str, variant: dict) -> str:
+    return f"{product_name}_{variant['size']}{variant['unit']}"
+
+
+def pending_variants(state: PriceAnomalyState) -> list:
+    """(product_name, variant) pairs whose prices haven't been collected yet"""
+    return [
+        (product_name, variant)
+        for product_name, variants in state["variants"].items()
+        for variant in variants
+        if variant_id(product_name, variant) not in state["prices"]
+    ]
+
 def product_discovery_node(state: PriceAnomalyState) -> PriceAnomalyState:
     """
     For each product, search on Serper to validate and get variants
     """
     for product in state["products"]:
         # Use platform or fallback to a generic product name
-        product_name = product.get('platform', product.get('name', 'product'))
+        product_name = canonical_key(product.get('platform', product.get('name', 'product')))
         query = f"best selling {product_name}"
         results = search_product(query)
         state["search_results"] = results
@@ -27,27 +48,29 @@ def variant_discovery_node(state: PriceAnomalyState) -> PriceAnomalyState:
     Discover pack sizes/denominations per product
     """
     for product in state["products"]:
-        product_name = product.get('platform', product.get('name', 'product'))
+        product_name = canonical_key(product.get('platform', product.get('name', 'product')))
         query = f"{product_name} 100ml 200ml 500ml 1L sizes"
         results = search_product(query)
-        variants = parse_product_variants(product_name, results)
-        state["variants"][product_name] = variants
+        variants = parse_product_variants(product_name, results.get("organic", []))
+        # LLM output: keep only well-formed entries
+        state["variants"][product_name] = [
+            v for v in variants if isinstance(v, dict) and v.get("size") and v.get("unit")
+        ]
 
     return state
 
 
 def price_collection_node(state: PriceAnomalyState) -> PriceAnomalyState:
     """
-    Collect prices from 6-7 e-commerce sites
+    Collect prices from 6-7 e-commerce sites, PRICE_BATCH variants per step
+    (the graph loops back here until none are pending)
     """
-    for product_name, variants in state["variants"].items():
-        for variant in variants:
-            variant_id = f"{product_name}_{variant['size']}{variant['unit']}"
-            query = f"{product_name} {variant['size']}{variant['unit']} price buy online"
-            results = search_product(query)
-            prices = parse_prices_from_results(results)
-            state["prices"][variant_id] = prices
-    
+    for product_name, variant in pending_variants(state)[:PRICE_BATCH]:
+        query = f"{product_name} {variant['size']}{variant['unit']} price buy online"
+        results = search_product(query)
+        prices = parse_prices_from_results(results.get("organic", []))
+        state["prices"][variant_id(product_name, variant)] = prices
+
     return state
 
 
@@ -57,13 +80,13 @@ def normalization_node(state: PriceAnomalyState) -> PriceAnomalyState:
     """
     for product_name, variants in state["variants"].items():
         for variant in variants:
-            variant_id = f"{product_name}_{variant['size']}{variant['unit']}"
-            
-            if variant_id in state["prices"]:
-                prices = state["prices"][variant_id]
+            vid = variant_id(product_name, variant)
+
+            if vid in state["prices"]:
+                prices = state["prices"][vid]
                 size = variant["size"]
-                unit_prices = calculate_unit_prices(prices, size)
-                state["unit_prices"][variant_id] = unit_prices
+                unit_prices = calculate_unit_prices(prices, size, variant["unit"])
+                state["unit_prices"][vid] = unit_prices
     
     return state
 
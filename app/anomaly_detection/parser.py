@@ -1,14 +1,9 @@
-from langchain_openai import ChatOpenAI
 import re
 import json
 
-def get_llm():
-    """Lazy initialization of LLM to avoid import-time errors"""
-    if not hasattr(get_llm, '_llm'):
-        get_llm._llm = ChatOpenAI(model_name="gpt-4")
-    return get_llm._llm
-
-# llm = ChatOpenAI(model_name="gpt-4")  # Remove this line
+from ..services.llm import get_llm_gateway
+from ..services.platforms import adapter_for_url
+from ..services.units import Quantity, to_base, unit_prices
 
 # PARSER 1: Extract variants (pack sizes)
 def parse_product_variants(product_name: str, search_results: list[dict]) -> list[dict]:
@@ -28,7 +23,8 @@ def parse_product_variants(product_name: str, search_results: list[dict]) -> lis
     Only return JSON array, nothing else.
     """
     
-    response = get_llm().predict(prompt)
+    # cached, batched and rate-limited; raises LLMConfigError when no backend is configured
+    response = get_llm_gateway().complete_sync(prompt)
     try:
         return json.loads(response)
     except:
@@ -48,24 +44,34 @@ def parse_prices_from_results(search_results: list[dict]) -> dict:
         snippet = result.get("snippet", "")
         link = result.get("link", "")
         
-        # Extract price using regex
-        price_match = re.search(r'\$(\d+(?:\.\d{2})?)', snippet)
-        
-        if price_match:
-            price = float(price_match.group(1))
+        # Known platforms use their registry extractor; others the plain regex
+        adapter = adapter_for_url(link)
+        if adapter:
+            price = adapter.extract(result)
+        else:
+            price_match = re.search(r'\$(\d+(?:\.\d{2})?)', snippet)
+            price = float(price_match.group(1)) if price_match else None
+
+        if price:
             domain = extract_domain(link)
             prices[domain] = price
     
     return prices
 
 # PARSER 3: Normalize unit prices
-def calculate_unit_prices(prices: dict, variant_size: float) -> dict:
+def calculate_unit_prices(prices: dict, variant_size: float, unit: str = "") -> dict:
     """
-    Convert: price per unit = total_price / size
-    Input: {"amazon.com": 99.99}, variant_size=100
-    Output: {"amazon.com": 0.9999}  # per ml
+    Convert: price per kg / l / pc, so 500ml and 1L variants share a scale
+    Input: {"amazon.com": 99.99}, variant_size=500, unit="ml"
+    Output: {"amazon.com": 199.98}  # per l
+    Unknown units fall back to total_price / size.
     """
-    return {site: price / variant_size for site, price in prices.items()}
+    base = to_base(variant_size, unit)
+    if base is None:
+        return {site: price / variant_size for site, price in prices.items()}
+    sites = list(prices)
+    values, _ = unit_prices([prices[s] for s in sites], [Quantity(base[0], base[1])] * len(sites))
+    return dict(zip(sites, values))
 
 # HELPER
 def extract_domain(url: str) -> str:
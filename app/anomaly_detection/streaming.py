@@ -0,0 +1,163 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..services.canonical import canonical_key
+
+# Streaming anomaly detection for large NDJSON price dumps.
+# Only per-group running totals are kept (per site: sum, count, a link), so
+# memory depends on the number of open product/variant groups, not on rows.
+
+THRESHOLD = 0.10  # 10%, same as the batch endpoint
+MAX_LINE_BYTES = 1 << 20
+
+
+async def iter_ndjson_rows(
+    chunks: AsyncIterator[bytes],
+    counters: Optional[Dict[str, int]] = None,
+    max_line_bytes: int = MAX_LINE_BYTES,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Parse an NDJSON byte stream line by line. Bad or oversized lines are counted and skipped."""
+    counters = counters if counters is not None else {}
+    counters.setdefault("bad_rows", 0)
+    buffer = b""
+    skipping = False  # inside an oversized line: drop bytes up to its newline
+
+    def parse(line: bytes) -> Optional[Dict[str, Any]]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            row = json.loads(line)
+        except ValueError:
+            counters["bad_rows"] += 1
+            return None
+        if not isinstance(row, dict):
+            counters["bad_rows"] += 1
+            return None
+        return row
+
+    async for chunk in chunks:
+        if skipping:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk, skipping = chunk[newline + 1:], False
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            row = parse(line)
+            if row is not None:
+                yield row
+        if len(buffer) > max_line_bytes:
+            counters["bad_rows"] += 1
+            buffer, skipping = b"", True
+
+    row = parse(buffer)
+    if row is not None:
+        yield row
+
+
+class _Group:
+    __slots__ = ("total", "count", "sites")
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self.sites: Dict[str, List[Any]] = {}  # site -> [sum, count, link]
+
+
+class StreamingAnomalyDetector:
+    """
+    Feed rows with add(); anomalies come back when their group is flushed.
+
+    A site is flagged when its mean price in a group is more than `threshold`
+    above the group mean. With flush_on_key_change=True (input sorted by
+    product/variant) each group is flushed as soon as the next one starts;
+    otherwise all groups are flushed by finish().
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, flush_on_key_change: bool = False):
+        self.threshold = threshold
+        self.flush_on_key_change = flush_on_key_change
+        self._groups: Dict[str, _Group] = {}
+        self._current: Optional[str] = None
+        self.rows = 0
+        self.skipped = 0
+        self.groups_flushed = 0
+        self.total_flagged = 0
+        self.peak_open_groups = 0
+
+    @staticmethod
+    def group_key(row: Dict[str, Any]) -> str:
+        base = row.get("product") or row.get("title") or row.get("name") or ""
+        variant = row.get("variant") or row.get("size") or ""
+        return canonical_key(f"{base} {variant}") or "unknown"
+
+    def add(self, row: Dict[str, Any]) -> List[Dict[str, Any]]:
+        price = row.get("unit_price", row.get("price"))
+        if not isinstance(price, (int, float)) or isinstance(price, bool) or price <= 0:
+            self.skipped += 1
+            return []
+        self.rows += 1
+
+        key = self.group_key(row)
+        flushed: List[Dict[str, Any]] = []
+        if self.flush_on_key_change and self._current is not None and key != self._current:
+            flushed = self._flush(self._current)
+        self._current = key
+
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group()
+            self.peak_open_groups = max(self.peak_open_groups, len(self._groups))
+
+        site = row.get("site") or row.get("platform") or "unknown"
+        stats = group.sites.get(site)
+        if stats is None:
+            stats = group.sites[site] = [0.0, 0, row.get("link", "")]
+        stats[0] += float(price)
+        stats[1] += 1
+        group.total += float(price)
+        group.count += 1
+        return flushed
+
+    def _flush(self, key: str) -> List[Dict[str, Any]]:
+        group = self._groups.pop(key, None)
+        if group is None or not group.count:
+            return []
+        self.groups_flushed += 1
+        avg_price = group.total / group.count
+
+        anomalies = []
+        for site, (total, count, link) in group.sites.items():
+            site_price = total / count
+            percentage_above = (site_price / avg_price) - 1
+            if percentage_above > self.threshold:
+                anomalies.append({
+                    "product": key,
+                    "site": site,
+                    "unit_price": site_price,
+                    "average_price": avg_price,
+                    "observations": count,
+                    "link": link,
+                    "flag": f"{percentage_above*100:.1f}% above average",
+                })
+        self.total_flagged += len(anomalies)
+        return anomalies
+
+    def finish(self) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for key in list(self._groups):
+            out.extend(self._flush(key))
+        self._current = None
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "rows": self.rows,
+            "skipped_rows": self.skipped,
+            "groups": self.groups_flushed,
+            "peak_open_groups": self.peak_open_groups,
+            "total_flagged": self.total_flagged,
+        }
@@ -1,30 +1,45 @@
 # arbitrage_detection/agent.py
+import asyncio
 from typing import Dict, Any, List
 
 from .state import ArbitrageState
-from .parsers import normalize_offer, pick_best_offer
+from .offers import Offer
+from .parsers import normalize_offers, pick_best_offer
+from .matrix import build_matrix
 
 # Reuse Serper wrapper + parsing utilities from existing modules
 # (preferred: import from shopping_agent.serper_client to avoid duplicating API wrapper)
-from ..services.serper import serper_search
+from ..services.platforms import PLATFORMS, platform_search_async, snippet_price
+from ..services.breaker import get_breakers
+from ..services.platform_yield import get_platform_yield
+from ..services.budget import Deadline
+from ..services.matching import comparable_indices
+from ..services.canonical import canonicalize
+from ..services.units import parse_quantity
+from ..services.page_fetcher import get_page_fetcher
+from .serviceability import get_serviceability_index
 
 # If you already have LLM parsing helpers in anomaly_detection/parsers.py, reuse them.
 # Below are placeholders you should map to your real functions.
 
-# Simple implementations for missing functions
+def _product_text_from_url(url: str) -> str:
+    """Most product URLs carry a slug: amazon.in/Amul-Butter-500g/dp/... -> 'Amul Butter 500g'"""
+    from urllib.parse import urlparse
+    segments = [s for s in urlparse(url).path.split("/") if "-" in s]
+    return max(segments, key=len).replace("-", " ") if segments else ""
+
 async def extract_canonical_product_from_query(query: str, url: str = None) -> Dict[str, Any]:
-    """Extract canonical product info from query and optional URL"""
-    # Simple implementation - split query into brand and name
-    parts = query.split()
-    return {
-        "brand": parts[0] if parts else "",
-        "name": " ".join(parts[1:]) if len(parts) > 1 else query,
-        "size": ""  # Could be extracted from query
-    }
+    """Extract canonical product info {brand, name, size, unit, key} from query or URL slug"""
+    text = query if query and query.strip() else _product_text_from_url(url or "")
+    return canonicalize(text)
 
 async def extract_price_offers_from_snippets(platform: str, serper_results, pincode: str = None):
     """Extract price offers from serper search results"""
-    import re
+    # delivery terms for this platform at the pincode (None = doesn't deliver there)
+    terms = get_serviceability_index().delivery_terms(platform, pincode)
+    if terms is None:
+        return []
+    adapter = PLATFORMS.get(platform)
 
     #print("----", platform, "----")
     for result in (serper_results or [])[:3]:
@@ -40,36 +55,22 @@ async def extract_price_offers_from_snippets(platform: str, serper_results, pinc
             continue
 
         title = result.get("title", "") or ""
-        snippet = result.get("snippet", "") or ""
         link = result.get("link", "") or ""
 
-        text = f"{title} {snippet}".replace(",", "")
-
-        # Only match when currency is present (prevents matching "5 kg", "27% OFF", "8 mins")
-        price_matches = re.findall(
-            r"(?:₹|Rs\.?|INR)\s*(\d+(?:\.\d{1,2})?)",
-            text,
-            flags=re.IGNORECASE
-        )
-
-        if not price_matches:
-            continue
-
-        try:
-            price = float(price_matches[0].replace(",", ""))
-
-        except ValueError:
+        # the platform's extractor (currency-anchored rupee price by default)
+        price = adapter.extract(result) if adapter else snippet_price(result)
+        if price is None:
             continue
 
-        offers.append({
-            "platform": platform,
-            "title": title,
-            "product_url": link,     # rename link -> product_url
-            "item_price": price,     # rename price -> item_price
-            "delivery_fee": 0.0,
-            "in_stock": True,
-            "snippet": snippet,
-        })
+        offers.append(Offer(
+            platform=platform,
+            title=title,
+            product_url=link,     # rename link -> product_url
+            item_price=price,     # rename price -> item_price
+            delivery_fee=terms["delivery_fee"],
+            free_delivery_threshold=terms["free_delivery_threshold"],
+            in_stock=True,
+        ))
 
     return offers
 
@@ -107,14 +108,7 @@ async def extract_price_offers_from_snippets(platform: str, serper_results, pinc
 
 
 
-PLATFORMS = {
-    "amazon": "site:amazon.in",
-    "flipkart": "site:flipkart.com",
-    "jiomart": "site:jiomart.com",
-    "zepto": "site:zepto.in",
-    "blinkit": "site:blinkit.com",
-    "bigbasket": "site:bigbasket.com",
-}
+# PLATFORMS (key -> adapter) comes from services.platforms
 
 # ---------- Nodes ----------
 
@@ -123,29 +117,91 @@ async def node_canonicalize(state: ArbitrageState) -> ArbitrageState:
     state["canonical_product"] = canonical
     return state
 
+def canonical_query(canonical: Dict[str, Any]) -> str:
+    if canonical.get("key"):
+        return canonical["key"]
+    return f'{canonical.get("brand","")} {canonical.get("name","")} {canonical.get("size","")}'.strip()
+
 async def node_platform_search(state: ArbitrageState) -> ArbitrageState:
-    canonical = state["canonical_product"]
-    q = f'{canonical.get("brand","")} {canonical.get("name","")} {canonical.get("size","")}'.strip()
+    q = canonical_query(state["canonical_product"])
+
+    # don't spend a search on platforms that can't deliver to this pincode
+    planned = state.get("platforms")
+    candidates = list(PLATFORMS) if planned is None else [p for p in planned if p in PLATFORMS]
+    serviceable = get_serviceability_index().serviceable_platforms(candidates, state.get("pincode"))
+    state["unserviceable_platforms"] = [p for p in candidates if p not in serviceable]
+    category = state.get("category")
+    if planned is None:
+        # ...nor on platforms whose circuit breaker is open (platform-wide or for this category)
+        state["skipped_platforms"] = get_breakers().open_platforms(serviceable, category)
+        serviceable = [p for p in serviceable if p not in state["skipped_platforms"]]
+        # ...and, when the category is known, skip platforms that rarely have it
+        serviceable, state["pruned_platforms"] = get_platform_yield().plan(serviceable, category)
+    else:
+        # the caller already planned this list (breakers, yield); search it as is
+        state["skipped_platforms"], state["pruned_platforms"] = [], []
+
+    # all platforms in parallel under one deadline; stragglers are dropped
+    deadline = state.get("deadline") or Deadline()
+    search = state.get("search") or platform_search_async
+    responses = await asyncio.gather(*(
+        search(PLATFORMS[platform].query(q), platform, deadline, category)
+        for platform in serviceable
+    ))
 
     platform_results: Dict[str, List[Dict[str, Any]]] = {}
-    for platform, site_filter in PLATFORMS.items():
-        results = await serper_search(f"{q} {site_filter}")
-
+    missing: List[str] = []
+    for platform, data in zip(serviceable, responses):
+        if data is None:
+            missing.append(platform)
+            continue
+        organic = data.get("organic", [])
         # defensive: force list
-        platform_results[platform] = results if isinstance(results, list) else []
+        platform_results[platform] = organic if isinstance(organic, list) else []
+        if category and planned is None:  # a planning caller records its own yield
+            hit = PLATFORMS[platform].first_price(platform_results[platform])
+            get_platform_yield().record(platform, bool(hit), category)
 
     state["platform_results"] = platform_results
+    state["missing_platforms"] = missing
+    state["partial"] = bool(missing)
     return state
 
 
 async def node_extract_offers(state: ArbitrageState) -> ArbitrageState:
-    raw_offers: List[Dict[str, Any]] = []
+    raw_offers: List[Offer] = []
     for platform, results in state["platform_results"].items():
         offers = await extract_price_offers_from_snippets(platform=platform, serper_results=results, pincode=state.get("pincode"))
         raw_offers.extend(offers)
     state["raw_prices"] = raw_offers
     return state
 
+async def node_verify_offers(state: ArbitrageState) -> ArbitrageState:
+    """
+    Optional: replace snippet prices with the price on the product page.
+    Offers whose page can't be fetched within the request deadline keep their
+    snippet price (price_verified stays False).
+    """
+    if not state.get("verify_prices"):
+        return state
+
+    offers = state.get("raw_prices", [])
+    deadline = state.get("deadline") or Deadline()
+    pages = await get_page_fetcher().fetch_many((o.product_url for o in offers), timeout=deadline.remaining())
+    for o in offers:
+        page = pages.get(o.product_url)
+        if not page:
+            continue
+        if page.get("price") is not None:
+            o.item_price = page["price"]
+            o.price_verified = True
+        if page.get("in_stock") is not None:
+            o.in_stock = page["in_stock"]
+
+    # out-of-stock offers are not buyable, so they can't be the best offer
+    state["raw_prices"] = [o for o in offers if o.in_stock]
+    return state
+
 #async def node_normalize_offers(state: ArbitrageState) -> ArbitrageState:
 #    qty = state.get("quantity", 1)
 #    normalized = [normalize_offer(o, quantity=qty) for o in state.get("raw_prices", [])]
@@ -162,19 +218,30 @@ async def node_normalize_offers(state: ArbitrageState) -> ArbitrageState:
     if state.get("raw_prices"):
         print("raw sample:", state["raw_prices"][0])
 
-    normalized = [normalize_offer(o, quantity=qty) for o in state.get("raw_prices", [])]
-    print("normalized sample:", normalized[0] if normalized else None)
+    # offers are compared per kg / l / pc; titles without a size get the queried one
+    query = canonical_query(state.get("canonical_product", {}))
+    batch = normalize_offers(state.get("raw_prices", []), quantity=qty, default_size=parse_quantity(query))
+    priced = batch.priced_indices()
 
-    comparable = [o for o in normalized if o.get("effective_price") is not None]
-    print("comparable count:", len(comparable))
+    # only price offers for the same product/variant against each other
+    matched = [priced[i] for i in comparable_indices(
+        [batch.titles[i] for i in priced],
+        query,
+    )]
+    comparable = batch.take(matched)
+    print("comparable count:", len(comparable), "of", len(priced))
 
+    best = batch.best_index(matched)
     state["normalized_offers"] = comparable
+    state["best_offer"] = batch.offers[best] if best is not None else None
+    if best is not None and state.get("category"):
+        get_platform_yield().record_win(batch.offers[best].platform, state["category"])
     return state
 
 
 async def node_arbitrage(state: ArbitrageState) -> ArbitrageState:
     offers = state.get("normalized_offers", [])
-    best = pick_best_offer(offers)
+    best = state.get("best_offer") or pick_best_offer(offers)
     state["best_offer"] = best
 
     threshold = float(state.get("threshold_inr", 20.0))
@@ -185,31 +252,79 @@ async def node_arbitrage(state: ArbitrageState) -> ArbitrageState:
         state["explanation"] = "No comparable offers with valid prices found."
         return state
 
-    best_price = best["effective_price"]
-    best_platform = best.get("platform")
+    best_price = best.effective_price
+    best_platform = best.platform
+    # per-unit comparison when every offer has a unit price on the same basis;
+    # the delta is then what the best offer's pack size would cost more there
+    per_unit = best.unit_price is not None and all(o.unit_basis == best.unit_basis for o in offers)
 
+    # one opportunity per platform: its cheapest comparable offer
+    cheapest: Dict[str, Offer] = {}
     for o in offers:
-        if o.get("platform") == best_platform:
+        if o.effective_price is None or (per_unit and o.unit_price is None):
             continue
-        delta = o["effective_price"] - best_price
+        rank = o.unit_price if per_unit else o.effective_price
+        current = cheapest.get(o.platform)
+        if current is None or rank < (current.unit_price if per_unit else current.effective_price):
+            cheapest[o.platform] = o
+
+    for o in cheapest.values():
+        if o.platform == best_platform:
+            continue
+        if per_unit:
+            delta = (o.unit_price / best.unit_price - 1.0) * best_price
+        else:
+            delta = o.effective_price - best_price
         if delta >= threshold:
-            opportunities.append({
-                "platform": o.get("platform"),
-                "effective_price": o.get("effective_price"),
+            opportunity = {
+                "platform": o.platform,
+                "effective_price": o.effective_price,
                 "delta_vs_best": round(delta, 2),
                 "best_platform": best_platform,
                 "best_effective_price": round(best_price, 2),
-                "product_url": o.get("product_url"),
-            })
+                "product_url": o.product_url,
+            }
+            if per_unit:
+                opportunity["unit_price"] = round(o.unit_price, 2)
+                opportunity["best_unit_price"] = round(best.unit_price, 2)
+                opportunity["unit_basis"] = best.unit_basis
+            opportunities.append(opportunity)
 
     state["opportunities"] = opportunities
+    per_unit_note = f" (₹{best.unit_price:.2f}/{best.unit_basis})" if per_unit else ""
     state["explanation"] = (
-        f"Cheapest is {best_platform} at ₹{best_price:.2f}. "
+        f"Cheapest is {best_platform} at ₹{best_price:.2f}{per_unit_note}. "
         f"Found {len(opportunities)} platform(s) with delta ≥ ₹{threshold:.2f}."
     )
     return state
 
 
+async def node_matrix(state: ArbitrageState) -> ArbitrageState:
+    """Optional: pairwise platform x platform deltas per quantity tier"""
+    tiers = state.get("matrix_tiers")
+    if not tiers:
+        return state
+    index = get_serviceability_index()
+    state["matrix"] = build_matrix(
+        state.get("normalized_offers", []),
+        tiers,
+        terms_for=lambda platform: index.delivery_terms(platform, state.get("pincode")),
+        reference_size=parse_quantity(canonical_query(state.get("canonical_product", {}))),
+    )
+    return state
+
+
+PIPELINE = [
+    ("canonicalize", node_canonicalize),
+    ("platform_search", node_platform_search),
+    ("extract_offers", node_extract_offers),
+    ("verify_offers", node_verify_offers),
+    ("normalize_offers", node_normalize_offers),
+    ("arbitrage", node_arbitrage),
+    ("matrix", node_matrix),
+]
+
+
 # ---------- Graph runner (simple wrapper) ----------
 # If your other modules expose something like `run_shopping_agent()` or `run_graph()`,
 # keep the same naming style here.
@@ -220,19 +335,37 @@ async def run_arbitrage_agent(
     pincode: str | None = None,
     quantity: int = 1,
     threshold_inr: float = 20.0,
+    verify_prices: bool = False,
+    budget_s: float | None = None,
+    search=None,
+    category: str | None = None,
+    on_node=None,
+    matrix_tiers: List[int] | None = None,
+    platforms: List[str] | None = None,
+    deadline: Deadline | None = None,
 ) -> ArbitrageState:
+    """
+    `platforms`: an already-planned platform list to search as is (no breaker or
+    yield filtering). `deadline`: share a caller's deadline instead of starting
+    a new budget_s one.
+    """
     state: ArbitrageState = {
         "query": query,
         "url": url,
         "pincode": pincode,
         "quantity": quantity,
         "threshold_inr": threshold_inr,
+        "verify_prices": verify_prices,
+        "deadline": deadline or Deadline(budget_s),
+        "search": search,  # optional shared searcher (see scan.py)
+        "category": category,
+        "matrix_tiers": matrix_tiers,
+        "platforms": platforms,
     }
 
     # sequential pipeline (matches “nodes” even if not using compiled LangGraph object)
-    state = await node_canonicalize(state)
-    state = await node_platform_search(state)
-    state = await node_extract_offers(state)
-    state = await node_normalize_offers(state)
-    state = await node_arbitrage(state)
+    for name, node in PIPELINE:
+        state = await node(state)
+        if on_node:
+            on_node(name)  # progress reporting (see services/jobs.py)
     return state
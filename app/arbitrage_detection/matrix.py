@@ -0,0 +1,186 @@
+# arbitrage_detection/matrix.py
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .offers import Offer
+from ..services.units import PRICE_BASIS, Quantity, parse_quantity
+
+# Pairwise arbitrage: for every (buy on X, instead of Y) platform pair and every
+# quantity tier, how much cheaper X is. Costs are effective prices per kg / l /
+# pc for the whole order: packs needed to reach the tier amount, plus delivery
+# unless the order reaches the platform's free-delivery threshold. One product
+# is a (tiers x platforms) cost array, and every pair delta comes from it.
+
+DEFAULT_TIERS = (1, 2, 5)
+MAX_TIERS = 8
+MAX_TIER = 100
+
+_INF = float("inf")
+
+
+@dataclass(slots=True)
+class PlatformQuote:
+    """A platform's cheapest comparable offer, reduced to what pricing needs"""
+    platform: str
+    item_price: float
+    pack_amount: float            # per pack, in basis units (kg / l / pc), 1.0 for "pack"
+    delivery_fee: float
+    free_delivery_threshold: float
+    product_url: str = ""
+
+
+TermsLookup = Callable[[str], Optional[Dict[str, Any]]]
+
+
+def validate_tiers(tiers: Optional[Iterable[int]]) -> Tuple[int, ...]:
+    """Sorted unique quantity tiers; DEFAULT_TIERS if none given. ValueError on bad input."""
+    if not tiers:
+        return DEFAULT_TIERS
+    out = sorted({int(t) for t in tiers})
+    if out[0] < 1 or out[-1] > MAX_TIER:
+        raise ValueError(f"quantity tiers must be between 1 and {MAX_TIER}")
+    if len(out) > MAX_TIERS:
+        raise ValueError(f"at most {MAX_TIERS} quantity tiers")
+    return tuple(out)
+
+
+def quotes_from_offers(
+    offers: Iterable[Offer],
+    terms_for: Optional[TermsLookup] = None,
+    default_size: Optional[Quantity] = None,
+) -> Tuple[List[PlatformQuote], str]:
+    """
+    Cheapest quote per platform and the basis they share ("kg", "l", "pc").
+    Offers are priced per pack ("pack") unless every one has a size on one basis.
+    `terms_for(platform)` gives the platform's delivery terms before any waiver
+    (the fee on a normalized offer is the one charged at its quantity).
+    """
+    offers = [o for o in offers if o.item_price is not None and o.item_price > 0]
+    sizes = [parse_quantity(o.title) or default_size for o in offers]
+    units = {q.unit if q else None for q in sizes}
+    per_pack = len(units) != 1 or None in units
+    basis, scale = ("pack", 1.0) if per_pack else PRICE_BASIS[units.pop()]
+
+    best: Dict[str, Tuple[float, PlatformQuote]] = {}
+    for o, q in zip(offers, sizes):
+        terms = (terms_for(o.platform) if terms_for else None) or {}
+        free_at = terms.get("free_delivery_threshold", o.free_delivery_threshold)
+        quote = PlatformQuote(
+            platform=o.platform,
+            item_price=float(o.item_price),
+            pack_amount=1.0 if per_pack else q.amount / scale,
+            delivery_fee=float(terms.get("delivery_fee", o.delivery_fee) or 0.0),
+            free_delivery_threshold=_INF if free_at is None else float(free_at),
+            product_url=o.product_url,
+        )
+        rank = quote.item_price / quote.pack_amount
+        if o.platform not in best or rank < best[o.platform][0]:
+            best[o.platform] = (rank, quote)
+    return [q for _, q in sorted(best.values(), key=lambda rq: rq[1].platform)], basis
+
+
+class ArbitrageMatrix:
+    """
+    costs[t * P + p]: effective cost per basis unit of buying tiers[t] x
+    ref_amount on platform p. deltas(t)[buy][sell] is what the tier's order
+    saves on `buy` compared with `sell` (negative: `buy` is dearer).
+    """
+    __slots__ = ("platforms", "quotes", "tiers", "basis", "ref_amount", "costs")
+
+    def __init__(self, quotes: Sequence[PlatformQuote], tiers: Sequence[int], basis: str,
+                 ref_amount: Optional[float] = None):
+        self.quotes = list(quotes)
+        self.platforms = [q.platform for q in self.quotes]
+        self.tiers = list(tiers)
+        self.basis = basis
+        # tier 1 = one pack of the reference size (the queried size, else the smallest pack)
+        self.ref_amount = ref_amount or min((q.pack_amount for q in self.quotes), default=1.0)
+        self.costs = self._tier_costs()
+
+    def _tier_costs(self) -> array:
+        P = len(self.quotes)
+        costs = array("d", [_INF]) * (len(self.tiers) * P)
+        for t, tier in enumerate(self.tiers):
+            need = tier * self.ref_amount
+            for p, q in enumerate(self.quotes):
+                packs = max(math.ceil(need / q.pack_amount - 1e-9), 1)
+                order = packs * q.item_price
+                total = order if order >= q.free_delivery_threshold else order + q.delivery_fee
+                costs[t * P + p] = total / (packs * q.pack_amount)
+        return costs
+
+    def deltas(self, t: int) -> List[List[float]]:
+        """P x P rows=buy, cols=instead-of, in ₹ for tier t's order"""
+        P = len(self.platforms)
+        row = self.costs[t * P:(t + 1) * P]
+        amount = self.tiers[t] * self.ref_amount
+        return [[round((row[j] - row[i]) * amount, 2) for j in range(P)] for i in range(P)]
+
+    def opportunities(self, threshold_inr: float = 0.0) -> List[Dict[str, Any]]:
+        """Every (tier, buy, instead-of) pair saving at least threshold_inr, largest first"""
+        P = len(self.platforms)
+        out = []
+        for t, tier in enumerate(self.tiers):
+            row = self.costs[t * P:(t + 1) * P]
+            amount = tier * self.ref_amount
+            for i in range(P):
+                for j in range(P):
+                    saving = (row[j] - row[i]) * amount
+                    if i != j and saving >= threshold_inr and saving > 0:
+                        out.append({
+                            "tier": tier,
+                            "buy_on": self.platforms[i],
+                            "instead_of": self.platforms[j],
+                            "saving": round(saving, 2),
+                            "saving_pct": round((row[j] / row[i] - 1.0) * 100.0, 1),
+                            "buy_unit_cost": round(row[i], 2),
+                            "instead_unit_cost": round(row[j], 2),
+                        })
+        out.sort(key=lambda o: -o["saving"])
+        return out
+
+    def to_dict(self, threshold_inr: float = 0.0) -> Dict[str, Any]:
+        P = len(self.platforms)
+        return {
+            "platforms": self.platforms,
+            "basis": self.basis,
+            "reference_amount": self.ref_amount,
+            "tiers": self.tiers,
+            "unit_costs": {str(tier): [round(c, 2) for c in self.costs[t * P:(t + 1) * P]]
+                           for t, tier in enumerate(self.tiers)},
+            "deltas": {str(tier): self.deltas(t) for t, tier in enumerate(self.tiers)},
+            "opportunities": self.opportunities(threshold_inr),
+        }
+
+
+def build_matrix(
+    offers: Iterable[Offer],
+    tiers: Sequence[int] = DEFAULT_TIERS,
+    terms_for: Optional[TermsLookup] = None,
+    reference_size: Optional[Quantity] = None,
+) -> Optional[ArbitrageMatrix]:
+    """Matrix over the platforms in `offers`; None with fewer than two platforms"""
+    quotes, basis = quotes_from_offers(offers, terms_for, reference_size)
+    if len(quotes) < 2:
+        return None
+    ref = None
+    if reference_size is not None and basis != "pack":
+        per, scale = PRICE_BASIS[reference_size.unit]
+        ref = reference_size.amount / scale if per == basis else None
+    return ArbitrageMatrix(quotes, tiers, basis, ref)
+
+
+def build_matrices(
+    products: Dict[str, Iterable[Offer]],
+    tiers: Sequence[int] = DEFAULT_TIERS,
+    terms_for: Optional[TermsLookup] = None,
+) -> Dict[str, ArbitrageMatrix]:
+    """build_matrix for a batch of products ({product query: offers}), sizes read from the query"""
+    out = {}
+    for product, offers in products.items():
+        matrix = build_matrix(offers, tiers, terms_for, parse_quantity(product))
+        if matrix is not None:
+            out[product] = matrix
+    return out
@@ -0,0 +1,142 @@
+# arbitrage_detection/offers.py
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..services.units import Quantity, common_basis, parse_quantities, unit_prices
+
+_NAN = float("nan")
+_INF = float("inf")
+
+
+@dataclass(slots=True)
+class Offer:
+    """
+    One platform offer as it moves through the arbitrage pipeline.
+    The raw snippet is only needed for price extraction and is not kept.
+    """
+    platform: str
+    title: str = ""
+    product_url: str = ""
+    item_price: Optional[float] = None
+    delivery_fee: float = 0.0             # as scraped / from serviceability terms
+    free_delivery_threshold: Optional[float] = None
+    in_stock: bool = True
+    seller: Optional[str] = None
+    price_verified: bool = False
+    effective_price: Optional[float] = None
+    quantity: int = 1
+    delivery_charged: Optional[float] = None  # fee actually charged at `quantity` (set by normalize)
+    unit_price: Optional[float] = None    # effective price per kg / l / pc
+    unit_basis: Optional[str] = None      # "kg" | "l" | "pc"
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Offer":
+        price = d.get("item_price")
+        return cls(
+            platform=d.get("platform", ""),
+            title=d.get("title", "") or "",
+            product_url=d.get("product_url", "") or "",
+            item_price=float(price) if price is not None else None,
+            delivery_fee=float(d.get("delivery_fee") or 0.0),
+            free_delivery_threshold=d.get("free_delivery_threshold"),
+            in_stock=bool(d.get("in_stock", True)),
+            seller=d.get("seller"),
+            price_verified=bool(d.get("price_verified", False)),
+            effective_price=d.get("effective_price"),
+            quantity=int(d.get("quantity", 1) or 1),
+            delivery_charged=d.get("delivery_charged"),
+            unit_price=d.get("unit_price"),
+            unit_basis=d.get("unit_basis"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API boundary: the dict schema the UI and clients already read."""
+        out = {
+            "platform": self.platform,
+            "title": self.title,
+            "product_url": self.product_url,
+            "item_price": self.item_price,
+            "delivery_fee": self.delivery_fee,
+            "in_stock": self.in_stock,
+            "price_verified": self.price_verified,
+            "effective_price": self.effective_price,
+            "quantity": self.quantity,
+        }
+        if self.seller is not None:
+            out["seller"] = self.seller
+        if self.delivery_charged is not None:
+            out["delivery_charged"] = self.delivery_charged
+        if self.unit_price is not None:
+            out["unit_price"] = round(self.unit_price, 2)
+            out["unit_basis"] = self.unit_basis
+        return out
+
+
+class OfferBatch:
+    """
+    Struct-of-arrays view over many offers for bulk normalization and
+    best-offer selection. Prices live in flat float arrays (NaN = no price).
+    """
+    __slots__ = ("offers", "titles", "item_prices", "delivery_fees", "free_thresholds", "effective_prices",
+                 "unit_prices", "unit_bases")
+
+    def __init__(self, offers: Iterable[Offer]):
+        self.offers: List[Offer] = list(offers)
+        self.titles: List[str] = [o.title for o in self.offers]
+        self.item_prices = array("d", (_NAN if o.item_price is None else o.item_price for o in self.offers))
+        self.delivery_fees = array("d", (o.delivery_fee for o in self.offers))
+        self.free_thresholds = array("d", (
+            _INF if o.free_delivery_threshold is None else o.free_delivery_threshold for o in self.offers
+        ))
+        self.effective_prices = array("d", (_NAN for _ in self.offers))
+        self.unit_prices = array("d", (_NAN for _ in self.offers))
+        self.unit_bases: List[Optional[str]] = [None] * len(self.offers)
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    def normalize(self, quantity: int = 1, default_size: Optional[Quantity] = None) -> "OfferBatch":
+        """
+        Compute effective prices for every offer in one pass:
+        item_price * quantity, plus one delivery fee unless the order
+        reaches the platform's free-delivery threshold. Then the price per
+        kg / l / pc from the pack size in each title (default_size, usually
+        the queried size, for titles that don't state one).
+        """
+        qty = max(int(quantity), 1)
+        eff = self.effective_prices
+        for i, (price, fee, free_at) in enumerate(zip(self.item_prices, self.delivery_fees, self.free_thresholds)):
+            order = price * qty  # NaN propagates for unpriced offers
+            eff[i] = order if order >= free_at else order + fee
+        for i, (o, e) in enumerate(zip(self.offers, eff)):
+            o.effective_price = None if e != e else e
+            o.quantity = qty
+            if e == e:
+                o.delivery_charged = e - self.item_prices[i] * qty  # delivery_fee stays as scraped
+
+        sizes = [q or default_size for q in parse_quantities(self.titles)]
+        self.unit_prices, self.unit_bases = unit_prices(eff, sizes, multiplier=qty)
+        for o, u, basis in zip(self.offers, self.unit_prices, self.unit_bases):
+            o.unit_price = None if u != u else u
+            o.unit_basis = basis
+        return self
+
+    def priced_indices(self) -> List[int]:
+        return [i for i, e in enumerate(self.effective_prices) if e == e]
+
+    def best_index(self, indices: Optional[Iterable[int]] = None) -> Optional[int]:
+        """
+        Cheapest offer per kg / l / pc when every candidate has a unit price on
+        the same basis; otherwise cheapest effective price.
+        """
+        eff = self.effective_prices
+        candidates = [i for i in (range(len(eff)) if indices is None else indices) if eff[i] == eff[i]]
+        if not candidates:
+            return None
+        if common_basis(self.unit_bases[i] for i in candidates):
+            return min(candidates, key=self.unit_prices.__getitem__)
+        return min(candidates, key=eff.__getitem__)
+
+    def take(self, indices: Iterable[int]) -> List[Offer]:
+        return [self.offers[i] for i in indices]
@@ -1,30 +1,42 @@
 # arbitrage_detection/parsers.py
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
-def compute_effective_price(item_price: Optional[float], delivery_fee: Optional[float]) -> Optional[float]:
+from .offers import Offer, OfferBatch
+from ..services.units import Quantity
+
+def compute_effective_price(
+    item_price: Optional[float],
+    delivery_fee: Optional[float],
+    quantity: int = 1,
+    free_delivery_threshold: Optional[float] = None,
+) -> Optional[float]:
+    """Order total: item_price * quantity plus one delivery fee (waived above the threshold)."""
     if item_price is None:
         return None
-    return float(item_price) + float(delivery_fee or 0.0)
+    order = float(item_price) * max(int(quantity), 1)
+    if free_delivery_threshold is not None and order >= float(free_delivery_threshold):
+        return order
+    return order + float(delivery_fee or 0.0)
 
-def normalize_offer(offer: Dict[str, Any], quantity: int = 1) -> Dict[str, Any]:
+def normalize_offer(offer: Offer, quantity: int = 1) -> Offer:
     """
-    Expected offer fields (keep aligned with your other modules):
-    {platform, title, product_url, item_price, delivery_fee, in_stock, seller, ...}
+    Fill effective_price / quantity on the offer in place (no copy).
+    For many offers prefer normalize_offers(), which works on an OfferBatch.
     """
-    item_price = offer.get("item_price")
-    delivery_fee = offer.get("delivery_fee", 0.0)
-
-    eff = compute_effective_price(item_price, delivery_fee)
-    if eff is not None:
-        eff *= max(int(quantity), 1)
+    qty = max(int(quantity), 1)
+    offer.effective_price = compute_effective_price(
+        offer.item_price, offer.delivery_fee, qty, offer.free_delivery_threshold
+    )
+    offer.quantity = qty
+    return offer
 
-    out = dict(offer)
-    out["effective_price"] = eff
-    out["quantity"] = max(int(quantity), 1)
-    return out
+def normalize_offers(offers: List[Offer], quantity: int = 1, default_size: Optional[Quantity] = None) -> OfferBatch:
+    return OfferBatch(offers).normalize(quantity, default_size)
 
-def pick_best_offer(offers: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-    priced = [o for o in offers if o.get("effective_price") is not None]
+def pick_best_offer(offers: List[Offer]) -> Optional[Offer]:
+    priced = [o for o in offers if o.effective_price is not None]
     if not priced:
         return None
-    return min(priced, key=lambda x: x["effective_price"])
+    if len({o.unit_basis for o in priced}) == 1 and priced[0].unit_price is not None:
+        return min(priced, key=lambda x: x.unit_price)
+    return min(priced, key=lambda x: x.effective_price)
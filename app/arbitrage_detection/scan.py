@@ -0,0 +1,193 @@
+# arbitrage_detection/scan.py
+import asyncio
+import contextlib
+import heapq
+import itertools
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .agent import run_arbitrage_agent
+from ..services.budget import Deadline
+from ..services.canonical import canonical_key
+from ..services.platforms import platform_search_async
+
+# Category-wide arbitrage scan: runs the arbitrage pipeline for many products,
+# streams each product's result as it finishes and keeps only the top-K
+# opportunities, so memory does not grow with the size of the category.
+
+DEFAULT_CONCURRENCY = 4
+MAX_CONCURRENCY = 16
+DEFAULT_TOP_K = 20
+
+
+class SharedSearches:
+    """
+    Shared by every product in a scan:
+      - caps concurrent Serper searches across products
+      - identical queries already in flight are awaited, not re-sent
+    Only in-flight searches are tracked, so this stays small.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._inflight: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+        self.deduplicated = 0
+
+    async def search(self, query: str, key: str, deadline: Deadline,
+                     category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # same query under another category feeds another breaker, so it's a separate search
+        inflight_key = (query, category)
+        existing = self._inflight.get(inflight_key)
+        if existing is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(existing)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            async with self._semaphore:
+                result = await platform_search_async(query, key, deadline, category)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception:
+            future.set_result(None)  # waiters see "no result", like a timed-out search
+            raise
+        finally:
+            del self._inflight[inflight_key]
+
+
+class TopK:
+    """Bounded min-heap of opportunities ranked by `key` (delta_vs_best)."""
+
+    def __init__(self, k: int, key: str = "delta_vs_best"):
+        self.k = k
+        self.key = key
+        self._heap: List[Any] = []
+        self._seq = itertools.count()
+
+    def push(self, item: Dict[str, Any]) -> None:
+        entry = (item[self.key], next(self._seq), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Dict[str, Any]]:
+        return [e[2] for e in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+
+
+async def scan_arbitrage(
+    products: Iterable[str],
+    pincode: Optional[str] = None,
+    quantity: int = 1,
+    threshold_inr: float = 20.0,
+    top_k: int = DEFAULT_TOP_K,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    budget_s: Optional[float] = None,
+    category: Optional[str] = None,
+    matrix_tiers: Optional[List[int]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields {"type": "result", ...} per product as it completes, then one
+    {"type": "summary", "top": [...]} with the best opportunities overall.
+    With matrix_tiers each result carries its pairwise matrix and the summary
+    the best platform pairs overall ("top_pairs").
+    `products` is consumed lazily by a fixed number of workers.
+    """
+    concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+    searches = SharedSearches(max_concurrent=concurrency * 3)
+    top = TopK(max(1, int(top_k)))
+    top_pairs = TopK(max(1, int(top_k)), key="saving")
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    product_iter = iter(products)
+    seen_keys = set()
+    counts = {"scanned": 0, "skipped_duplicates": 0, "failed": 0}
+
+    def next_product() -> Optional[str]:
+        # equivalent spellings of the same product are scanned once
+        for name in product_iter:
+            key = canonical_key(name)
+            if key in seen_keys:
+                counts["skipped_duplicates"] += 1
+                continue
+            seen_keys.add(key)
+            return name
+        return None
+
+    async def worker() -> None:
+        while True:
+            name = next_product()
+            if name is None:
+                return
+            try:
+                state = await run_arbitrage_agent(
+                    query=name,
+                    pincode=pincode,
+                    quantity=quantity,
+                    threshold_inr=threshold_inr,
+                    budget_s=budget_s,
+                    search=searches.search,
+                    category=category,
+                    matrix_tiers=matrix_tiers,
+                )
+            except Exception as e:
+                counts["failed"] += 1
+                await queue.put({"type": "error", "product": name, "error": str(e)})
+                continue
+
+            counts["scanned"] += 1
+            opportunities = state.get("opportunities", [])
+            for opp in opportunities:
+                top.push({"product": name, **opp})
+            best = state.get("best_offer")
+            extra: Dict[str, Any] = {}
+            if matrix_tiers:
+                matrix = state.get("matrix")
+                extra["matrix"] = matrix.to_dict(threshold_inr) if matrix else None
+                for pair in (extra["matrix"] or {}).get("opportunities", []):
+                    top_pairs.push({"product": name, **pair})
+            await queue.put({
+                "type": "result",
+                "product": name,
+                "canonical_product": state.get("canonical_product", {}),
+                "best_offer": best.to_dict() if best else None,
+                "opportunities": opportunities,
+                "partial": state.get("partial", False),
+                "missing_platforms": state.get("missing_platforms", []),
+                "skipped_platforms": state.get("skipped_platforms", []),
+                "pruned_platforms": state.get("pruned_platforms", []),
+                **extra,
+            })
+
+    finished = asyncio.Event()
+
+    async def run_workers() -> None:
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            # never block here: after a disconnect nobody drains the queue. If it is
+            # full, the consumer sees `finished` once it has emptied it.
+            finished.set()
+            with contextlib.suppress(asyncio.QueueFull):
+                queue.put_nowait(None)
+
+    runner = asyncio.create_task(run_workers())
+    try:
+        while not (finished.is_set() and queue.empty()):
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        if not runner.done():
+            runner.cancel()  # client went away
+
+    yield {
+        "type": "summary",
+        "top": top.items(),
+        **({"top_pairs": top_pairs.items()} if matrix_tiers else {}),
+        "deduplicated_searches": searches.deduplicated,
+        **counts,
+    }
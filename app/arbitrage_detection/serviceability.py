@@ -0,0 +1,105 @@
+# arbitrage_detection/serviceability.py
+import json
+import os
+import re
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional
+
+SERVICEABILITY_PATH = os.getenv(
+    "SERVICEABILITY_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "serviceability.json"),
+)
+
+_PINCODE_RE = re.compile(r"^[1-9]\d{5}$")
+
+
+def parse_pincode(pincode: Optional[str]) -> Optional[int]:
+    """Indian pincodes are 6 digits, no leading zero. Anything else is ignored."""
+    if pincode is None:
+        return None
+    p = str(pincode).strip().replace(" ", "")
+    return int(p) if _PINCODE_RE.match(p) else None
+
+
+class _PlatformIntervals:
+    """Sorted, non-overlapping pincode intervals with per-interval delivery terms."""
+    __slots__ = ("starts", "ends", "terms", "default_terms")
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.default_terms = {
+            "delivery_fee": float(spec.get("delivery_fee", 0.0)),
+            "free_delivery_threshold": spec.get("free_delivery_threshold"),
+        }
+        rows = []
+        for r in spec.get("ranges", []):
+            overrides = r[2] if len(r) > 2 else {}
+            rows.append((int(r[0]), int(r[1]), {**self.default_terms, **overrides}))
+        rows.sort(key=lambda r: r[0])
+
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.terms: List[Dict[str, Any]] = []
+        for start, end, terms in rows:
+            if self.ends and start <= self.ends[-1]:
+                raise ValueError(f"overlapping pincode ranges at {start}")
+            self.starts.append(start)
+            self.ends.append(end)
+            self.terms.append(terms)
+
+    def lookup(self, pin: int) -> Optional[Dict[str, Any]]:
+        i = bisect_right(self.starts, pin) - 1
+        if i >= 0 and pin <= self.ends[i]:
+            return self.terms[i]
+        return None
+
+
+class ServiceabilityIndex:
+    """
+    Per-platform interval index over serviceable pincodes.
+    Lookups are one bisect per platform (a few microseconds).
+
+    Platforms missing from the dataset are treated as serviceable everywhere
+    with no delivery fee, which matches the old behaviour.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._platforms: Dict[str, _PlatformIntervals] = {
+            name.lower(): _PlatformIntervals(spec)
+            for name, spec in data.items()
+            if not name.startswith("_")
+        }
+
+    @classmethod
+    def load(cls, path: str = SERVICEABILITY_PATH) -> "ServiceabilityIndex":
+        if not os.path.exists(path):
+            print(f"[serviceability] no dataset at {path!r}; all platforms serviceable")
+            return cls({})
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def delivery_terms(self, platform: str, pincode: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        {delivery_fee, free_delivery_threshold} for the platform at this pincode,
+        or None when the platform does not deliver there.
+        Without a (valid) pincode the platform's default terms are returned.
+        """
+        intervals = self._platforms.get(platform.lower())
+        if intervals is None:
+            return {"delivery_fee": 0.0, "free_delivery_threshold": None}
+        pin = parse_pincode(pincode)
+        if pin is None:
+            return intervals.default_terms
+        return intervals.lookup(pin)
+
+    def is_serviceable(self, platform: str, pincode: Optional[str]) -> bool:
+        return self.delivery_terms(platform, pincode) is not None
+
+    def serviceable_platforms(self, platforms: Iterable[str], pincode: Optional[str]) -> List[str]:
+        return [p for p in platforms if self.is_serviceable(p, pincode)]
+
+
+def get_serviceability_index() -> ServiceabilityIndex:
+    """Lazy, process-wide index (loaded once from SERVICEABILITY_PATH)"""
+    if not hasattr(get_serviceability_index, "_index"):
+        get_serviceability_index._index = ServiceabilityIndex.load()
+    return get_serviceability_index._index
@@ -1,6 +1,8 @@
 # arbitrage_detection/state.py
 from typing import Dict, List, Optional, TypedDict, Any
 
+from .offers import Offer
+
 class ArbitrageState(TypedDict, total=False):
     # input
     query: str
@@ -8,16 +10,28 @@ class ArbitrageState(TypedDict, total=False):
     pincode: Optional[str]
     quantity: int
     threshold_inr: float
+    verify_prices: bool
+    deadline: Any                                       # services.budget.Deadline
+    search: Any                                         # optional async (query, platform, deadline, category) -> dict
+    category: Optional[str]                             # enables adaptive platform selection
+    matrix_tiers: Optional[List[int]]                   # quantity tiers for the pairwise matrix
+    platforms: Optional[List[str]]                      # caller-planned platforms (None: plan here)
 
     # canonical product representation (output of your existing LLM parsing style)
     canonical_product: Dict[str, Any]   # {brand, name, size, unit, variant...}
 
     # gathered data
+    unserviceable_platforms: List[str]                  # skipped: no delivery to pincode
+    missing_platforms: List[str]                        # no answer within the deadline
+    skipped_platforms: List[str]                        # circuit breaker open
+    pruned_platforms: List[str]                         # low yield for this category
+    partial: bool
     platform_results: Dict[str, List[Dict[str, Any]]]   # serper results per platform
-    raw_prices: List[Dict[str, Any]]                    # extracted raw offers
-    normalized_offers: List[Dict[str, Any]]             # comparable offers only
+    raw_prices: List[Offer]                             # extracted raw offers
+    normalized_offers: List[Offer]                      # comparable offers only
 
     # arbitrage output
-    best_offer: Optional[Dict[str, Any]]
+    best_offer: Optional[Offer]
     opportunities: List[Dict[str, Any]]
     explanation: str
+    matrix: Any                                         # matrix.ArbitrageMatrix (None: < 2 platforms)
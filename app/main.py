@@ -2,14 +2,31 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, Any, Dict, List
-from fastapi import Request, Form
-from fastapi.responses import HTMLResponse
+from fastapi import Request, Form, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 
+from contextlib import nullcontext
 from dotenv import load_dotenv
+import hmac
 import os
+import threading
 
 from gradio import mount_gradio_app
-from app.ui.gradio_ui import demo, MASTER_CATEGORIES, CATEGORIES_BY_MASTER
+from app.ui.gradio_ui import demo, MASTER_CATEGORIES, CATEGORIES_BY_MASTER, PRODUCTS_BY_CATEGORY
+from app.services.matching import group_titles
+from app.services.typeahead import build_catalog_index
+from app.services.canonical import canonical_key
+from app.services.budget import Deadline
+from app.services.alerts import get_alert_engine
+from app.services.jobs import JobQueueFull, UnknownJobKind, get_job_manager
+from app.services.platform_yield import get_platform_yield
+from app.services.platforms import PLATFORMS
+from app.services.units import common_basis, parse_quantities, unit_prices
+from app.services.admission import AdmissionMiddleware, get_admission
+from app.services.auth import SESSION_COOKIE, SESSION_TTL_S, SessionAuthMiddleware, is_admin, issue_session_token
+from app.services.profiler import PROFILE_HEADER, ProfilerBusy, RequestProfile
+from app.services.responses import FastJSONResponse, dumps_line, paginate, select_fields, shape_offers
 
 load_dotenv()
 print("SERPER loaded:", bool(os.getenv("SERPER_API_KEY")))
@@ -35,11 +52,33 @@ def get_graph():
     return graph
 
 
+# -------------------------
+# Typeahead index (catalog + past searches)
+# -------------------------
+typeahead = build_catalog_index(PRODUCTS_BY_CATEGORY)
+
+
+@app.get("/suggest")
+def suggest(q: str, limit: int = 8, category: Optional[str] = None):
+    """Product name suggestions for the UI / API clients"""
+    return {"query": q, "suggestions": typeahead.suggest(q, limit=max(1, min(limit, 20)), category=category)}
+
+
+# -------------------------
+# Per-request profiles ("X-Profile: 1" plus the admin token; see /debug/profile)
+# -------------------------
+def request_profile(request: Request, label: str) -> Optional[RequestProfile]:
+    if PROFILE_HEADER not in request.headers:  # the normal case: one header lookup
+        return None
+    if not is_admin(request.headers.get("x-admin-token")):
+        return None
+    return RequestProfile(label)
+
+
 # -------------------------
 # API: Price comparison
 # -------------------------
-@app.post("/compare")
-def compare_prices(master_category: str, category: str, product_name: str):
+def compare_state(master_category: str, category: str, product_name: str, budget_s: Optional[float] = None) -> Dict[str, Any]:
     # Validation
     if master_category not in MASTER_CATEGORIES:
         raise HTTPException(status_code=400, detail="Invalid master_category")
@@ -50,22 +89,88 @@ def compare_prices(master_category: str, category: str, product_name: str):
     if not product_name or not product_name.strip():
         raise HTTPException(status_code=400, detail="product_name cannot be empty")
 
-    state = {
+    # platforms that rarely have anything in this category are skipped (with some exploration)
+    _, pruned = get_platform_yield().plan(PLATFORMS, category, master_category)
+
+    return {
         "master_category": master_category,
         "category": category,
-        "product_name": product_name.strip(),
+        # canonical key, so equivalent spellings produce the same searches
+        "product_name": canonical_key(product_name) or product_name.strip(),
+        "deadline": Deadline(budget_s),  # server default when budget_s is None
         "results": [],
+        "missing_platforms": [],
+        "skipped_platforms": [],
+        "pruned_platforms": [PLATFORMS[k].name for k in pruned],
     }
 
-    try:
+
+def run_compare(state: Dict[str, Any], on_node=None) -> Dict[str, Any]:
+    """Runs the compare graph; returns results sorted by price plus platform status lists"""
+    if on_node is None:
         final_state = get_graph().invoke(state)
-        results = final_state.get("results", [])
-        # Sort by numeric price when possible
-        def sort_key(x):
-            p = x.get("price")
-            return p if isinstance(p, (int, float)) else float("inf")
+    else:
+        final_state = state
+        for mode, chunk in get_graph().stream(state, stream_mode=["updates", "values"]):
+            if mode == "updates":
+                for node in chunk:
+                    on_node(node)
+            else:
+                final_state = chunk
+
+    category, master_category = state["category"], state["master_category"]
+    results = final_state.get("results", [])
+    if results:
+        typeahead.record(state["product_name"], category=category)
+        get_alert_engine().observe_many(state["product_name"], ((r["platform"], r.get("price")) for r in results))
+
+    # Sort by numeric price when possible
+    def sort_key(x):
+        p = x.get("price")
+        return p if isinstance(p, (int, float)) else float("inf")
+
+    results = sorted(results, key=sort_key)
+    if results:
+        keys_by_name = {a.name: a.key for a in PLATFORMS.values()}
+        get_platform_yield().record_win(keys_by_name.get(results[0]["platform"], ""), category, master_category)
+    return {
+        "results": results,
+        "missing_platforms": final_state.get("missing_platforms", []),
+        "skipped_platforms": final_state.get("skipped_platforms", []),
+        "pruned_platforms": state["pruned_platforms"],
+    }
 
-        return sorted(results, key=sort_key)
+
+@app.post("/compare")
+def compare_prices(
+    master_category: str,
+    category: str,
+    product_name: str,
+    request: Request,
+    budget_s: Optional[float] = None,
+):
+    state = compare_state(master_category, category, product_name, budget_s)
+    profile = request_profile(request, f"/compare {product_name}")
+
+    try:
+        with profile or nullcontext():
+            outcome = run_compare(state)
+
+        # the body stays a plain list for existing clients; partial results are flagged in headers
+        missing = outcome["missing_platforms"]
+        headers = {"X-Partial": "true" if missing else "false"}
+        if missing:
+            headers["X-Missing-Platforms"] = ",".join(missing)
+        if outcome["skipped_platforms"]:
+            headers["X-Skipped-Platforms"] = ",".join(outcome["skipped_platforms"])  # circuit breaker open
+        if outcome["pruned_platforms"]:
+            headers["X-Pruned-Platforms"] = ",".join(outcome["pruned_platforms"])  # low yield here
+        if profile:
+            headers["X-Profile-Id"] = profile.id
+
+        return FastJSONResponse(outcome["results"], request=request, headers=headers)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         # keep it JSON for the UI
         return {"error": f"Failed to fetch prices: {str(e)}"}
@@ -74,48 +179,122 @@ def compare_prices(master_category: str, category: str, product_name: str):
 # -------------------------
 # API: Anomaly detection
 # -------------------------
-@app.post("/detect-anomalies")
-def detect_price_anomalies(products: List[Dict[str, Any]]):
-    """Detect price anomalies in products"""
-    try:
-        if not products:
-            return {"status": "error", "anomalies": []}
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that keeps reading the request body while it streams.
+    The stock class listens for disconnects on `receive`, which would swallow
+    body chunks; here the body iterator itself notices the disconnect.
+    """
 
-        platform_prices: Dict[str, List[float]] = {}
-        for product in products:
-            platform = product.get("platform", "unknown")
-            price = product.get("price")
-            if isinstance(price, (int, float)):
-                platform_prices.setdefault(platform, []).append(float(price))
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
 
-        all_prices: List[float] = []
-        for prices in platform_prices.values():
-            all_prices.extend(prices)
 
-        if not all_prices:
-            return {"status": "error", "anomalies": [], "error": "No valid prices found"}
+NDJSON_BODY_DOC = {
+    "requestBody": {
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "application/x-ndjson": {"schema": {"type": "string", "description": "one JSON row per line"}},
+        },
+        "required": True,
+    }
+}
+
+
+@app.post("/detect-anomalies", openapi_extra=NDJSON_BODY_DOC)
+async def detect_price_anomalies(request: Request, sorted_input: bool = Query(False, alias="sorted")):
+    """
+    Detect price anomalies in products.
+
+    JSON array body: the whole list is scored at once.
+    NDJSON body (Content-Type: application/x-ndjson): rows are grouped by
+    product/variant as they arrive and anomalies stream back as NDJSON.
+    Pass sorted=true when rows arrive grouped by product to flush each group early.
+
+    The two modes score differently. The batch path groups titles fuzzily, works
+    out a per-unit price from each title and flags individual rows. The stream
+    keeps no titles around, so it groups on the exact canonical product/variant
+    key, takes `unit_price` (else `price`) as given and flags a site whose mean
+    price is above the group mean.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        from app.anomaly_detection.streaming import StreamingAnomalyDetector, iter_ndjson_rows
+
+        detector = StreamingAnomalyDetector(flush_on_key_change=sorted_input)
+        counters: Dict[str, int] = {}
+
+        async def lines():
+            async for row in iter_ndjson_rows(request.stream(), counters):
+                for anomaly in detector.add(row):
+                    yield dumps_line(anomaly)
+            for anomaly in detector.finish():
+                yield dumps_line(anomaly)
+            yield dumps_line({"type": "summary", **detector.summary(), **counters})
+
+        return BodyStreamingResponse(lines(), media_type="application/x-ndjson")
+
+    try:
+        products = await request.json()
+    except ValueError:
+        return {"status": "error", "anomalies": [], "error": "Invalid JSON body"}
+    if not isinstance(products, list):
+        return {"status": "error", "anomalies": [], "error": "Body must be a JSON array of products"}
+    return await run_in_threadpool(detect_anomalies_batch, products)
 
-        avg_price = sum(all_prices) / len(all_prices)
+
+def detect_anomalies_batch(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        if not products:
+            return {"status": "error", "anomalies": []}
+
+        # Score each product/variant group on its own so that different products
+        # (e.g. butter vs cheese) never share an average.
+        titles = [p.get("title") or p.get("name") or "" for p in products]
+        groups = group_titles(titles) if any(titles) else [list(range(len(products)))]
+        # price per kg / l / pc for every row in one call ("2 x 500 g" vs "1 kg")
+        per_unit, bases = unit_prices(
+            [p["price"] if isinstance(p.get("price"), (int, float)) else None for p in products],
+            parse_quantities(titles),
+        )
 
         anomalies = []
+        found_prices = False
         THRESHOLD = 0.10  # 10%
 
-        for product in products:
-            platform = product.get("platform", "unknown")
-            price = product.get("price")
-            link = product.get("link", "")
-
-            if isinstance(price, (int, float)) and avg_price > 0:
-                percentage_above = (float(price) / avg_price) - 1
-                if percentage_above > THRESHOLD:
-                    anomalies.append({
-                        "product": f"Product from {platform}",
-                        "site": platform,
-                        "unit_price": float(price),
-                        "average_price": avg_price,
-                        "link": link,
-                        "flag": f"{percentage_above*100:.1f}% above average",
-                    })
+        for members in groups:
+            priced = [i for i in members if isinstance(products[i].get("price"), (int, float))]
+            if not priced:
+                continue
+            # compare per unit only when every priced row has a size on the same basis
+            basis = common_basis(bases[i] for i in priced)
+            price_of = (lambda i: per_unit[i]) if basis else (lambda i: float(products[i]["price"]))
+            group_prices = [price_of(i) for i in priced]
+            found_prices = True
+            avg_price = sum(group_prices) / len(group_prices)
+
+            for i in members:
+                product = products[i]
+                platform = product.get("platform", "unknown")
+                price = product.get("price")
+                link = product.get("link", "")
+
+                if isinstance(price, (int, float)) and avg_price > 0:
+                    percentage_above = (price_of(i) / avg_price) - 1
+                    if percentage_above > THRESHOLD:
+                        anomaly = {
+                            "product": titles[i] or f"Product from {platform}",
+                            "site": platform,
+                            "unit_price": price_of(i),
+                            "average_price": avg_price,
+                            "link": link,
+                            "flag": f"{percentage_above*100:.1f}% above average",
+                        }
+                        if basis:
+                            anomaly["unit_basis"] = basis
+                        anomalies.append(anomaly)
+
+        if not found_prices:
+            return {"status": "error", "anomalies": [], "error": "No valid prices found"}
 
         return {
             "status": "success",
@@ -135,26 +314,468 @@ class ArbitrageRequest(BaseModel):
     pincode: Optional[str] = None
     quantity: int = 1
     threshold_inr: float = 20.0
+    verify_prices: bool = False  # fetch product pages to confirm price/stock
+    category: Optional[str] = None  # enables adaptive platform selection
+    budget_s: Optional[float] = None  # latency budget; server default if unset
+    # pairwise platform x platform deltas per quantity tier
+    matrix: bool = False
+    quantity_tiers: Optional[List[int]] = None  # packs of the queried size; default 1, 2, 5
+    # response shaping
+    fields: Optional[List[str]] = None        # top-level keys to return (default: all)
+    offer_fields: Optional[List[str]] = None  # keys to keep on each offer (default: all)
+    offers_offset: int = 0
+    offers_limit: Optional[int] = None        # page size for normalized_offers
+
+
+def matrix_tiers(req) -> Optional[List[int]]:
+    """Quantity tiers if the request asks for the matrix (400 on bad tiers)"""
+    from app.arbitrage_detection.matrix import validate_tiers
+
+    if not req.matrix:
+        return None
+    try:
+        return list(validate_tiers(req.quantity_tiers))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def arbitrage_response(final_state: Dict[str, Any], req: ArbitrageRequest) -> Dict[str, Any]:
+    # Offers are typed inside the pipeline; convert to the dict schema only here,
+    # and only for the requested page
+    best_offer = final_state.get("best_offer")
+    page, page_info = paginate(final_state.get("normalized_offers", []), req.offers_offset, req.offers_limit)
+    body = {
+        "canonical_product": final_state.get("canonical_product", {}),
+        "best_offer": select_fields(best_offer.to_dict(), req.offer_fields) if best_offer else None,
+        "opportunities": final_state.get("opportunities", []),
+        "normalized_offers": shape_offers((o.to_dict() for o in page), req.offer_fields),
+        "offers_page": page_info,
+        "explanation": final_state.get("explanation", ""),
+        "unserviceable_platforms": final_state.get("unserviceable_platforms", []),
+        "partial": final_state.get("partial", False),
+        "missing_platforms": final_state.get("missing_platforms", []),
+        "skipped_platforms": final_state.get("skipped_platforms", []),
+        "pruned_platforms": final_state.get("pruned_platforms", []),
+    }
+    if req.matrix:
+        matrix = final_state.get("matrix")
+        body["matrix"] = matrix.to_dict(req.threshold_inr) if matrix else None
+    return select_fields(body, req.fields)
 
 
 @app.post("/platform-arbitrage")
-async def platform_arbitrage(req: ArbitrageRequest) -> Dict[str, Any]:
-    from app.arbitrage_detection.agent import run_arbitrage_agent
+async def platform_arbitrage(req: ArbitrageRequest, request: Request):
+    from app.arbitrage_detection.agent import run_arbitrage_agent, canonical_query
+
+    # note: a profile of this async handler also sees other requests sharing the event loop
+    tiers = matrix_tiers(req)
+    profile = request_profile(request, f"/platform-arbitrage {req.query or req.url}")
+    try:
+        with profile or nullcontext():
+            final_state = await run_arbitrage_agent(
+                query=req.query,
+                url=req.url,
+                pincode=req.pincode,
+                quantity=req.quantity,
+                threshold_inr=req.threshold_inr,
+                verify_prices=req.verify_prices,
+                budget_s=req.budget_s,
+                category=req.category,
+                matrix_tiers=tiers,
+            )
+    except ProfilerBusy as e:
+        # profiled requests here all share the event-loop thread: one at a time
+        raise HTTPException(status_code=409, detail=str(e))
+    if final_state.get("best_offer"):
+        product = canonical_query(final_state.get("canonical_product", {}))
+        typeahead.record(product)
+        get_alert_engine().observe_many(product, ((o.platform, o.item_price) for o in final_state.get("normalized_offers", [])))
+    headers = {"X-Profile-Id": profile.id} if profile else None
+    return FastJSONResponse(arbitrage_response(final_state, req), request=request, headers=headers)
+
+
+class ArbitrageScanRequest(BaseModel):
+    category: Optional[str] = None        # category ("Oil") or master category ("grocery")
+    products: Optional[List[str]] = None  # or an explicit product list
+    pincode: Optional[str] = None
+    quantity: int = 1
+    threshold_inr: float = 20.0
+    top_k: int = 20
+    concurrency: int = 4
+    budget_s: Optional[float] = None      # per product
+    matrix: bool = False                  # per-product pairwise matrix + top pairs overall
+    quantity_tiers: Optional[List[int]] = None
+
+
+def resolve_scan_products(req: ArbitrageScanRequest) -> List[str]:
+    if req.products:
+        return [p for p in req.products if p and p.strip()]
+    if not req.category:
+        return []
+    wanted = req.category.strip().lower()
+    for master, categories in CATEGORIES_BY_MASTER.items():
+        if master.lower() == wanted:
+            return [p for c in categories for p in PRODUCTS_BY_CATEGORY.get(c, [])]
+    for category, products in PRODUCTS_BY_CATEGORY.items():
+        if category.lower() == wanted:
+            return list(products)
+    return []
+
+
+@app.post("/platform-arbitrage/scan")
+async def platform_arbitrage_scan(req: ArbitrageScanRequest):
+    """Streams one NDJSON line per product, then a summary with the top-K opportunities"""
+    from app.arbitrage_detection.scan import scan_arbitrage
+
+    products = resolve_scan_products(req)
+    if not products:
+        raise HTTPException(status_code=400, detail="Unknown category or empty product list")
+    tiers = matrix_tiers(req)
+
+    async def lines():
+        async for item in scan_arbitrage(
+            products,
+            pincode=req.pincode,
+            quantity=req.quantity,
+            threshold_inr=req.threshold_inr,
+            top_k=req.top_k,
+            concurrency=req.concurrency,
+            budget_s=req.budget_s,
+            category=req.category,
+            matrix_tiers=tiers,
+        ):
+            yield dumps_line(item)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# -------------------------
+# API: One-fetch analysis (compare + arbitrage + anomalies)
+# -------------------------
+class AnalyzeRequest(BaseModel):
+    product: str
+    category: Optional[str] = None
+    pincode: Optional[str] = None
+    quantity: int = 1
+    threshold_inr: float = 20.0
+    budget_s: Optional[float] = None
+
 
+@app.post("/analyze")
+async def analyze(req: AnalyzeRequest, request: Request):
+    """
+    Searches each platform once and derives the comparison, arbitrage and
+    anomaly results from that one result set (instead of three rounds of searches).
+    """
+    from app.arbitrage_detection.agent import run_arbitrage_agent
+    from app.arbitrage_detection.serviceability import get_serviceability_index
+    from app.services.platforms import search_all_platforms
+
+    product = canonical_key(req.product) or req.product.strip()
+    if not product:
+        raise HTTPException(status_code=400, detail="product cannot be empty")
+
+    # only platforms that deliver to the pincode are searched at all
+    serviceable = get_serviceability_index().serviceable_platforms(PLATFORMS, req.pincode)
+    unserviceable = [k for k in PLATFORMS if k not in serviceable]
+    yields = get_platform_yield()
+    to_search, pruned = yields.plan(serviceable, req.category)
+    deadline = Deadline(req.budget_s)
+    fetched, skipped = await search_all_platforms(product, deadline, keys=to_search, category=req.category)
+    missing = [k for k, data in fetched.items() if data is None]
+
+    # comparison: first priced result per platform (same rule as /compare);
+    # anomalies: every priced result
+    comparison: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    for key, data in fetched.items():
+        if data is None:
+            continue
+        adapter = PLATFORMS[key]
+        organic = data.get("organic") or []
+        hit = adapter.first_price(organic)
+        if req.category:
+            yields.record(key, bool(hit), req.category)
+        if hit:
+            comparison.append({"platform": adapter.name, "price": hit[1], "link": hit[0].get("link")})
+        for result in organic:
+            price = adapter.extract(result)
+            if price:
+                rows.append({"title": result.get("title", ""), "platform": adapter.name,
+                             "price": price, "link": result.get("link", "")})
+    comparison.sort(key=lambda x: x["price"])
+    if comparison and req.category:
+        yields.record_win(next(k for k, a in PLATFORMS.items() if a.name == comparison[0]["platform"]), req.category)
+
+    # arbitrage pipeline reads the same responses instead of searching again: same
+    # platforms (already planned), same deadline
+    async def prefetched(query: str, key: str, deadline: Deadline, category: Optional[str] = None):
+        return fetched.get(key)
+
+    arb_req = ArbitrageRequest(query=product, pincode=req.pincode, quantity=req.quantity,
+                               threshold_inr=req.threshold_inr, budget_s=req.budget_s)
     final_state = await run_arbitrage_agent(
+        query=product,
+        pincode=req.pincode,
+        quantity=req.quantity,
+        threshold_inr=req.threshold_inr,
+        search=prefetched,
+        category=req.category,
+        platforms=list(fetched),
+        deadline=deadline,
+    )
+    final_state.update(unserviceable_platforms=unserviceable, skipped_platforms=skipped, pruned_platforms=pruned)
+    anomalies = await run_in_threadpool(detect_anomalies_batch, rows)
+
+    if comparison:
+        typeahead.record(product, category=req.category)
+        get_alert_engine().observe_many(product, ((c["platform"], c["price"]) for c in comparison))
+
+    return FastJSONResponse({
+        "product": product,
+        "platforms_searched": len(fetched),
+        "partial": bool(missing),
+        "missing_platforms": missing,
+        "skipped_platforms": skipped,
+        "pruned_platforms": pruned,
+        "unserviceable_platforms": unserviceable,
+        "compare": comparison,
+        "arbitrage": arbitrage_response(final_state, arb_req),
+        "anomalies": anomalies,
+    }, request=request)
+
+
+# -------------------------
+# API: Price-drop alerts
+# -------------------------
+class AlertRuleRequest(BaseModel):
+    product: str
+    platform: Optional[str] = None         # None = any platform
+    target_price: Optional[float] = None   # fire at or below this price...
+    drop_pct: Optional[float] = None       # ...or this % below the baseline
+    baseline_price: Optional[float] = None  # default: last price seen for the product
+    sink: str = "log"                      # "log" or "webhook" (stub)
+
+
+@app.post("/alerts")
+def create_alert(req: AlertRuleRequest):
+    """Rules are checked against every price seen by /compare and /platform-arbitrage"""
+    try:
+        rule = get_alert_engine().add_rule(
+            req.product,
+            platform=req.platform,
+            target_price=req.target_price,
+            drop_pct=req.drop_pct,
+            baseline_price=req.baseline_price,
+            sink=req.sink,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return rule.to_dict()
+
+
+@app.get("/alerts/triggered")
+def triggered_alerts(limit: int = 50):
+    engine = get_alert_engine()
+    events = list(engine.recent)[-max(1, min(limit, 1000)):]
+    return {"events": events[::-1], "stats": engine.stats()}
+
+
+@app.get("/alerts/{rule_id}")
+def get_alert(rule_id: str):
+    rule = get_alert_engine().get_rule(rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Unknown alert")
+    return rule.to_dict()
+
+
+@app.delete("/alerts/{rule_id}")
+def delete_alert(rule_id: str):
+    if not get_alert_engine().remove_rule(rule_id):
+        raise HTTPException(status_code=404, detail="Unknown alert")
+    return {"deleted": rule_id}
+
+
+# -------------------------
+# API: Background jobs (long analyses outlive the UI's HTTP timeout)
+# -------------------------
+ANOMALY_GRAPH_NODES = ["product_discovery", "variant_discovery", "price_collection", "normalization", "anomaly_detection"]
+
+
+def compare_job(params: Dict[str, Any], job) -> Dict[str, Any]:
+    state = compare_state(params.get("master_category"), params.get("category"),
+                          params.get("product_name"), params.get("budget_s"))
+    job.expect(list(PLATFORMS[k].name for k in PLATFORMS))
+    return run_compare(state, on_node=job.node_done)
+
+
+def anomaly_job(params: Dict[str, Any], job) -> Dict[str, Any]:
+    products = params.get("products") or []
+    if any(isinstance(p, dict) and isinstance(p.get("price"), (int, float)) for p in products):
+        # priced rows (e.g. from /compare): score them directly
+        job.expect(["detect"])
+        result = detect_anomalies_batch(products)
+        job.node_done("detect")
+        return result
+
+    # product names only: run the full anomaly graph (searches + LLM variant parsing),
+    # checkpointed so a failed job re-submitted with the same params resumes
+    from app.anomaly_detection import run_anomaly_graph
+
+    job.expect(ANOMALY_GRAPH_NODES)
+    final_state = run_anomaly_graph(params.get("category", ""), products,
+                                    run_id=params.get("run_id"), on_node=job.node_done)
+    anomalies = final_state.get("anomalies", [])
+    return {"status": "success", "anomalies": anomalies, "total_flagged": len(anomalies),
+            "variants": final_state.get("variants", {}),
+            "run_id": final_state["run_id"], "resumed": final_state["resumed"]}
+
+
+def arbitrage_job(params: Dict[str, Any], job) -> Dict[str, Any]:
+    import asyncio
+    from app.arbitrage_detection.agent import PIPELINE, run_arbitrage_agent
+
+    req = ArbitrageRequest(**params)
+    tiers = matrix_tiers(req)
+    job.expect([name for name, _ in PIPELINE])
+    final_state = asyncio.run(run_arbitrage_agent(
         query=req.query,
         url=req.url,
         pincode=req.pincode,
         quantity=req.quantity,
         threshold_inr=req.threshold_inr,
-    )
-    return {
-        "canonical_product": final_state.get("canonical_product", {}),
-        "best_offer": final_state.get("best_offer"),
-        "opportunities": final_state.get("opportunities", []),
-        "normalized_offers": final_state.get("normalized_offers", []),
-        "explanation": final_state.get("explanation", ""),
+        verify_prices=req.verify_prices,
+        budget_s=req.budget_s,
+        category=req.category,
+        on_node=job.node_done,
+        matrix_tiers=tiers,
+    ))
+    return arbitrage_response(final_state, req)
+
+
+jobs = get_job_manager()
+jobs.register("compare", compare_job)
+jobs.register("anomaly", anomaly_job)
+jobs.register("arbitrage", arbitrage_job)
+
+
+class JobRequest(BaseModel):
+    kind: str                        # compare | anomaly | arbitrage
+    params: Dict[str, Any] = {}      # same fields as the matching endpoint
+
+
+@app.post("/jobs", status_code=202)
+def submit_job(req: JobRequest):
+    """Starts (or re-attaches to an identical) job; poll GET /jobs/{id}"""
+    # reject bad input now rather than as a failed job
+    if req.kind == "compare":
+        compare_state(req.params.get("master_category"), req.params.get("category"), req.params.get("product_name"))
+    elif req.kind == "arbitrage":
+        try:
+            arb_req = ArbitrageRequest(**req.params)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        matrix_tiers(arb_req)
+    elif req.kind == "anomaly":
+        products = req.params.get("products")
+        if not isinstance(products, list) or not products or not all(isinstance(p, dict) for p in products):
+            raise HTTPException(status_code=400, detail="products must be a non-empty list of objects")
+    try:
+        job, created = jobs.submit(req.kind, req.params)
+    except UnknownJobKind as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending jobs", headers={"Retry-After": "30"})
+    return {"id": job.id, "status": job.status, "deduplicated": not created, "poll": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, request: Request):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return FastJSONResponse(job.to_dict(), request=request)
+
+
+@app.get("/anomaly-runs/{run_id}")
+def anomaly_run_status(run_id: str):
+    """Checkpoint of an anomaly graph run; re-submit its anomaly job to resume it"""
+    from app.anomaly_detection import run_status
+
+    status = run_status(run_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or finished anomaly run")
+    return status
+
+
+# -------------------------
+# Metrics
+# -------------------------
+@app.get("/metrics")
+def metrics():
+    from app.services.breaker import get_breakers
+    from app.services.budget import latency
+    from app.services.llm import get_llm_gateway
+    from app.services.platforms import deepening
+    from app.services.response_store import get_response_store
+    from app.services.serper import _batcher
+
+    body = {
+        "circuit_breakers": get_breakers().snapshot(),
+        "search_latency": latency.snapshot(),
+        "serper": {"batches_sent": _batcher.batches_sent, "queries_sent": _batcher.queries_sent},
+        "query_deepening": deepening.snapshot(),
+        "alerts": get_alert_engine().stats(),
+        "platform_yield": get_platform_yield().snapshot(),
+        "jobs": jobs.snapshot(),
+        "admission": get_admission().snapshot(),
     }
+    if hasattr(get_llm_gateway, "_gateway"):  # don't create one just to report on it
+        body["llm"] = get_llm_gateway().snapshot()
+    if hasattr(get_response_store, "_store"):
+        body["serper_cache"] = get_response_store().snapshot()
+    return body
+
+
+# -------------------------
+# Debug: profiling (admin token required; 404 while ADMIN_TOKEN is unset)
+# -------------------------
+def require_admin(request: Request) -> None:
+    if not is_admin(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 5.0, interval_ms: float = 5.0, format: str = "collapsed"):
+    """
+    Samples every thread (and the event loop) for `seconds`.
+    format=collapsed: text for flamegraph.pl / speedscope; format=json: top frames.
+    """
+    from app.services.profiler import collapsed, sample_stacks, top_frames
+
+    require_admin(request)
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+    labels = {threading.get_ident(): "event-loop"}
+    try:
+        counts = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000.0, labels)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "json":
+        return {"samples": sum(counts.values()), "stacks": len(counts), "top_frames": top_frames(counts)}
+    return PlainTextResponse(collapsed(counts))
+
+
+@app.get("/debug/profile/requests/{profile_id}")
+def debug_request_profile(profile_id: str, request: Request):
+    """cProfile report of a request sent with X-Profile (id from its X-Profile-Id header)"""
+    from app.services.profiler import get_request_profile
+
+    require_admin(request)
+    report = get_request_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile")
+    return PlainTextResponse(report)
 
 
 # -------------------------
@@ -174,8 +795,6 @@ def manifest():
 
 USERNAME = os.getenv("APP_USER", "admin")
 PASSWORD = os.getenv("APP_PASS", "admin123")
-SESSION_COOKIE = "shopagent_session"
-SESSION_VALUE = "ok"  # simple flag
 
 @app.get("/login", response_class=HTMLResponse)
 def login_page():
@@ -342,26 +961,22 @@ def login_page():
 
 @app.post("/login")
 def login(username: str = Form(...), password: str = Form(...)):
-    if username == USERNAME and password == PASSWORD:
+    # bytes: compare_digest rejects non-ASCII str
+    if hmac.compare_digest(username.encode(), USERNAME.encode()) & hmac.compare_digest(password.encode(), PASSWORD.encode()):
         resp = RedirectResponse(url="/gradio", status_code=303)
-        resp.set_cookie(SESSION_COOKIE, SESSION_VALUE, httponly=True)
+        resp.set_cookie(SESSION_COOKIE, issue_session_token(username), max_age=SESSION_TTL_S,
+                        httponly=True, samesite="lax")
         return resp
     return HTMLResponse("<h3>Invalid credentials</h3><a href='/login'>Try again</a>", status_code=401)
 
-@app.middleware("http")
-async def protect_gradio(request: Request, call_next):
-    path = request.url.path
-
-    # allow login + docs + openapi
-    if path.startswith("/login") or path.startswith("/docs") or path.startswith("/openapi.json"):
-        return await call_next(request)
-
-    # protect gradio UI + its assets/api calls
-    if path.startswith("/gradio"):
-        if request.cookies.get(SESSION_COOKIE) != SESSION_VALUE:
-            return RedirectResponse(url="/login", status_code=303)
+# Pure ASGI: /login, /docs, /openapi.json and the API routes pass straight
+# through; /gradio needs a signed session cookie (static bundles skip the check)
+app.add_middleware(SessionAuthMiddleware, login_path="/login")
 
-    return await call_next(request)
+# Outermost: /compare, /platform-arbitrage(/scan) and /analyze get bounded
+# in-flight slots and queues (503 + Retry-After when saturated); other routes
+# skip it, so they stay responsive under load
+app.add_middleware(AdmissionMiddleware)
 
 # -------------------------
 # Mount Gradio UI at /gradio
@@ -0,0 +1,198 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+# Admission control for the expensive endpoints. Each one gets a gate: at most
+# `max_inflight` requests run, up to `max_queue` more wait in line, and a request
+# whose estimated wait (queue position x recent service time / slots) is over
+# MAX_WAIT_S is turned away at once with 503 + Retry-After instead of joining a
+# queue it would time out in. Gating happens in the ASGI layer, before the
+# handler gets a threadpool thread, so cheap endpoints (/manifest.json, /login,
+# /metrics) are never stuck behind a saturated /compare.
+
+MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", 10))
+COMPARE_INFLIGHT = int(os.getenv("ADMISSION_COMPARE_INFLIGHT", 8))
+ARBITRAGE_INFLIGHT = int(os.getenv("ADMISSION_ARBITRAGE_INFLIGHT", 8))
+SCAN_INFLIGHT = int(os.getenv("ADMISSION_SCAN_INFLIGHT", 2))
+QUEUE_PER_SLOT = int(os.getenv("ADMISSION_QUEUE_PER_SLOT", 4))
+INITIAL_SERVICE_S = 2.0   # service time guess until real requests have been timed
+SERVICE_ALPHA = 0.2
+
+# (method, path) -> (gate name, in-flight limit)
+GATED_ROUTES: Dict[Tuple[str, str], Tuple[str, int]] = {
+    ("POST", "/compare"): ("compare", COMPARE_INFLIGHT),
+    ("POST", "/platform-arbitrage"): ("platform-arbitrage", ARBITRAGE_INFLIGHT),
+    ("POST", "/analyze"): ("analyze", ARBITRAGE_INFLIGHT),
+    ("POST", "/platform-arbitrage/scan"): ("platform-arbitrage-scan", SCAN_INFLIGHT),
+}
+
+
+class Shed(Exception):
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class EndpointGate:
+    """Bounded in-flight slots plus a bounded FIFO of waiters, handed slots in order"""
+
+    def __init__(self, name: str, max_inflight: int, max_queue: int, max_wait_s: float = MAX_WAIT_S):
+        self.name = name
+        self.max_inflight = max(max_inflight, 1)
+        self.max_queue = max(max_queue, 0)
+        self.max_wait_s = max_wait_s
+        self.inflight = 0
+        self.service_s = INITIAL_SERVICE_S
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_wait": 0, "timed_out": 0}
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        """Seconds until a request at `position` in the queue (default: the back) gets a slot"""
+        if position is None:
+            if self.inflight < self.max_inflight and not self._waiters:
+                return 0.0
+            position = len(self._waiters)
+        return (position // self.max_inflight + 1) * self.service_s
+
+    async def acquire(self) -> None:
+        """Waits for a slot; raises Shed if the queue is full or the wait would be too long"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.inflight < self.max_inflight and not self._waiters:
+                self.inflight += 1
+                self.stats["admitted"] += 1
+                return
+            wait = self.estimated_wait()
+            if len(self._waiters) >= self.max_queue:
+                self.stats["shed_queue_full"] += 1
+                raise Shed("queue full", wait)
+            if wait > self.max_wait_s:
+                self.stats["shed_wait"] += 1
+                raise Shed("estimated wait too long", wait)
+            fut = loop.create_future()
+            self._waiters.append(fut)
+            self.stats["queued"] += 1
+
+        try:
+            await asyncio.wait_for(fut, timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.stats["timed_out"] += 1
+                wait = self.estimated_wait()
+            raise Shed("timed out in queue", wait)
+        except asyncio.CancelledError:
+            # client went away; a slot handed over at the last moment is passed on
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        finally:
+            with self._lock:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        with self._lock:
+            self.stats["admitted"] += 1
+
+    def release(self, service_s: Optional[float] = None) -> None:
+        """Frees a slot (handing it straight to the next waiter, if any)"""
+        with self._lock:
+            if service_s is not None:
+                self.service_s += SERVICE_ALPHA * (service_s - self.service_s)
+            while self._waiters:
+                fut = self._waiters.popleft()
+                if not fut.done():
+                    fut.get_loop().call_soon_threadsafe(self._hand_over, fut)
+                    return
+            self.inflight -= 1
+
+    def _hand_over(self, fut: asyncio.Future) -> None:
+        if fut.done():  # timed out or cancelled meanwhile: try the next one
+            self.release()
+        else:
+            fut.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "shed": self.stats["shed_queue_full"] + self.stats["shed_wait"] + self.stats["timed_out"],
+                "inflight": self.inflight,
+                "queue_depth": len(self._waiters),
+                "max_inflight": self.max_inflight,
+                "max_queue": self.max_queue,
+                "service_s": round(self.service_s, 3),
+                "estimated_wait_s": round(self.estimated_wait(), 3),
+            }
+
+
+class AdmissionController:
+    def __init__(self, routes: Dict[Tuple[str, str], Tuple[str, int]] = GATED_ROUTES,
+                 queue_per_slot: int = QUEUE_PER_SLOT, max_wait_s: float = MAX_WAIT_S):
+        self.gates: Dict[str, EndpointGate] = {}
+        self.routes: Dict[Tuple[str, str], EndpointGate] = {}
+        for route, (name, inflight) in routes.items():
+            gate = self.gates.get(name) or EndpointGate(name, inflight, inflight * queue_per_slot, max_wait_s)
+            self.gates[name] = gate
+            self.routes[route] = gate
+
+    def gate_for(self, method: str, path: str) -> Optional[EndpointGate]:
+        return self.routes.get((method, path.rstrip("/") or "/"))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: gate.snapshot() for name, gate in self.gates.items()}
+
+
+def get_admission() -> AdmissionController:
+    if not hasattr(get_admission, "_controller"):
+        get_admission._controller = AdmissionController()
+    return get_admission._controller
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware: requests to gated routes wait for a slot or get a 503
+    with Retry-After; everything else passes straight through. The slot is held
+    until the response (streamed bodies included) has been sent.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or get_admission()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        gate = self.controller.gate_for(scope["method"], scope["path"])
+        if gate is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await gate.acquire()
+        except Shed as e:
+            print(f"[admission] shedding {scope['path']}: {e.reason} (~{e.retry_after_s:.1f}s)")
+            return await self._reject(send, e)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.monotonic() - started)
+
+    @staticmethod
+    async def _reject(send, shed: Shed) -> None:
+        body = f'{{"detail":"Server busy ({shed.reason}), retry later"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(math.ceil(shed.retry_after_s), 1)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,250 @@
+import itertools
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .canonical import canonical_key
+
+# Price-drop alerts. Every rule is reduced to one absolute threshold and kept in
+# a sorted list per (product, platform) -- "*" for any platform. An observed
+# price fires exactly the tail of that list with threshold >= price, so checking
+# an observation is one bisect (plus the rules it fires), however many rules exist.
+
+ANY_PLATFORM = "*"
+RECENT_EVENTS = 1000
+
+Sink = Callable[[Dict[str, Any]], None]
+
+
+@dataclass(slots=True)
+class AlertRule:
+    rule_id: str
+    product: str                       # canonical key
+    platform: Optional[str]            # lower-case, None = any platform
+    target_price: Optional[float]
+    drop_pct: Optional[float]          # e.g. 10 -> fire at 10% below baseline
+    sink: str = "log"
+    baseline_price: Optional[float] = None
+    threshold: Optional[float] = None  # fires when an observed price <= threshold
+    created_at: float = 0.0
+    triggered_at: Optional[float] = None
+    triggered_price: Optional[float] = None
+    triggered_platform: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LogSink:
+    """Prints fired alerts"""
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        print(f"[alerts] {event['product']!r} on {event['platform']} at {event['price']} "
+              f"(threshold {event['threshold']}, rule {event['rule_id']})")
+
+
+class WebhookStubSink:
+    """Records the payload that would be POSTed to `url`; nothing leaves the process."""
+
+    def __init__(self, url: str = "http://localhost/alerts-webhook", maxlen: int = RECENT_EVENTS):
+        self.url = url
+        self.outbox: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        self.outbox.append({"url": self.url, "json": event})
+
+
+class AlertEngine:
+    def __init__(self, sinks: Optional[Dict[str, Sink]] = None):
+        self.sinks: Dict[str, Sink] = sinks if sinks is not None else {"log": LogSink(), "webhook": WebhookStubSink()}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._rules: Dict[str, AlertRule] = {}
+        self._index: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+        self._pending: Dict[str, List[str]] = {}               # product -> % rules waiting for a baseline
+        self._last_price: Dict[str, Dict[str, float]] = {}     # product -> platform -> last price
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_EVENTS)  # fired events, any sink
+        self.observations = 0
+        self.fired = 0
+
+    def register_sink(self, name: str, sink: Sink) -> None:
+        self.sinks[name] = sink
+
+    # ---- rules
+
+    def add_rule(
+        self,
+        product: str,
+        platform: Optional[str] = None,
+        target_price: Optional[float] = None,
+        drop_pct: Optional[float] = None,
+        baseline_price: Optional[float] = None,
+        sink: str = "log",
+    ) -> AlertRule:
+        """
+        Exactly one of target_price / drop_pct. A % drop is measured from
+        baseline_price, else from the last price seen for the product, else from
+        the first price observed after the rule is added.
+        """
+        key = canonical_key(product)
+        if not key:
+            raise ValueError("product cannot be empty")
+        if (target_price is None) == (drop_pct is None):
+            raise ValueError("give exactly one of target_price or drop_pct")
+        if target_price is not None and target_price <= 0:
+            raise ValueError("target_price must be positive")
+        if drop_pct is not None and not 0 < drop_pct < 100:
+            raise ValueError("drop_pct must be between 0 and 100")
+        if sink not in self.sinks:
+            raise ValueError(f"unknown sink {sink!r}")
+        platform = (platform or "").strip().lower() or None
+
+        with self._lock:
+            rule = AlertRule(
+                rule_id=str(next(self._ids)),
+                product=key,
+                platform=platform,
+                target_price=target_price,
+                drop_pct=drop_pct,
+                sink=sink,
+                baseline_price=baseline_price,
+                created_at=time.time(),
+            )
+            self._rules[rule.rule_id] = rule
+            if target_price is not None:
+                self._arm(rule, float(target_price))
+            else:
+                if rule.baseline_price is None:
+                    rule.baseline_price = self._last_seen(key, platform)
+                if rule.baseline_price is None:
+                    self._pending.setdefault(key, []).append(rule.rule_id)
+                else:
+                    self._arm(rule, rule.baseline_price * (1 - drop_pct / 100.0))
+        return rule
+
+    def remove_rule(self, rule_id: str) -> bool:
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            if rule.threshold is None:
+                pending = self._pending.get(rule.product, [])
+                if rule_id in pending:
+                    pending.remove(rule_id)
+            elif rule.triggered_at is None:
+                entries = self._index.get((rule.product, rule.platform or ANY_PLATFORM), [])
+                i = bisect_left(entries, (rule.threshold, rule_id))
+                if i < len(entries) and entries[i][1] == rule_id:
+                    del entries[i]
+            return True
+
+    def get_rule(self, rule_id: str) -> Optional[AlertRule]:
+        return self._rules.get(rule_id)
+
+    def _arm(self, rule: AlertRule, threshold: float) -> None:
+        rule.threshold = round(threshold, 2)
+        insort(self._index.setdefault((rule.product, rule.platform or ANY_PLATFORM), []), (rule.threshold, rule.rule_id))
+
+    def _last_seen(self, product: str, platform: Optional[str]) -> Optional[float]:
+        prices = self._last_price.get(product)
+        if not prices:
+            return None
+        if platform:
+            return prices.get(platform)
+        return min(prices.values())
+
+    # ---- observations
+
+    def observe(self, product: str, platform: str, price: Any) -> List[AlertRule]:
+        """Check one observed price; fired rules are sent to their sinks and disarmed."""
+        if not isinstance(price, (int, float)) or isinstance(price, bool) or price <= 0:
+            return []
+        key = canonical_key(product)
+        if not key:
+            return []
+        platform = (platform or "unknown").strip().lower()
+        price = float(price)
+
+        fired: List[AlertRule] = []
+        with self._lock:
+            self.observations += 1
+            self._last_price.setdefault(key, {})[platform] = price
+            if key in self._pending:
+                self._resolve_pending(key, platform, price)
+
+            for index_key in ((key, platform), (key, ANY_PLATFORM)):
+                entries = self._index.get(index_key)
+                if not entries or entries[-1][0] < price:
+                    continue
+                i = bisect_left(entries, (price,))
+                now = time.time()
+                for _, rule_id in entries[i:]:
+                    rule = self._rules[rule_id]
+                    rule.triggered_at, rule.triggered_price, rule.triggered_platform = now, price, platform
+                    fired.append(rule)
+                del entries[i:]
+            self.fired += len(fired)
+
+        for rule in fired:
+            self._dispatch(rule)
+        return fired
+
+    def observe_many(self, product: str, prices: Iterable[Tuple[str, Any]]) -> List[AlertRule]:
+        fired: List[AlertRule] = []
+        for platform, price in prices:
+            fired.extend(self.observe(product, platform, price))
+        return fired
+
+    def _resolve_pending(self, product: str, platform: str, price: float) -> None:
+        waiting = []
+        for rule_id in self._pending.pop(product):
+            rule = self._rules.get(rule_id)
+            if rule is None:
+                continue
+            if rule.platform and rule.platform != platform:
+                waiting.append(rule_id)
+                continue
+            rule.baseline_price = price
+            self._arm(rule, price * (1 - rule.drop_pct / 100.0))
+        if waiting:
+            self._pending[product] = waiting
+
+    def _dispatch(self, rule: AlertRule) -> None:
+        event = {
+            "rule_id": rule.rule_id,
+            "product": rule.product,
+            "platform": rule.triggered_platform,
+            "price": rule.triggered_price,
+            "threshold": rule.threshold,
+            "target_price": rule.target_price,
+            "drop_pct": rule.drop_pct,
+            "baseline_price": rule.baseline_price,
+            "triggered_at": rule.triggered_at,
+            "sink": rule.sink,
+        }
+        self.recent.append(event)
+        try:
+            self.sinks[rule.sink](event)
+        except Exception as e:
+            print(f"[alerts] sink {rule.sink!r} failed for rule {rule.rule_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rules": len(self._rules),
+                "armed": sum(len(v) for v in self._index.values()),
+                "pending_baseline": sum(len(v) for v in self._pending.values()),
+                "indexed_products": len({p for p, _ in self._index}),
+                "observations": self.observations,
+                "fired": self.fired,
+            }
+
+
+def get_alert_engine() -> AlertEngine:
+    """Process-wide engine shared by the API and the pipelines"""
+    if not hasattr(get_alert_engine, "_engine"):
+        get_alert_engine._engine = AlertEngine()
+    return get_alert_engine._engine
@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from http.cookies import SimpleCookie
+from typing import Iterable, Optional, Tuple
+
+# Signed session cookies and a pure ASGI middleware guarding the Gradio UI.
+
+SESSION_COOKIE = "shopagent_session"
+SESSION_TTL_S = int(os.getenv("SESSION_TTL_S", 12 * 3600))
+
+_secret = os.getenv("SESSION_SECRET")
+if not _secret:
+    print("[auth] SESSION_SECRET not set; using a random secret (sessions end on restart)")
+    _secret = secrets.token_hex(32)
+SESSION_SECRET = _secret.encode()
+
+# Public Gradio bundles: served without touching cookies or crypto
+STATIC_PREFIXES: Tuple[str, ...] = (
+    "/gradio/assets/",
+    "/gradio/static/",
+    "/gradio/theme.css",
+    "/gradio/favicon.ico",
+)
+PROTECTED_PREFIX = "/gradio"
+
+# Admin-only endpoints (/debug/*) want "X-Admin-Token: <ADMIN_TOKEN>"; they are
+# disabled while ADMIN_TOKEN is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _sign(payload: str) -> str:
+    return _b64(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_session_token(username: str, ttl_s: int = SESSION_TTL_S) -> str:
+    """'<user>.<expiry>.<hmac>' with the user name base64url-encoded"""
+    payload = f"{_b64(username.encode())}.{int(time.time()) + ttl_s}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_session_token(token: Optional[str]) -> Optional[str]:
+    """Returns the user name for a valid, unexpired token, else None (constant-time compare)."""
+    if not token or token.count(".") != 2:
+        return None
+    payload, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    user_b64, _, expiry = payload.partition(".")
+    try:
+        if int(expiry) < time.time():
+            return None
+        return base64.urlsafe_b64decode(user_b64 + "=" * (-len(user_b64) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and token) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def _cookie_from_headers(headers: Iterable[Tuple[bytes, bytes]], name: str) -> Optional[str]:
+    for key, value in headers:
+        if key == b"cookie":
+            cookie = SimpleCookie()
+            try:
+                cookie.load(value.decode("latin-1"))
+            except Exception:
+                continue
+            if name in cookie:
+                return cookie[name].value
+    return None
+
+
+class SessionAuthMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware): requests outside /gradio and
+    static bundles pass straight through; everything else under /gradio needs a
+    valid signed session cookie. `receive`/`send` are never wrapped, so
+    streaming responses, SSE queues and websockets are untouched.
+    """
+
+    def __init__(self, app, login_path: str = "/login"):
+        self.app = app
+        self.login_path = login_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if not path.startswith(PROTECTED_PREFIX) or path.startswith(STATIC_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        if verify_session_token(_cookie_from_headers(scope["headers"], SESSION_COOKIE)):
+            return await self.app(scope, receive, send)
+
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 303,
+            "headers": [(b"location", self.login_path.encode()), (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Circuit breakers for platform searches, per platform and per (platform, category).
+# A search that errors/times out counts as a failure on both; one that comes back
+# without a single price only on the (platform, category) breaker, since the
+# platform itself answered. Searches cut short by the caller's own deadline
+# don't count at all. When the failure rate over a sliding window is too high the
+# breaker opens and the platform is skipped until a cool-down passes; then a
+# few half-open probes decide whether it closes again.
+
+WINDOW_S = float(os.getenv("BREAKER_WINDOW_S", 300))
+MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 8))
+FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.7))
+COOLDOWN_S = float(os.getenv("BREAKER_COOLDOWN_S", 60))
+MAX_COOLDOWN_S = 15 * 60
+HALF_OPEN_PROBES = 1
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+OK, EMPTY, ERROR = "ok", "empty", "error"
+ABANDONED = "abandoned"  # the caller's deadline ran out: frees a probe slot, never counted
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window_s: float = WINDOW_S,
+        min_calls: int = MIN_CALLS,
+        failure_rate: float = FAILURE_RATE,
+        cooldown_s: float = COOLDOWN_S,
+        probes: int = HALF_OPEN_PROBES,
+    ):
+        self.window_s = window_s
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.base_cooldown_s = cooldown_s
+        self.cooldown_s = cooldown_s
+        self.probes = probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self._outcomes: Deque[Tuple[float, str]] = deque()
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_s:
+            self._outcomes.popleft()
+
+    def is_open(self, now: float) -> bool:
+        """Open and still cooling down (non-mutating)"""
+        return self.state == OPEN and now < self.opened_at + self.cooldown_s
+
+    def can_pass(self, now: float) -> bool:
+        if self.state == OPEN and now >= self.opened_at + self.cooldown_s:
+            self.state, self.probes_in_flight = HALF_OPEN, 0
+        if self.state == CLOSED:
+            return True
+        return self.state == HALF_OPEN and self.probes_in_flight < self.probes
+
+    def on_pass(self) -> None:
+        if self.state == HALF_OPEN:
+            self.probes_in_flight += 1
+
+    def record(self, outcome: str, now: float) -> None:
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+            if outcome == ABANDONED:
+                return
+            if outcome == OK:
+                self.state, self.cooldown_s = CLOSED, self.base_cooldown_s
+                self._outcomes.clear()
+            else:
+                # still failing: open again, backing off the cool-down
+                self._open(now, min(self.cooldown_s * 2, MAX_COOLDOWN_S))
+            return
+        if self.state == OPEN or outcome == ABANDONED:
+            return  # late result from before the breaker opened / says nothing about the platform
+        self._outcomes.append((now, outcome))
+        self._prune(now)
+        if len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for _, o in self._outcomes if o != OK)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now, self.base_cooldown_s)
+
+    def _open(self, now: float, cooldown_s: float) -> None:
+        self.state, self.opened_at, self.cooldown_s = OPEN, now, cooldown_s
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self._prune(now)
+        counts = {OK: 0, EMPTY: 0, ERROR: 0}
+        for _, o in self._outcomes:
+            counts[o] += 1
+        out: Dict[str, Any] = {"state": self.state, "window_calls": len(self._outcomes), **counts,
+                               "times_opened": self.times_opened}
+        if self.state == OPEN:
+            out["retry_in_s"] = round(max(self.opened_at + self.cooldown_s - now, 0.0), 1)
+        return out
+
+
+class BreakerRegistry:
+    """Breakers keyed 'platform' and 'platform|category'; a search needs both to pass."""
+
+    def __init__(self, **breaker_kwargs):
+        self._kwargs = breaker_kwargs
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.skipped = 0
+
+    def _keys(self, platform: str, category: Optional[str]) -> List[str]:
+        platform = platform.lower()
+        return [platform, f"{platform}|{category.lower()}"] if category else [platform]
+
+    def _get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(**self._kwargs)
+        return breaker
+
+    def is_open(self, platform: str, category: Optional[str] = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(self._breakers[k].is_open(now) for k in self._keys(platform, category) if k in self._breakers)
+
+    def open_platforms(self, platforms: Iterable[str], category: Optional[str] = None) -> List[str]:
+        return [p for p in platforms if self.is_open(p, category)]
+
+    def allow(self, platform: str, category: Optional[str] = None) -> bool:
+        """Take permission for one search (a half-open probe slot if that's all there is)"""
+        now = time.monotonic()
+        with self._lock:
+            breakers = [self._get(k) for k in self._keys(platform, category)]
+            if not all(b.can_pass(now) for b in breakers):
+                self.skipped += 1
+                return False
+            for b in breakers:
+                b.on_pass()
+            return True
+
+    def record(self, platform: str, category: Optional[str], outcome: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for k in self._keys(platform, category):
+                # no prices is a per-category signal; the platform-wide breaker only counts errors
+                platform_wide = "|" not in k
+                self._get(k).record(OK if outcome == EMPTY and platform_wide else outcome, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {"skipped_searches": self.skipped,
+                    "breakers": {k: b.snapshot(now) for k, b in sorted(self._breakers.items())}}
+
+
+def get_breakers() -> BreakerRegistry:
+    """Process-wide breakers shared by every pipeline"""
+    if not hasattr(get_breakers, "_registry"):
+        get_breakers._registry = BreakerRegistry()
+    return get_breakers._registry
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Per-request latency budget and per-platform latency stats used for hedging.
+
+DEFAULT_BUDGET_S = float(os.getenv("SEARCH_BUDGET_S", 8.0))
+MIN_BUDGET_S = float(os.getenv("SEARCH_MIN_BUDGET_S", 1.0))  # floor for client-supplied budgets
+MAX_BUDGET_S = 30.0
+DEFAULT_P95_S = float(os.getenv("SEARCH_DEFAULT_P95_S", 2.0))
+MIN_SAMPLES = 20
+WINDOW = 200
+
+
+class Deadline:
+    """Absolute deadline for one request (monotonic clock)."""
+    __slots__ = ("budget", "expires")
+
+    def __init__(self, budget_s: Optional[float] = None):
+        budget = DEFAULT_BUDGET_S if budget_s is None else float(budget_s)
+        self.budget = min(max(budget, MIN_BUDGET_S), MAX_BUDGET_S)
+        self.expires = time.monotonic() + self.budget
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies per key (platform)."""
+
+    def __init__(self, window: int = WINDOW, default_p95: float = DEFAULT_P95_S):
+        self.window = window
+        self.default_p95 = default_p95
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def p95(self, key: str) -> float:
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES:
+            return self.default_p95
+        samples.sort()
+        return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            keys = list(self._samples)
+        return {k: {"p95_s": round(self.p95(k), 3), "samples": len(self._samples[k])} for k in keys}
+
+
+latency = LatencyTracker()
@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .units import split_quantity
+
+# Dictionary-driven query canonicalizer.
+# "amul butter 500 g", "Amul Butter 500g" and "AMUL butter 0.5 kg" all become the
+# key "amul butter 500g", which is what every pipeline sends to Serper. Sizes are
+# read by units.split_quantity ("2 x 500 g" -> "2 x 500g"; "5G" in a phone name
+# stays part of the name).
+
+BRANDS = (
+    # grocery / FMCG
+    "Amul", "Mother Dairy", "Britannia", "Nestle", "Maggi", "Parle", "Haldiram's", "Tata", "Tata Sampann",
+    "India Gate", "Daawat", "Aashirvaad", "Pillsbury", "Fortune", "Saffola", "Surf Excel", "Ariel", "Tide",
+    "Rin", "Vim", "Lizol", "Harpic", "Colgate", "Pepsodent", "Dettol", "Lifebuoy", "Dabur", "Patanjali",
+    # electronics
+    "Samsung", "Redmi", "Xiaomi", "Apple", "iPhone", "OnePlus", "Realme", "Vivo", "Oppo", "Motorola",
+    "HP", "Dell", "Lenovo", "Asus", "Acer", "boAt", "Sony", "JBL", "Noise", "Amazfit", "Fire-Boltt",
+    # fashion
+    "Levi's", "Allen Solly", "Puma", "Adidas", "Nike", "Biba", "W for Women", "Only", "Bata",
+    "Fastrack", "Titan", "Casio", "American Tourister", "Wildcraft", "Skybags",
+    # beauty
+    "Cetaphil", "Nivea", "Minimalist", "L'Oréal", "Dove", "Mamaearth", "Maybelline", "Lakmé", "Sugar",
+    "Fogg", "Engage", "Denver",
+)
+
+FILLER = frozenset({"buy", "online", "price", "best", "cheapest", "offer", "offers", "deal"})
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def _fold(text: str) -> str:
+    """lowercase, strip accents (Lakmé -> lakme) and apostrophes (Levi's -> levis)"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.lower().replace("'", "").replace("’", "")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(_fold(text))
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over token sequences. All dictionary entries are
+    found in one left-to-right pass over the query tokens.
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[Tuple[str, ...], Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]  # (pattern length, payload)
+
+        for tokens, payload in patterns:
+            node = 0
+            for t in tokens:
+                nxt = self._goto[node].get(t)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][t] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(tokens), payload))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for t, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and t not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(t, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, tokens: Sequence[str]) -> List[Tuple[int, int, Any]]:
+        """[(start, end, payload)] with end exclusive"""
+        hits = []
+        node = 0
+        for i, t in enumerate(tokens):
+            while node and t not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(t, 0)
+            for length, payload in self._out[node]:
+                hits.append((i + 1 - length, i + 1, payload))
+        return hits
+
+
+def _build_matcher() -> AhoCorasick:
+    patterns = [(tuple(tokenize(b)), ("brand", b)) for b in BRANDS]
+    return AhoCorasick([p for p in patterns if p[0]])
+
+
+_MATCHER = _build_matcher()
+
+
+def _format_size(amount: float, unit: str) -> Tuple[str, str]:
+    """Canonical display: 500g, 1kg, 1.5l, 250ml, 6pcs (amount in the base unit)"""
+    if unit == "g" and amount >= 1000:
+        return f"{amount / 1000:g}", "kg"
+    if unit == "ml" and amount >= 1000:
+        return f"{amount / 1000:g}", "l"
+    return f"{amount:g}", unit
+
+
+@lru_cache(maxsize=8192)
+def _canonicalize(text: str) -> Tuple[Tuple[str, str], ...]:
+    quantity, rest = split_quantity(_fold(text))
+    tokens = tokenize(rest)
+    consumed = [False] * len(tokens)
+
+    brand = ""
+    size, unit, size_key = "", "", ""
+    brand_span: Optional[Tuple[int, int]] = None
+
+    if quantity is not None:
+        size, unit = _format_size(quantity.amount, quantity.unit)
+        size_key = f"{size}{unit}"
+        if quantity.packs > 1 and quantity.unit != "pcs":
+            per_pack, per_unit = _format_size(quantity.amount / quantity.packs, quantity.unit)
+            size_key = f"{quantity.packs} x {per_pack}{per_unit}"
+
+    for start, end, (kind, value) in _MATCHER.find_all(tokens):
+        # leftmost, then longest brand wins ("tata sampann" over "tata")
+        if brand_span is None or (start, -(end - start)) < (brand_span[0], -(brand_span[1] - brand_span[0])):
+            brand_span, brand = (start, end), value
+
+    if brand_span:
+        for i in range(*brand_span):
+            consumed[i] = True
+
+    name_tokens = [t for t, used in zip(tokens, consumed) if not used and t not in FILLER]
+    name = " ".join(name_tokens)
+    brand_key = " ".join(tokenize(brand))
+    key = " ".join(p for p in (brand_key, name, size_key) if p)
+
+    return (("brand", brand), ("name", name), ("size", size), ("unit", unit), ("key", key))
+
+
+def canonicalize(text: str) -> Dict[str, str]:
+    """
+    Single-pass, memoized parse of a product query into
+    {brand, name, size, unit, key}. `key` is the stable search query.
+    """
+    return dict(_canonicalize(" ".join((text or "").split())))
+
+
+def canonical_key(text: str) -> str:
+    return _canonicalize(" ".join((text or "").split()))[-1][1]
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Background jobs for analyses that outlive an HTTP timeout. A job is
+# submitted, runs on a bounded worker pool, reports progress per pipeline node,
+# and its result is kept for JOB_TTL_S. Submitting the same (kind, params)
+# again returns the existing job while it is queued or running, or finished
+# less than JOB_FRESH_S ago, instead of redoing the work.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 100))
+JOB_TTL_S = float(os.getenv("JOB_TTL_S", 3600))
+JOB_FRESH_S = float(os.getenv("JOB_FRESH_S", 60))  # how long a finished result is reused
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class UnknownJobKind(ValueError):
+    pass
+
+
+class Job:
+    __slots__ = ("id", "kind", "params", "key", "status", "created_at", "started_at", "finished_at",
+                 "expected_nodes", "nodes", "result", "error")
+
+    def __init__(self, kind: str, params: Dict[str, Any], key: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.params = params
+        self.key = key
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expected_nodes: List[str] = []
+        self.nodes: Dict[str, float] = {}  # node -> seconds since start when it finished
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    # handlers report progress through these two
+    def expect(self, nodes: List[str]) -> None:
+        self.expected_nodes = list(nodes)
+
+    def node_done(self, node: str) -> None:
+        self.nodes[node] = round(time.time() - (self.started_at or self.created_at), 3)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        total = len(self.expected_nodes) or None
+        out = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "completed": len(self.nodes),
+                "total": total,
+                "nodes": {n: ("done" if n in self.nodes else "pending") for n in self.expected_nodes}
+                         or {n: "done" for n in self.nodes},
+                "timings_s": self.nodes,
+            },
+        }
+        if self.error:
+            out["error"] = self.error
+        if include_result and self.status == DONE:
+            out["result"] = self.result
+        return out
+
+
+Handler = Callable[[Dict[str, Any], Job], Any]
+
+
+class JobManager:
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING, ttl_s: float = JOB_TTL_S,
+                 fresh_s: float = JOB_FRESH_S):
+        self.ttl_s = ttl_s
+        self.fresh_s = fresh_s
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._handlers: Dict[str, Handler] = {}
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, str] = {}
+        self.stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "failed": 0, "expired": 0}
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    @staticmethod
+    def job_key(kind: str, params: Dict[str, Any]) -> str:
+        blob = json.dumps([kind, params], sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Tuple[Job, bool]:
+        """(job, created). An identical queued/running job, or one that finished within fresh_s, is reused."""
+        if kind not in self._handlers:
+            raise UnknownJobKind(f"unknown job kind {kind!r}; expected one of {sorted(self._handlers)}")
+        key = self.job_key(kind, params)
+        with self._lock:
+            self._sweep()
+            existing = self._jobs.get(self._by_key.get(key, ""))
+            if existing is not None and self._reusable(existing):
+                self.stats["deduplicated"] += 1
+                return existing, False
+            pending = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise JobQueueFull(f"{pending} jobs pending")
+            job = Job(kind, params, key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self.stats["submitted"] += 1
+        self._pool.submit(self._run, job)
+        return job, True
+
+    def _reusable(self, job: Job) -> bool:
+        if job.status in (QUEUED, RUNNING):
+            return True
+        return job.status == DONE and time.time() - (job.finished_at or 0.0) < self.fresh_s
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._sweep()
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job) -> None:
+        job.status, job.started_at = RUNNING, time.time()
+        try:
+            result = self._handlers[job.kind](job.params, job)
+        except Exception as e:
+            print(f"[jobs] {job.kind} job {job.id} failed: {e}")
+            with self._lock:
+                job.error, job.finished_at, job.status = str(e), time.time(), FAILED
+                self.stats["failed"] += 1
+            return
+        # finished_at and status change together, so a finished job is never seen without its time
+        with self._lock:
+            job.result, job.finished_at, job.status = result, time.time(), DONE
+
+    def _sweep(self) -> None:
+        # finished jobs live for ttl_s; called under the lock on every access
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and now - j.finished_at > self.ttl_s]:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) == job_id:
+                del self._by_key[job.key]
+            self.stats["expired"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for j in self._jobs.values():
+                counts[j.status] = counts.get(j.status, 0) + 1
+            return {**self.stats, "by_status": counts}
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide job pool"""
+    if not hasattr(get_job_manager, "_manager"):
+        get_job_manager._manager = JobManager()
+    return get_job_manager._manager
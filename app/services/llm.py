@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# LLM gateway: every LLM call in the app goes through here.
+#   - exact-match response cache keyed on (model, normalized prompt)
+#   - concurrent prompts within a short window go to the model as one batch
+#   - per-minute request and token limits (callers wait, they don't fail)
+#   - "fake" backend: deterministic local stand-in for tests and benchmarks
+# Same shape as serper.SerperBatcher: a collector thread plus one Future per caller.
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # "openai" | "fake" (opt-in only: it makes answers up)
+BATCH_WINDOW_S = float(os.getenv("LLM_BATCH_WINDOW_MS", 20)) / 1000.0
+BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", 8))
+CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2048))
+REQUESTS_PER_MIN = int(os.getenv("LLM_RPM", 60))
+TOKENS_PER_MIN = int(os.getenv("LLM_TPM", 40000))
+DEFAULT_MAX_TOKENS = 512
+
+_WS_RE = re.compile(r"\s+")
+
+
+class LLMConfigError(RuntimeError):
+    pass
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WS_RE.sub(" ", prompt or "").strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token; good enough for rate limiting"""
+    return max(1, len(text) // 4)
+
+
+class OpenAIBackend:
+    def __init__(self, model: str):
+        self.model = model
+        self._llm = None
+
+    def batch(self, prompts: List[str], max_tokens: int) -> List[str]:
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(model=self.model)
+        messages = self._llm.bind(max_tokens=max_tokens).batch(prompts, config={"max_concurrency": len(prompts)})
+        return [m.content if hasattr(m, "content") else str(m) for m in messages]
+
+
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(ml|l|ltr|litre|g|gm|kg|pcs|pack)\b", re.IGNORECASE)
+
+
+class FakeBackend:
+    """
+    Deterministic, offline. Prompts asking for a JSON array get the size
+    variants mentioned in the prompt ([{"size": 500, "unit": "ml"}, ...]);
+    anything else gets a stable digest of the prompt.
+    """
+
+    def __init__(self, model: str = "fake", latency_s: float = 0.0):
+        self.model = model
+        self.latency_s = latency_s
+        self.calls = 0
+        self.prompts_seen = 0
+
+    def batch(self, prompts: List[str], max_tokens: int) -> List[str]:
+        self.calls += 1
+        self.prompts_seen += len(prompts)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return [self._answer(p) for p in prompts]
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        if "JSON" in prompt:
+            seen, variants = set(), []
+            for size, unit in _SIZE_RE.findall(prompt):
+                value = float(size)
+                item = (int(value) if value.is_integer() else value, unit.lower())
+                if item not in seen:
+                    seen.add(item)
+                    variants.append({"size": item[0], "unit": item[1]})
+            return json.dumps(variants)
+        return "fake:" + hashlib.sha1(normalize_prompt(prompt).encode()).hexdigest()[:12]
+
+
+class RateLimiter:
+    """Sliding 60s window over requests and tokens; acquire() blocks until both fit."""
+
+    def __init__(self, requests_per_min: int = REQUESTS_PER_MIN, tokens_per_min: int = TOKENS_PER_MIN):
+        self.requests_per_min = requests_per_min
+        self.tokens_per_min = tokens_per_min
+        self._events: Deque[Tuple[float, int]] = deque()  # (time, tokens)
+        self._tokens = 0
+        self.waited_s = 0.0
+
+    def acquire(self, tokens: int, requests: int = 1) -> None:
+        # one oversized batch still goes through, alone
+        tokens = min(tokens, self.tokens_per_min)
+        requests = min(requests, self.requests_per_min)
+        while True:
+            now = time.monotonic()
+            while self._events and now - self._events[0][0] >= 60.0:
+                self._tokens -= self._events.popleft()[1]
+            if len(self._events) + requests <= self.requests_per_min and self._tokens + tokens <= self.tokens_per_min:
+                # one event per request; the batch's tokens are booked on the first
+                self._events.extend([(now, tokens)] + [(now, 0)] * (requests - 1))
+                self._tokens += tokens
+                return
+            wait_s = 60.0 - (now - self._events[0][0]) + 0.01
+            self.waited_s += wait_s
+            time.sleep(wait_s)
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        backend=None,
+        model: str = LLM_MODEL,
+        window_s: float = BATCH_WINDOW_S,
+        max_batch: int = BATCH_MAX,
+        cache_size: int = CACHE_SIZE,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        self.model = model
+        self.backend = backend if backend is not None else _default_backend(model)
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.limiter = limiter or RateLimiter()
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}  # normalized prompt -> Future shared by all callers
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, str, int, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "batches": 0, "prompts_sent": 0, "errors": 0}
+
+    # ---- public API
+
+    def submit(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Future:
+        """Future resolving to the completion text"""
+        key = (self.model, normalize_prompt(prompt))
+        future: Future = Future()
+        with self._lock:
+            self.stats["requests"] += 1
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                future.set_result(cached)
+                return future
+            inflight = self._inflight.get(key[1])
+            if inflight is not None:
+                self.stats["coalesced"] += 1
+                return inflight
+            self._inflight[key[1]] = future
+        self._ensure_thread()
+        self._queue.put((key[1], prompt, max_tokens, future))
+        return future
+
+    def complete_sync(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, timeout: Optional[float] = None) -> str:
+        return self.submit(prompt, max_tokens).result(timeout=timeout)
+
+    async def complete(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        return await asyncio.wrap_future(self.submit(prompt, max_tokens))
+
+    async def complete_many(self, prompts: List[str], max_tokens: int = DEFAULT_MAX_TOKENS) -> List[str]:
+        return list(await asyncio.gather(*(self.complete(p, max_tokens) for p in prompts)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "model": self.model, "backend": type(self.backend).__name__,
+                    "cached": len(self._cache), "rate_limit_wait_s": round(self.limiter.waited_s, 2)}
+
+    # ---- batching
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect, name="llm-gateway", daemon=True)
+                    self._thread.start()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            closes_at = time.monotonic() + self.window_s
+            while len(batch) < self.max_batch:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch: List[Tuple[str, str, int, Future]]) -> None:
+        # identical prompts in one batch are sent once
+        waiters: "OrderedDict[str, List[Future]]" = OrderedDict()
+        prompts: Dict[str, str] = {}
+        for norm, prompt, _, future in batch:
+            waiters.setdefault(norm, []).append(future)
+            prompts.setdefault(norm, prompt)
+        keys = list(waiters)
+        max_tokens = max(item[2] for item in batch)
+
+        self.limiter.acquire(sum(estimate_tokens(prompts[k]) for k in keys) + max_tokens * len(keys), requests=len(keys))
+        try:
+            answers = self.backend.batch([prompts[k] for k in keys], max_tokens)
+            if len(answers) != len(keys):
+                raise ValueError(f"expected {len(keys)} completions, got {len(answers)}")
+        except Exception as e:
+            print(f"[llm] batch of {len(keys)} failed: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+                for k in keys:
+                    self._inflight.pop(k, None)
+            for k in keys:
+                for future in waiters[k]:
+                    future.set_exception(e)
+            return
+
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["prompts_sent"] += len(keys)
+            for k, answer in zip(keys, answers):
+                self._cache[(self.model, k)] = answer
+                self._cache.move_to_end((self.model, k))
+                self._inflight.pop(k, None)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for k, answer in zip(keys, answers):
+            for future in waiters[k]:
+                future.set_result(answer)
+
+
+def _default_backend(model: str):
+    backend = LLM_BACKEND.strip().lower()
+    if backend == "fake":
+        print("[llm] LLM_BACKEND=fake: using the local fake model, answers are made up")
+        return FakeBackend()
+    if backend != "openai":
+        raise LLMConfigError(f"unknown LLM_BACKEND {LLM_BACKEND!r}; expected 'openai' or 'fake'")
+    if not os.getenv("OPENAI_API_KEY"):
+        raise LLMConfigError("OPENAI_API_KEY is not set (set it, or LLM_BACKEND=fake for local testing)")
+    return OpenAIBackend(model)
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway, so the cache, batching and rate limits are shared"""
+    if not hasattr(get_llm_gateway, "_gateway"):
+        get_llm_gateway._gateway = LLMGateway()
+    return get_llm_gateway._gateway
@@ -0,0 +1,139 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .units import parse_quantity
+
+# Offers with different titles ("Amul Butter 100g" vs "Amul Cheese 1kg") must not be
+# priced against each other. This module groups titles into product/variant groups
+# with a token n-gram inverted index (no LLM, pure Python, ~1ms for hundreds of offers).
+
+MATCH_THRESHOLD = 0.6
+
+# one pass: either "<number> <unit>" (size) or a word/model number containing a letter
+_TOKEN_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(kg|kgs|g|gm|gms|gram|grams|mg|l|ltr|ltrs|litre|litres|liter|liters|ml)\b"
+    r"|\b([a-z0-9]*[a-z][a-z0-9]*)"
+)
+
+# marketplace / SEO noise that shows up in Serper titles
+STOPWORDS = frozenset({
+    "a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "the", "to", "with",
+    "buy", "online", "price", "prices", "best", "offer", "offers", "deal", "deals", "shop",
+    "get", "off", "rs", "inr", "india", "delivery", "delivered", "mins", "minutes", "min",
+    "com", "www", "amazon", "flipkart", "blinkit", "zepto", "bigbasket", "jiomart",
+    "grocery", "groceries", "gourmet", "foods", "store", "pack", "packet", "pouch", "carton",
+    "low", "lowest", "new", "original",
+})
+
+
+@lru_cache(maxsize=4096)
+def title_signature(title: str) -> Tuple[frozenset, str]:
+    """
+    Normalize a title into (name tokens, size key).
+    '1 kg', '1000g', '1kg' and '2 x 500 g' all give the size key '1000g'.
+    """
+    tokens = []
+    for number, unit, word in _TOKEN_RE.findall((title or "").lower()):
+        if word and len(word) > 1 and word not in STOPWORDS:
+            tokens.append(word)
+    quantity = parse_quantity(title or "")
+    return frozenset(tokens), quantity.key() if quantity else ""
+
+
+def _similarity(a: frozenset, b: frozenset) -> float:
+    # Overlap coefficient tolerates long SEO titles; fall back to Jaccard on tiny sets
+    # so that a one-word title does not swallow everything.
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    if min(len(a), len(b)) < 2:
+        return shared / len(a | b)
+    return shared / min(len(a), len(b))
+
+
+def _sizes_compatible(a: str, b: str) -> bool:
+    return not a or not b or a == b
+
+
+def group_titles(titles: Sequence[str], threshold: float = MATCH_THRESHOLD) -> List[List[int]]:
+    """
+    Leader clustering over an inverted token index.
+    Returns groups of indices into `titles`, largest group first.
+    Titles with no usable tokens share a single group.
+    """
+    leaders: List[Tuple[frozenset, str]] = []
+    groups: List[List[int]] = []
+    index: Dict[str, List[int]] = {}
+    untitled: List[int] = []
+
+    for i, title in enumerate(titles):
+        tokens, size = title_signature(title)
+        if not tokens:
+            untitled.append(i)
+            continue
+
+        candidates = set()
+        for t in tokens:
+            candidates.update(index.get(t, ()))
+
+        best, best_score = None, threshold
+        for g in candidates:
+            lead_tokens, lead_size = leaders[g]
+            if not _sizes_compatible(size, lead_size):
+                continue
+            score = _similarity(tokens, lead_tokens)
+            if score >= best_score:
+                best, best_score = g, score
+
+        if best is None:
+            best = len(leaders)
+            leaders.append((tokens, size))
+            groups.append([])
+            for t in tokens:
+                index.setdefault(t, []).append(best)
+        elif size and not leaders[best][1]:
+            leaders[best] = (leaders[best][0], size)
+
+        groups[best].append(i)
+
+    if untitled:
+        groups.append(untitled)
+    return sorted(groups, key=len, reverse=True)
+
+
+def select_matching_group(query: str, titles: Sequence[str], groups: List[List[int]]) -> Optional[List[int]]:
+    """
+    Pick the group that best matches the query: highest share of query tokens
+    present in the group leader, ties broken by group size.
+    """
+    q_tokens, q_size = title_signature(query)
+    best, best_key = None, (0.0, 0)
+    for members in groups:
+        tokens, size = title_signature(titles[members[0]])
+        if q_size and size and q_size != size:
+            continue
+        coverage = len(q_tokens & tokens) / len(q_tokens) if q_tokens else 1.0
+        key = (coverage, len(members))
+        if coverage >= MATCH_THRESHOLD and key > best_key:
+            best, best_key = members, key
+    return best
+
+
+def comparable_indices(titles: Sequence[str], query: str) -> List[int]:
+    """Indices of the titles in the product/variant group that matches the query."""
+    if not titles:
+        return []
+    groups = group_titles(titles)
+    members = select_matching_group(query, titles, groups) if query else groups[0]
+    return sorted(members or [])
+
+
+def filter_comparable_offers(
+    offers: List[Dict[str, Any]],
+    query: str,
+    title_key: str = "title",
+) -> List[Dict[str, Any]]:
+    """Keep only offers in the product/variant group that matches the query."""
+    titles = [o.get(title_key) or "" for o in offers]
+    return [offers[i] for i in comparable_indices(titles, query)]
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+# Optional price verification: fetch product pages and read the selling price and
+# stock status from the HTML. Snippet prices are often stale or show the MRP.
+
+MAX_PAGE_BYTES = int(os.getenv("PAGE_FETCH_MAX_BYTES", 512 * 1024))
+PER_DOMAIN_LIMIT = int(os.getenv("PAGE_FETCH_PER_DOMAIN", 2))
+FETCH_TIMEOUT = float(os.getenv("PAGE_FETCH_TIMEOUT", 8))
+VALIDATOR_CACHE_PATH = os.getenv("PAGE_VALIDATOR_CACHE", ".cache/page_validators.json")
+VALIDATOR_CACHE_MAX = int(os.getenv("PAGE_VALIDATOR_CACHE_MAX", 5000))  # URLs kept (least recently used go)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; ShoppingAgent/1.0)",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+
+
+# ---------- HTML extraction (runs in a worker process) ----------
+
+_PRICE_PATTERNS = [
+    # JSON-LD / microdata / Open Graph, most reliable first
+    re.compile(r'"price"\s*:\s*"?(\d[\d,]*(?:\.\d{1,2})?)'),
+    re.compile(r'itemprop=["\']price["\'][^>]*content=["\'](\d[\d,]*(?:\.\d{1,2})?)', re.I),
+    re.compile(r'property=["\'](?:product|og):price:amount["\'][^>]*content=["\'](\d[\d,]*(?:\.\d{1,2})?)', re.I),
+    re.compile(r"(?:₹|&#8377;|Rs\.?|INR)\s*(\d[\d,]*(?:\.\d{1,2})?)", re.I),
+]
+_OUT_OF_STOCK = re.compile(r"OutOfStock|out of stock|currently unavailable|sold out", re.I)
+_IN_STOCK = re.compile(r"InStock|in stock|add to cart|add to basket", re.I)
+
+
+def extract_page_offer(body: bytes, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pull the selling price and stock flag out of a product page.
+    Module-level (picklable) so it can run in a process pool.
+    """
+    html = body.decode(encoding or "utf-8", errors="replace")
+
+    price = None
+    for pattern in _PRICE_PATTERNS:
+        m = pattern.search(html)
+        if m:
+            try:
+                price = float(m.group(1).replace(",", ""))
+                break
+            except ValueError:
+                continue
+
+    if _OUT_OF_STOCK.search(html):
+        in_stock = False
+    elif _IN_STOCK.search(html):
+        in_stock = True
+    else:
+        in_stock = None
+
+    return {"price": price, "in_stock": in_stock}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Lazy process pool, created on first verification request. Workers are
+    spawned, not forked: forking a multithreaded server can copy a lock
+    some other thread holds and deadlock the child.
+    """
+    if not hasattr(_get_pool, "_pool"):
+        _get_pool._pool = ProcessPoolExecutor(max_workers=int(os.getenv("PAGE_PARSE_PROCESSES", 2)),
+                                              mp_context=multiprocessing.get_context("spawn"))
+    return _get_pool._pool
+
+
+# ---------- Validator cache (ETag / Last-Modified) ----------
+
+class ValidatorCache:
+    """
+    url -> {etag, last_modified, result}, persisted as a small JSON file so a
+    304 can reuse the previously extracted price across restarts. At most
+    max_entries URLs (LRU); the file is only rewritten when an entry changed.
+    """
+
+    def __init__(self, path: Optional[str] = VALIDATOR_CACHE_PATH, max_entries: int = VALIDATOR_CACHE_MAX):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = OrderedDict(json.load(f))
+            except (OSError, ValueError):
+                self._entries = OrderedDict()
+            self._dirty = self._evict()
+
+    def _evict(self) -> bool:
+        evicted = False
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted = True
+        return evicted
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], result: Dict[str, Any]) -> None:
+        if not etag and not last_modified:
+            return
+        entry = {"etag": etag, "last_modified": last_modified, "result": result}
+        with self._lock:
+            if self._entries.get(url) == entry:
+                self._entries.move_to_end(url)
+                return
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            self._evict()
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._entries)
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+
+# ---------- Fetcher ----------
+
+def _download(url: str, headers: Dict[str, str], max_bytes: int, timeout: float) -> Dict[str, Any]:
+    """Blocking GET with a hard byte cap (runs in the default thread pool)."""
+    with requests.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as resp:
+        out = {
+            "status": resp.status_code,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "encoding": resp.encoding,
+            "body": b"",
+        }
+        if resp.status_code != 200:
+            return out
+
+        chunks, size = [], 0
+        for chunk in resp.iter_content(chunk_size=16 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+        out["body"] = b"".join(chunks)[:max_bytes]
+        return out
+
+
+class PageFetcher:
+    """
+    Bounded async page fetcher:
+      - at most `per_domain_limit` concurrent requests per host
+      - conditional GET using cached ETag / Last-Modified validators
+      - pages truncated at `max_bytes`
+      - HTML parsing offloaded to a process pool
+    """
+
+    def __init__(
+        self,
+        per_domain_limit: int = PER_DOMAIN_LIMIT,
+        max_bytes: int = MAX_PAGE_BYTES,
+        timeout: float = FETCH_TIMEOUT,
+        cache: Optional[ValidatorCache] = None,
+        executor=None,
+    ):
+        self.per_domain_limit = per_domain_limit
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache = cache if cache is not None else ValidatorCache()
+        self.executor = executor
+        # {event loop: {domain: semaphore}}: a semaphore that has been waited on is
+        # bound to that loop, and jobs each run on their own (asyncio.run)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        domain = urlparse(url).netloc.lower()
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if domain not in per_loop:
+            per_loop[domain] = asyncio.Semaphore(self.per_domain_limit)
+        return per_loop[domain]
+
+    async def fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"price", "in_stock", "cached"} or None when the page could
+        not be fetched or parsed.
+        """
+        if not url or not url.startswith(("http://", "https://")):
+            return None
+
+        headers = dict(HEADERS)
+        cached = self.cache.get(url)
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._semaphore(url):
+                page = await loop.run_in_executor(
+                    None, _download, url, headers, self.max_bytes, self.timeout
+                )
+        except Exception as e:
+            print(f"[page_fetcher] failed for url={url!r}: {e}")
+            return None
+
+        if page["status"] == 304 and cached:
+            return {**cached["result"], "cached": True}
+        if page["status"] != 200 or not page["body"]:
+            return None
+
+        try:
+            result = await loop.run_in_executor(
+                self.executor or _get_pool(), extract_page_offer, page["body"], page["encoding"]
+            )
+        except Exception as e:
+            print(f"[page_fetcher] parse failed for url={url!r}: {e}")
+            return None
+
+        self.cache.put(url, page["etag"], page["last_modified"], result)
+        return {**result, "cached": False}
+
+    async def fetch_many(self, urls: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        {url: fetch(url)}. With `timeout`, pages still loading when it runs out are
+        abandoned (None); the ones that finished are kept.
+        """
+        unique = list(dict.fromkeys(u for u in urls if u))
+        tasks = [asyncio.ensure_future(self.fetch(u)) for u in unique]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, self.cache.save)
+        return {u: t.result() if t.done() and not t.cancelled() else None for u, t in zip(unique, tasks)}
+
+
+def get_page_fetcher() -> PageFetcher:
+    """Shared fetcher so per-domain limits apply across requests"""
+    if not hasattr(get_page_fetcher, "_fetcher"):
+        get_page_fetcher._fetcher = PageFetcher()
+    return get_page_fetcher._fetcher
@@ -0,0 +1,117 @@
+import os
+import random
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Adaptive platform selection. For each category (and master category) we keep
+# decayed counters per platform: searches, hits (a price was found) and wins
+# (it was the cheapest). Platforms whose hit rate in a category stays under
+# YIELD_THRESHOLD are skipped there, except for an EXPLORE_RATE share of
+# requests so their numbers stay fresh. The rest are ordered by win rate.
+
+DECAY = float(os.getenv("YIELD_DECAY", 0.95))          # per search; ~14-search half-life
+MIN_SAMPLES = float(os.getenv("YIELD_MIN_SAMPLES", 5))  # decayed searches before pruning
+YIELD_THRESHOLD = float(os.getenv("YIELD_THRESHOLD", 0.15))
+EXPLORE_RATE = float(os.getenv("YIELD_EXPLORE_RATE", 0.1))
+
+
+class PlatformYield:
+    def __init__(
+        self,
+        decay: float = DECAY,
+        min_samples: float = MIN_SAMPLES,
+        threshold: float = YIELD_THRESHOLD,
+        explore_rate: float = EXPLORE_RATE,
+        rng: Optional[random.Random] = None,
+    ):
+        self.decay = decay
+        self.min_samples = min_samples
+        self.threshold = threshold
+        self.explore_rate = explore_rate
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, str], List[float]] = {}  # (scope, platform) -> [searches, hits, wins]
+        self.pruned = 0
+        self.explored = 0
+
+    @staticmethod
+    def _scopes(category: Optional[str], master_category: Optional[str]) -> List[str]:
+        # most specific first
+        return [s.strip().lower() for s in (category, master_category) if s and s.strip()]
+
+    def record(self, platform: str, hit: bool, category: Optional[str] = None,
+               master_category: Optional[str] = None) -> None:
+        """One search of `platform` finished; hit = it produced a price"""
+        with self._lock:
+            for scope in self._scopes(category, master_category):
+                c = self._counts.setdefault((scope, platform), [0.0, 0.0, 0.0])
+                c[0] = c[0] * self.decay + 1.0
+                c[1] = c[1] * self.decay + (1.0 if hit else 0.0)
+                c[2] = c[2] * self.decay
+
+    def record_win(self, platform: str, category: Optional[str] = None,
+                   master_category: Optional[str] = None) -> None:
+        """`platform` had the cheapest price (call after record() for the same search)"""
+        with self._lock:
+            for scope in self._scopes(category, master_category):
+                c = self._counts.get((scope, platform))
+                if c is not None:
+                    c[2] = min(c[2] + 1.0, c[1])
+
+    def _stats(self, platform: str, scopes: List[str]) -> Optional[List[float]]:
+        for scope in scopes:
+            c = self._counts.get((scope, platform))
+            if c is not None and c[0] >= self.min_samples:
+                return c
+        return None
+
+    def plan(self, platforms: Iterable[str], category: Optional[str] = None,
+             master_category: Optional[str] = None) -> Tuple[List[str], List[str]]:
+        """
+        (to_search, pruned). Platforms without enough history are always searched;
+        to_search is ordered by win rate. Never prunes every platform.
+        """
+        platforms = list(platforms)
+        scopes = self._scopes(category, master_category)
+        if not scopes:
+            return platforms, []
+
+        keep: List[Tuple[float, int, str]] = []
+        pruned: List[str] = []
+        with self._lock:
+            for i, platform in enumerate(platforms):
+                c = self._stats(platform, scopes)
+                if c is None:
+                    keep.append((1.0, i, platform))  # unknown: treat as promising
+                    continue
+                win_rate = c[2] / c[0]
+                if c[1] / c[0] >= self.threshold:
+                    keep.append((win_rate, i, platform))
+                elif self.rng.random() < self.explore_rate:
+                    self.explored += 1
+                    keep.append((win_rate, i, platform))
+                else:
+                    pruned.append(platform)
+            if not keep:
+                return platforms, []
+            self.pruned += len(pruned)
+        keep.sort(key=lambda t: (-t[0], t[1]))
+        return [p for _, _, p in keep], pruned
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            scopes: Dict[str, Dict[str, Any]] = {}
+            for (scope, platform), (n, hits, wins) in sorted(self._counts.items()):
+                scopes.setdefault(scope, {})[platform] = {
+                    "searches": round(n, 2),
+                    "hit_rate": round(hits / n, 3) if n else None,
+                    "win_rate": round(wins / n, 3) if n else None,
+                }
+            return {"pruned_searches": self.pruned, "explored": self.explored, "scopes": scopes}
+
+
+def get_platform_yield() -> PlatformYield:
+    """Process-wide stats shared by compare, arbitrage and /analyze"""
+    if not hasattr(get_platform_yield, "_stats"):
+        get_platform_yield._stats = PlatformYield()
+    return get_platform_yield._stats
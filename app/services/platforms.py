@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import functools
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .breaker import ABANDONED, EMPTY, ERROR, OK, get_breakers
+from .budget import Deadline
+from .profiler import profiled_call
+from .serper import _WAIT_POOL, hedged_search
+
+# Single registry of shopping platforms. Every pipeline (compare, arbitrage,
+# anomaly parsing, /analyze) builds its queries and reads prices through these
+# adapters, so a platform is added or tuned in one place.
+
+DEFAULT_CONCURRENCY = int(os.getenv("PLATFORM_CONCURRENCY", 8))
+
+# Progressive deepening: the price is nearly always in the first result or two,
+# so searches ask for SHALLOW_NUM results and only when none has a price retry
+# with DEEP_NUM results, then with the query reworded (adds "price").
+SHALLOW_NUM = int(os.getenv("SERPER_SHALLOW_NUM", 3))
+DEEP_NUM = int(os.getenv("SERPER_DEEP_NUM", 10))
+
+# Only match when a currency is present (prevents matching "5 kg", "27% OFF", "8 mins")
+_PRICE_RE = re.compile(r"(?:₹|Rs\.?|INR)\s*(\d+(?:\.\d{1,2})?)", re.IGNORECASE)
+
+
+def snippet_price(result: Dict[str, Any]) -> Optional[float]:
+    """First rupee price in a search result's title + snippet"""
+    text = f"{result.get('title', '') or ''} {result.get('snippet', '') or ''}".replace(",", "")
+    match = _PRICE_RE.search(text)
+    if not match:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+@dataclass
+class PlatformAdapter:
+    key: str                  # lower-case id used in APIs, stats and serviceability data
+    name: str                 # display name
+    domain: str
+    query_template: str = "{product} site:{domain}"
+    extractor: Callable[[Dict[str, Any]], Optional[float]] = snippet_price
+    concurrency: int = DEFAULT_CONCURRENCY  # concurrent searches, across all requests
+    _slots: threading.BoundedSemaphore = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._slots = threading.BoundedSemaphore(max(1, self.concurrency))
+
+    def query(self, product: str) -> str:
+        return self.query_template.format(product=product.strip(), domain=self.domain)
+
+    def reword(self, query: str) -> Optional[str]:
+        """Fallback wording for a query that found no price: '<q> price site:<domain>'"""
+        head, sep, site = query.partition(" site:")
+        if "price" in head.lower():
+            return None
+        return f"{head} price{sep}{site}"
+
+    def extract(self, result: Dict[str, Any]) -> Optional[float]:
+        return self.extractor(result) if isinstance(result, dict) else None
+
+    def first_price(self, organic: Iterable[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], float]]:
+        for result in organic or []:
+            price = self.extract(result)
+            if price:
+                return result, price
+        return None
+
+    def search(self, product: str, deadline: Deadline, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return platform_search(self.query(product), self.key, deadline, category)
+
+
+PLATFORMS: Dict[str, PlatformAdapter] = {a.key: a for a in [
+    PlatformAdapter("amazon", "Amazon", "amazon.in"),
+    PlatformAdapter("flipkart", "Flipkart", "flipkart.com"),
+    PlatformAdapter("jiomart", "JioMart", "jiomart.com"),
+    PlatformAdapter("zepto", "Zepto", "zepto.in"),
+    PlatformAdapter("blinkit", "Blinkit", "blinkit.com"),
+    PlatformAdapter("bigbasket", "BigBasket", "bigbasket.com"),
+]}
+
+
+def get_platform(key: str) -> Optional[PlatformAdapter]:
+    return PLATFORMS.get((key or "").lower())
+
+
+def adapter_for_url(url: str) -> Optional[PlatformAdapter]:
+    host = (urlparse(url or "").netloc or "").lower()
+    for adapter in PLATFORMS.values():
+        if host == adapter.domain or host.endswith("." + adapter.domain):
+            return adapter
+    return None
+
+
+class DeepeningStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"searches": 0, "shallow_hits": 0, "deepened": 0, "reworded": 0, "recovered": 0, "no_price": 0}
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, n in counts.items():
+                self.counts[name] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counts, "shallow_num": SHALLOW_NUM, "deep_num": DEEP_NUM}
+
+
+deepening = DeepeningStats()
+
+
+def deepened_search(adapter: PlatformAdapter, query: str, key: str, deadline: Deadline) -> Optional[Dict[str, Any]]:
+    """
+    SHALLOW_NUM results first; DEEP_NUM (skipped if the shallow search came back
+    short), then the reworded query, only while no result has a price. Returns the first response with a price, else the last
+    one that came back (None if the first search got nothing).
+    """
+    steps = [(query, SHALLOW_NUM)]
+    if DEEP_NUM > SHALLOW_NUM:
+        steps.append((query, DEEP_NUM))
+    reworded = adapter.reword(query)
+    if reworded:
+        steps.append((reworded, DEEP_NUM))
+
+    data, last, priced = None, 0, False
+    for step, (q, num) in enumerate(steps):
+        if step and deadline.expired:
+            break
+        if step and q == query and len(data.get("organic") or []) < SHALLOW_NUM:
+            continue  # the shallow search already got every result there is (each search is billed)
+        response = hedged_search(q, key, deadline, num=num)
+        if response is None:
+            break
+        data, last = response, step
+        priced = adapter.first_price(data.get("organic") or []) is not None
+        if priced:
+            break
+    if data is not None:
+        deepening.add(searches=1, shallow_hits=int(priced and last == 0), recovered=int(priced and last > 0),
+                      no_price=int(not priced), deepened=int(last > 0), reworded=int(steps[last][0] != query))
+    return data
+
+
+def platform_search(query: str, key: str, deadline: Deadline, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    deepened_search under the platform's concurrency limit and circuit breaker.
+    None if no slot frees up in time, the breaker is open, or nothing came back.
+    """
+    adapter = get_platform(key)
+    if adapter is None:
+        return hedged_search(query, key, deadline)
+    if deadline.expired:
+        return None
+    if not adapter._slots.acquire(timeout=deadline.remaining()):
+        print(f"[platforms] no search slot for {key!r} within budget")
+        return None
+    try:
+        breakers = get_breakers()
+        if not breakers.allow(key, category):
+            print(f"[platforms] circuit open for {key!r} ({category or 'all categories'}), skipping")
+            return None
+        outcome = ERROR
+        try:
+            with profiled_call():  # no-op unless the calling request is being profiled
+                data = deepened_search(adapter, query, key, deadline)
+                if data is not None:
+                    outcome = OK if adapter.first_price(data.get("organic") or []) else EMPTY
+                elif deadline.expired:
+                    outcome = ABANDONED  # out of the caller's budget, not the platform's fault
+            return data
+        finally:
+            breakers.record(key, category, outcome)
+    finally:
+        adapter._slots.release()
+
+
+async def platform_search_async(
+    query: str, key: str, deadline: Deadline, category: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    # carry the caller's context (request profile) into the worker thread
+    call = functools.partial(contextvars.copy_context().run, platform_search, query, key, deadline, category)
+    return await loop.run_in_executor(_WAIT_POOL, call)
+
+
+async def search_all_platforms(
+    product: str,
+    deadline: Deadline,
+    keys: Optional[List[str]] = None,
+    category: Optional[str] = None,
+) -> Tuple[Dict[str, Optional[Dict[str, Any]]], List[str]]:
+    """
+    One search per platform, in parallel: ({key: serper json or None}, skipped),
+    where skipped are platforms whose circuit breaker is open.
+    """
+    keys = [k for k in (keys or PLATFORMS) if k in PLATFORMS]
+    skipped = get_breakers().open_platforms(keys, category)
+    keys = [k for k in keys if k not in skipped]
+    responses = await asyncio.gather(*(
+        platform_search_async(PLATFORMS[k].query(product), k, deadline, category) for k in keys
+    ))
+    return dict(zip(keys, responses)), skipped
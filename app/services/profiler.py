@@ -0,0 +1,183 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# Profiling for latency spikes, admin-only and idle unless asked for:
+#  - sample_stacks(): samples every thread's stack (event loop included) for N
+#    seconds and returns collapsed stacks ("a;b;c count"), the input format of
+#    flamegraph.pl and speedscope;
+#  - RequestProfile: a deterministic cProfile of one request, including the
+#    worker threads that run its platform searches (see profiled_call).
+# Nothing is installed or started until one of them is used.
+
+MAX_PROFILE_S = float(os.getenv("PROFILE_MAX_S", 60))
+SAMPLE_INTERVAL_S = 0.005
+PROFILE_HEADER = "x-profile"       # per-request capture: "X-Profile: 1"
+KEEP_REQUEST_PROFILES = 20
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+_sampling = threading.Lock()  # one sampler at a time
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval_s: float = SAMPLE_INTERVAL_S,
+                  thread_labels: Optional[Dict[int, str]] = None) -> Dict[str, int]:
+    """
+    {collapsed stack: samples} over all threads but the sampler's own, roots
+    first and prefixed with the thread name. Raises ProfilerBusy if another
+    sample is running.
+    """
+    if not _sampling.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        seconds = min(max(seconds, 0.0), MAX_PROFILE_S)
+        interval_s = max(interval_s, 0.001)
+        me = threading.get_ident()
+        counts: Dict[str, int] = {}
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            names.update(thread_labels or {})
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            time.sleep(interval_s)
+        return counts
+    finally:
+        _sampling.release()
+
+
+def collapsed(counts: Dict[str, int]) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def top_frames(counts: Dict[str, int], limit: int = 25) -> List[Dict[str, object]]:
+    """Leaf frames by share of samples (where threads were actually sitting)"""
+    total = sum(counts.values()) or 1
+    leaves: Dict[str, int] = {}
+    for stack, n in counts.items():
+        leaf = stack.rsplit(";", 1)[-1]
+        leaves[leaf] = leaves.get(leaf, 0) + n
+    ranked = sorted(leaves.items(), key=lambda kv: -kv[1])[:limit]
+    return [{"frame": leaf, "samples": n, "share": round(n / total, 4)} for leaf, n in ranked]
+
+
+# -------------------------
+# Per-request deterministic profiles
+# -------------------------
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_recent: "OrderedDict[str, str]" = OrderedDict()
+_recent_lock = threading.Lock()
+_active_threads = set()  # threads with a RequestProfile running (cProfile allows one per thread)
+
+
+class RequestProfile:
+    """
+    cProfile for one request. Work it hands to other threads is profiled too
+    wherever that work goes through profiled_call() (platform searches), and
+    merged into the same stats.
+    """
+
+    def __init__(self, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._thread = None
+        self._token = None
+        self._profile = None
+
+    def add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def __enter__(self):
+        """Raises ProfilerBusy if this thread is already profiling a request"""
+        thread = threading.get_ident()
+        with _recent_lock:
+            if thread in _active_threads:
+                raise ProfilerBusy("another request is being profiled on this thread")
+            _active_threads.add(thread)
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:  # 3.12+: another profiler holds the interpreter-wide hook
+            with _recent_lock:
+                _active_threads.discard(thread)
+            raise ProfilerBusy(str(e))
+        self._thread = thread
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self._profile.disable()
+        _current.reset(self._token)
+        with _recent_lock:
+            _active_threads.discard(self._thread)
+        self.add(self._profile)
+        with _recent_lock:
+            _recent[self.id] = self.report()
+            while len(_recent) > KEEP_REQUEST_PROFILES:
+                _recent.popitem(last=False)
+        return False
+
+    def report(self, limit: int = 40) -> str:
+        out = io.StringIO()
+        out.write(f"# profile {self.id} {self.label}\n")
+        with self._lock:
+            if self._stats is not None:
+                self._stats.stream = out
+                self._stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+@contextmanager
+def profiled_call():
+    """Profile this block into the current request's profile, if there is one"""
+    profile = _current.get()
+    if profile is None or profile._thread == threading.get_ident():
+        yield
+        return
+    worker = cProfile.Profile()
+    try:
+        worker.enable()
+    except ValueError:  # 3.12+: one profiler at a time; run this block unprofiled
+        yield
+        return
+    try:
+        yield
+    finally:
+        worker.disable()
+        profile.add(worker)
+
+
+def get_request_profile(profile_id: str) -> Optional[str]:
+    with _recent_lock:
+        return _recent.get(profile_id)
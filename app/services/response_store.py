@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Two-tier cache of Serper responses, keyed on the normalized query:
+#   1. an in-process LRU (per worker, microseconds);
+#   2. a compressed SQLite store in WAL mode on local disk, shared by every
+#      worker process on the host and kept across restarts and deploys.
+# Writes and compaction happen on one background thread per process, so a
+# request never waits on the database lock; reads are plain indexed SELECTs
+# (WAL readers don't block on the writer) on a per-thread connection.
+
+CACHE_PATH = os.getenv("SERPER_CACHE_PATH", ".cache/serper_responses.sqlite")  # "" disables tier 2
+CACHE_TTL_S = float(os.getenv("SERPER_CACHE_TTL_S", 3600))                     # 0 disables caching
+MEMORY_ENTRIES = int(os.getenv("SERPER_MEMORY_CACHE", 1024))
+COMPACT_INTERVAL_S = float(os.getenv("SERPER_CACHE_COMPACT_S", 300))
+COMPRESS_LEVEL = 6
+WRITE_QUEUE_MAX = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    body BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires);
+"""
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """Same search, same key: "Amul  Butter" and "amul butter" share an entry"""
+    normalized = {**payload, "q": normalize_query(payload.get("q", ""))}
+    blob = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _encode(data: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(), COMPRESS_LEVEL)
+
+
+def _decode(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob))
+
+
+class MemoryTier:
+    """LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, data: Dict[str, Any], expires: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskTier:
+    """Compressed responses in SQLite (WAL), shared by processes on this host"""
+
+    def __init__(self, path: str = CACHE_PATH, compact_interval_s: float = COMPACT_INTERVAL_S):
+        self.path = path
+        self.compact_interval_s = compact_interval_s
+        self._local = threading.local()
+        self._writes: "queue.Queue[Tuple[str, str, bytes, float]]" = queue.Queue(maxsize=WRITE_QUEUE_MAX)
+        self.stats = {"writes": 0, "dropped_writes": 0, "compactions": 0, "expired_removed": 0, "errors": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="serper-store", daemon=True)
+        self._writer.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(data, expires) or None"""
+        try:
+            row = self._conn().execute(
+                "SELECT body, expires FROM responses WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+            return (_decode(row[0]), row[1]) if row else None
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            self.stats["errors"] += 1
+            print(f"[serper-store] read failed: {e}")
+            return None
+
+    def put(self, key: str, query: str, data: Dict[str, Any], expires: float) -> None:
+        """Queued for the writer thread; dropped (not blocked on) if the queue is full"""
+        try:
+            self._writes.put_nowait((key, query, _encode(data), expires))
+        except queue.Full:
+            self.stats["dropped_writes"] += 1
+
+    def _write_loop(self) -> None:
+        next_compact = time.monotonic() + self.compact_interval_s
+        while True:
+            try:
+                item = self._writes.get(timeout=max(next_compact - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = None
+            try:
+                if item is not None:
+                    batch = [item]
+                    while len(batch) < 100:
+                        try:
+                            batch.append(self._writes.get_nowait())
+                        except queue.Empty:
+                            break
+                    try:
+                        self._write(batch)
+                    finally:
+                        for _ in batch:
+                            self._writes.task_done()
+                if time.monotonic() >= next_compact:
+                    self.compact()
+                    next_compact = time.monotonic() + self.compact_interval_s
+            except sqlite3.Error as e:
+                self.stats["errors"] += 1
+                print(f"[serper-store] write failed: {e}")
+
+    def _write(self, batch) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO responses (key, query, body, expires) VALUES (?, ?, ?, ?)", batch)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self.stats["writes"] += len(batch)
+
+    def compact(self) -> int:
+        """Drop expired entries and fold the WAL back into the main file"""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),)).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.stats["compactions"] += 1
+        self.stats["expired_removed"] += removed
+        return removed
+
+    def flush(self) -> None:
+        """Wait until queued writes are on disk"""
+        self._writes.join()
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseStore:
+    def __init__(self, ttl_s: float = CACHE_TTL_S, memory: Optional[MemoryTier] = None,
+                 disk: Optional[DiskTier] = None):
+        self.ttl_s = ttl_s
+        self.memory = memory or MemoryTier()
+        self.disk = disk
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0
+
+    def get_memory(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Tier 1 only: safe to call on the event loop"""
+        if not self.enabled:
+            return None
+        data = self.memory.get(cache_key(payload))
+        if data is not None:
+            self.stats["memory_hits"] += 1
+        return data
+
+    def get(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Both tiers; tier 2 is a disk read, so call from a worker thread"""
+        if not self.enabled:
+            return None
+        key = cache_key(payload)
+        data = self.memory.get(key)
+        if data is not None:
+            self.stats["memory_hits"] += 1
+            return data
+        if self.disk is not None:
+            hit = self.disk.get(key)
+            if hit is not None:
+                self.stats["disk_hits"] += 1
+                self.memory.put(key, hit[0], hit[1])
+                return hit[0]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, payload: Dict[str, Any], data: Any) -> None:
+        if not self.enabled or not isinstance(data, dict):
+            return
+        key = cache_key(payload)
+        expires = time.time() + self.ttl_s
+        self.memory.put(key, data, expires)
+        if self.disk is not None:
+            self.disk.put(key, normalize_query(payload.get("q", "")), data, expires)
+        self.stats["stored"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        out: Dict[str, Any] = {
+            **self.stats,
+            "hit_rate": round((lookups - self.stats["misses"]) / lookups, 3) if lookups else None,
+            "memory_entries": len(self.memory),
+            "ttl_s": self.ttl_s,
+        }
+        if self.disk is not None:
+            out["disk"] = {**self.disk.stats, "path": self.disk.path}
+        return out
+
+
+def get_response_store() -> ResponseStore:
+    """Process-wide store; the disk tier is skipped if SERPER_CACHE_PATH is empty or unusable"""
+    if not hasattr(get_response_store, "_store"):
+        disk = None
+        if CACHE_PATH and CACHE_TTL_S > 0:
+            try:
+                disk = DiskTier(CACHE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                print(f"[serper-store] disk tier disabled: {e}")
+        get_response_store._store = ResponseStore(memory=MemoryTier(), disk=disk)
+    return get_response_store._store
@@ -0,0 +1,68 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Response shaping for the hot endpoints: field selection, pagination,
+# a faster JSON encoder and gzip above a size threshold.
+
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", 4096))
+GZIP_LEVEL = 5
+
+try:
+    import orjson  # optional, ~5-10x faster than json for these payloads
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:  # pragma: no cover - fallback when orjson isn't installed
+    orjson = None
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_line(obj: Any) -> bytes:
+    """One NDJSON line"""
+    return dumps(obj) + b"\n"
+
+
+def select_fields(item: Optional[Mapping[str, Any]], fields: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+    if item is None or not fields:
+        return item
+    return {k: item[k] for k in fields if k in item}
+
+
+def paginate(items: Sequence[Any], offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Any], Dict[str, Any]]:
+    offset = max(int(offset or 0), 0)
+    end = len(items) if limit is None else offset + max(int(limit), 0)
+    page = list(items[offset:end])
+    return page, {"total": len(items), "offset": offset, "limit": limit, "returned": len(page)}
+
+
+class FastJSONResponse(Response):
+    """JSON via orjson (when installed), gzip-compressed when large and accepted."""
+    media_type = "application/json"
+
+    def __init__(self, content: Any, request: Optional[Request] = None, status_code: int = 200,
+                 headers: Optional[Dict[str, str]] = None):
+        body = dumps(content)
+        headers = dict(headers or {})
+        if request is not None and len(body) >= GZIP_MIN_BYTES and _accepts_gzip(request):
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        super().__init__(content=body, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def shape_offers(offers: Iterable[Mapping[str, Any]], fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    return [select_fields(o, fields) for o in offers]
@@ -1,9 +1,139 @@
 import os
+import queue
+import threading
+import time
 import requests
 import asyncio
-from typing import Any, Dict, List
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
 
-SERPER_URL = "https://google.serper.dev/search"
+from .budget import Deadline, latency
+from .response_store import get_response_store
+
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+
+# Serper calls for hedged searches; sized for several requests fanning out at once
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("SERPER_POOL_SIZE", 32)), thread_name_prefix="serper")
+
+# Threads for async callers of the blocking searches (hedged_search, platform_search),
+# which hold one for up to three sequential searches. Kept apart from _SEARCH_POOL,
+# whose sends they wait on, and from the default executor (cache disk reads).
+_WAIT_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("SERPER_WAIT_POOL_SIZE", 64)), thread_name_prefix="serper-wait")
+
+# Micro-batching: queries issued within this window go out as one multi-query POST
+BATCH_WINDOW_S = float(os.getenv("SERPER_BATCH_WINDOW_MS", 10)) / 1000.0
+BATCH_MAX_QUERIES = int(os.getenv("SERPER_BATCH_MAX", 20))
+
+# results per search unless the caller asks otherwise (see platforms.py for deepening)
+DEFAULT_NUM = 5
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {
+        "X-API-KEY": api_key,
+        "Content-Type": "application/json",
+    }
+
+
+class SerperBatcher:
+    """
+    Collects queries submitted within a short window and sends them as one
+    Serper request with a JSON array body; each caller gets back a Future for
+    its own result, resolving to (json, seconds since submit).
+
+    Identical payloads in the same batch are sent once. A batch of one goes
+    out as a plain single-query request.
+    """
+
+    def __init__(
+        self,
+        url: str = SERPER_URL,
+        window_s: float = BATCH_WINDOW_S,
+        max_batch: int = BATCH_MAX_QUERIES,
+        executor: ThreadPoolExecutor = _SEARCH_POOL,
+    ):
+        self.url = url
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.executor = executor
+        self.batches_sent = 0
+        self.queries_sent = 0
+        self._queue: "queue.Queue[Tuple[Dict[str, Any], str, float, float, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, payload: Dict[str, Any], api_key: str, timeout: float, direct: bool = False) -> Future:
+        """direct=True skips batching (a batch is as slow as its slowest query)."""
+        future: Future = Future()
+        if direct or self.window_s <= 0:
+            self.executor.submit(self._send, [(payload, api_key, timeout, time.monotonic(), future)])
+            return future
+        self._ensure_thread()
+        self._queue.put((payload, api_key, timeout, time.monotonic(), future))
+        return future
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect, name="serper-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            closes_at = time.monotonic() + self.window_s
+            while len(batch) < self.max_batch:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_key: Dict[str, list] = {}
+            for item in batch:
+                by_key.setdefault(item[1], []).append(item)
+            for items in by_key.values():
+                self.executor.submit(self._send, items)
+
+    def _send(self, items: list) -> None:
+        # de-duplicate identical payloads; remember which callers wait on each
+        unique: Dict[Tuple, Dict[str, Any]] = {}
+        waiters: Dict[Tuple, list] = {}
+        for payload, _, _, submitted, future in items:
+            k = tuple(sorted(payload.items()))
+            unique.setdefault(k, payload)
+            waiters.setdefault(k, []).append((submitted, future))
+
+        api_key = items[0][1]
+        timeout = max(item[2] for item in items)
+        keys = list(unique)
+        body: Any = unique[keys[0]] if len(keys) == 1 else [unique[k] for k in keys]
+
+        try:
+            response = requests.post(self.url, json=body, headers=_headers(api_key), timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            results = [data] if len(keys) == 1 else data
+            if not isinstance(results, list) or len(results) != len(keys):
+                raise ValueError(f"expected {len(keys)} results, got {type(results).__name__}")
+        except Exception as e:
+            for k in keys:
+                for _, future in waiters[k]:
+                    future.set_exception(e)
+            return
+
+        self.batches_sent += 1
+        self.queries_sent += len(keys)
+        now = time.monotonic()
+        for k, result in zip(keys, results):
+            for submitted, future in waiters[k]:
+                future.set_result((result, now - submitted))
+
+
+_batcher = SerperBatcher()
 
 
 def search_product(query: str) -> Dict[str, Any]:
@@ -15,44 +145,60 @@ def search_product(query: str) -> Dict[str, Any]:
     if not api_key:
         raise RuntimeError("SERPER_API_KEY not set")
 
-    headers = {
-        "X-API-KEY": api_key,
-        "Content-Type": "application/json",
-    }
     payload = {"q": query, "num": 5}
-
-    response = requests.post(SERPER_URL, json=payload, headers=headers, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    store = get_response_store()
+    cached = store.get(payload)
+    if cached is not None:
+        return cached
+    data, _ = _batcher.submit(payload, api_key, timeout=30).result()
+    store.put(payload, data)
+    return data
 
 
-async def serper_search(query: str) -> List[Dict[str, Any]]:
+def hedged_search(query: str, key: str, deadline: Deadline, num: int = DEFAULT_NUM) -> Optional[Dict[str, Any]]:
     """
-    Used by the agents.
-    Returns ONLY the list of organic results (list of dicts).
-    On any failure, returns [] so downstream code won't crash.
+    Full Serper JSON for `query` (`num` results), or None if nothing came back before the deadline.
+
+    If the first request is still running after the observed p95 for `key`
+    (usually the platform), or fails, a duplicate request is sent and whichever
+    answers first wins. Losing requests finish in the background and are discarded.
     """
     api_key = os.getenv("SERPER_API_KEY")
-    if not api_key:
-        return []
+    if not api_key or deadline.expired:
+        return None
+
+    payload = {"q": query, "num": num}
+    store = get_response_store()
+    cached = store.get(payload)
+    if cached is not None:
+        return cached
+
+    pending = {_batcher.submit(payload, api_key, deadline.remaining())}
+    hedged = False
+    while pending and not deadline.expired:
+        wait_s = deadline.remaining() if hedged else min(latency.p95(key), deadline.remaining())
+        done, pending = wait(pending, timeout=wait_s, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                data, elapsed = future.result()
+            except Exception as e:
+                print(f"[hedged_search] failed for query={query!r}: {e}")
+                continue
+            latency.observe(key, elapsed)
+            store.put(payload, data)
+            return data
+
+        # slower than p95 (or failed fast): send one duplicate request, on its own
+        # so it can't be held up by a slow query in the same batch
+        if not hedged and not deadline.expired:
+            hedged = True
+            print(f"[hedged_search] hedging {key!r} after p95={latency.p95(key):.2f}s")
+            pending.add(_batcher.submit(payload, api_key, deadline.remaining(), direct=True))
+
+    print(f"[hedged_search] no result for {key!r} within budget")
+    return None
 
-    headers = {
-        "X-API-KEY": api_key,
-        "Content-Type": "application/json",
-    }
-    payload = {"q": query, "num": 5}
 
-    try:
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: requests.post(SERPER_URL, json=payload, headers=headers, timeout=30),
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        organic = data.get("organic", [])
-        return organic if isinstance(organic, list) else []
-    except Exception as e:
-        print(f"[serper_search] failed for query={query!r}: {e}")
-        return []
+async def hedged_search_async(query: str, key: str, deadline: Deadline) -> Optional[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_WAIT_POOL, hedged_search, query, key, deadline)
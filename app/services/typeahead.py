@@ -0,0 +1,129 @@
+import re
+import threading
+from typing import Dict, List, Optional, Set
+
+# In-memory product typeahead. Every word prefix of every product name is
+# precomputed, so a lookup is a few dict hits and a small sort (well under 1ms).
+# Character trigrams back it up for typos ("amul buter").
+
+MAX_PREFIX = 15
+MAX_ENTRIES = 20000
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _trigrams(text: str) -> Set[str]:
+    s = f"  {' '.join(_words(text))} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class TypeaheadIndex:
+    """
+    Prefix + trigram index over canonical product names, ranked by popularity.
+    Catalog entries get a base weight; every search of a name adds to it.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._names: Dict[str, str] = {}            # key -> display name
+        self._category: Dict[str, Optional[str]] = {}
+        self._score: Dict[str, float] = {}
+        self._prefixes: Dict[str, Set[str]] = {}    # word prefix -> keys
+        self._trigrams: Dict[str, Set[str]] = {}    # trigram -> keys
+
+    @staticmethod
+    def key(name: str) -> str:
+        return " ".join(_words(name))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, weight: float = 1.0, category: Optional[str] = None) -> None:
+        key = self.key(name)
+        if not key:
+            return
+        with self._lock:
+            if key in self._names:
+                self._score[key] += weight
+                if category and not self._category.get(key):
+                    self._category[key] = category
+                return
+            if len(self._names) >= self.max_entries:
+                self._evict_one()
+            self._names[key] = name.strip()
+            self._category[key] = category
+            self._score[key] = weight
+            for word in key.split():
+                for i in range(1, min(len(word), MAX_PREFIX) + 1):
+                    self._prefixes.setdefault(word[:i], set()).add(key)
+            for g in _trigrams(key):
+                self._trigrams.setdefault(g, set()).add(key)
+
+    def record(self, name: str, category: Optional[str] = None) -> None:
+        """Count a search for a canonical product (adds it if new)."""
+        self.add(name, weight=1.0, category=category)
+
+    def _evict_one(self) -> None:
+        key = min(self._score, key=self._score.__getitem__)
+        for word in key.split():
+            for i in range(1, min(len(word), MAX_PREFIX) + 1):
+                bucket = self._prefixes.get(word[:i])
+                if bucket:
+                    bucket.discard(key)
+        for g in _trigrams(key):
+            bucket = self._trigrams.get(g)
+            if bucket:
+                bucket.discard(key)
+        del self._names[key], self._category[key], self._score[key]
+
+    def _prefix_candidates(self, words: List[str]) -> Set[str]:
+        # every typed word must prefix-match some word of the name
+        result: Optional[Set[str]] = None
+        for w in words:
+            bucket = self._prefixes.get(w[:MAX_PREFIX], set())
+            if len(w) > MAX_PREFIX:
+                bucket = {k for k in bucket if any(x.startswith(w) for x in k.split())}
+            result = set(bucket) if result is None else result & bucket
+            if not result:
+                return set()
+        return result or set()
+
+    def suggest(self, text: str, limit: int = 8, category: Optional[str] = None) -> List[Dict[str, object]]:
+        words = _words(text)
+        if not words:
+            return []
+
+        with self._lock:
+            candidates = self._prefix_candidates(words)
+            fuzzy = not candidates
+            if fuzzy:
+                grams = _trigrams(" ".join(words))
+                overlap: Dict[str, int] = {}
+                for g in grams:
+                    for k in self._trigrams.get(g, ()):
+                        overlap[k] = overlap.get(k, 0) + 1
+                need = max(2, len(grams) // 2)
+                candidates = {k for k, n in overlap.items() if n >= need}
+
+            if category:
+                candidates = {k for k in candidates if self._category.get(k) in (None, category)}
+
+            ranked = sorted(candidates, key=lambda k: (-self._score[k], len(k)))[:limit]
+            return [
+                {"name": self._names[k], "category": self._category[k], "score": self._score[k]}
+                for k in ranked
+            ]
+
+
+def build_catalog_index(products_by_category: Dict[str, List[str]], catalog_weight: float = 5.0) -> TypeaheadIndex:
+    """Seed the index from the static catalog; catalog items start ahead of one-off searches."""
+    index = TypeaheadIndex()
+    for category, names in products_by_category.items():
+        for name in names:
+            index.add(name, weight=catalog_weight, category=category)
+    return index
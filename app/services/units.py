@@ -0,0 +1,166 @@
+import re
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Pack sizes in canonical base units, so offers of different sizes are priced
+# on the same scale: "1 L" and "500 ml" are 1000 and 500 ml, "2 x 500 g" and
+# "1 kg" are both 1000 g. Prices per unit are reported per kg / l / piece.
+
+# unit spelling -> (base unit, multiplier to base)
+UNITS = {
+    "mg": ("g", 0.001),
+    "g": ("g", 1.0), "gm": ("g", 1.0), "gms": ("g", 1.0), "gram": ("g", 1.0), "grams": ("g", 1.0),
+    "kg": ("g", 1000.0), "kgs": ("g", 1000.0), "kilo": ("g", 1000.0), "kilogram": ("g", 1000.0),
+    "ml": ("ml", 1.0), "cl": ("ml", 10.0),
+    "l": ("ml", 1000.0), "ltr": ("ml", 1000.0), "ltrs": ("ml", 1000.0),
+    "litre": ("ml", 1000.0), "litres": ("ml", 1000.0), "liter": ("ml", 1000.0), "liters": ("ml", 1000.0),
+    "pc": ("pcs", 1.0), "pcs": ("pcs", 1.0), "piece": ("pcs", 1.0), "pieces": ("pcs", 1.0),
+    "dozen": ("pcs", 12.0),
+}
+
+DIMENSIONS = {"g": "mass", "ml": "volume", "pcs": "count"}
+
+# base unit -> (unit prices are quoted per, base units in it)
+PRICE_BASIS = {"g": ("kg", 1000.0), "ml": ("l", 1000.0), "pcs": ("pc", 1.0)}
+
+_NAN = float("nan")
+
+_UNIT = "|".join(sorted(map(re.escape, UNITS), key=len, reverse=True))
+_NUM = r"(\d+(?:\.\d+)?)"
+_X = r"\s*[x×*]\s*"
+# "2 x 500 g", "2x500g"
+_COUNT_FIRST_RE = re.compile(rf"\b(\d{{1,3}}){_X}{_NUM}\s*({_UNIT})\b")
+# "500 g x 2"
+_SIZE_FIRST_RE = re.compile(rf"\b{_NUM}\s*({_UNIT}){_X}(\d{{1,3}})\b")
+_SIZE_RE = re.compile(rf"\b{_NUM}\s*({_UNIT})\b")
+# "pack of 3", "set of 2", "3 pack"
+_PACK_RE = re.compile(r"\b(?:pack|set|combo)\s+of\s+(\d{1,3})\b|\b(\d{1,3})\s*-?\s*(?:pack|packs)\b")
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3}\b)")
+_NETWORK_RE = re.compile(r"\b[2-5]g\b")  # "5G phone", not five grams...
+# ...but only in a phone title ("Saffron 2g" is two grams)
+_PHONE_RE = re.compile(
+    r"\b\d+\s*(?:gb|tb)\b|\b(?:ram|rom|phone|mobile|smartphone|android|volte|lte|dual sim|"
+    r"iphone|galaxy|samsung|redmi|xiaomi|realme|oneplus|pixel|vivo|oppo|poco|iqoo|moto|motorola|"
+    r"nokia|lava|tecno|infinix|honor|nothing)\b"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Quantity:
+    amount: float  # total, in the base unit (all packs)
+    unit: str      # g | ml | pcs
+    packs: int = 1
+
+    @property
+    def dimension(self) -> str:
+        return DIMENSIONS[self.unit]
+
+    def key(self) -> str:
+        """'1000g', '500ml', '6pcs'"""
+        return f"{self.amount:g}{self.unit}"
+
+
+def to_base(size: float, unit: str) -> Optional[Tuple[float, str]]:
+    """(amount in base unit, base unit), or None for an unknown unit"""
+    known = UNITS.get((unit or "").strip().lower())
+    if known is None:
+        return None
+    base, mult = known
+    return float(size) * mult, base
+
+
+def _find_quantity(text: str) -> Optional[Tuple[Quantity, List[Tuple[int, int]]]]:
+    """(quantity, spans of the words it was read from) in lowercased, comma-free text"""
+    if _NETWORK_RE.search(text):
+        # "2g"-"5g" is a network generation with phone context or another size beside it
+        without = _NETWORK_RE.sub(lambda m: " " * len(m.group()), text)  # keeps offsets
+        if _PHONE_RE.search(text) or _SIZE_RE.search(without):
+            text = without
+
+    m = _COUNT_FIRST_RE.search(text)
+    if m:
+        packs, size, unit = int(m.group(1)), m.group(2), m.group(3)
+        spans = [m.span()]
+    else:
+        m = _SIZE_FIRST_RE.search(text)
+        if m:
+            size, unit, packs = m.group(1), m.group(2), int(m.group(3))
+            spans = [m.span()]
+        else:
+            m = _SIZE_RE.search(text)
+            pack = _PACK_RE.search(text)
+            packs = int(pack.group(1) or pack.group(2)) if pack else 1
+            spans = [pack.span()] if pack else []
+            if not m:
+                # "Pack of 6" with no size: six pieces
+                return (Quantity(float(packs), "pcs", packs), spans) if pack and packs > 1 else None
+            size, unit = m.group(1), m.group(2)
+            spans.append(m.span())
+
+    amount, base = to_base(float(size), unit)
+    packs = max(packs, 1)
+    if amount <= 0:
+        return None
+    return Quantity(amount * packs, base, packs), spans
+
+
+def _prepare(text: str) -> str:
+    return _THOUSANDS_RE.sub("", (text or "").lower())
+
+
+@lru_cache(maxsize=16384)
+def parse_quantity(text: str) -> Optional[Quantity]:
+    """
+    Pack size in a title or query, multipacks included:
+    '2 x 500 g' -> 1000 g in 2 packs, 'Amul Butter 100g (Pack of 3)' -> 300 g,
+    'Eggs 1 dozen' -> 12 pcs. None when no size is found.
+    """
+    found = _find_quantity(_prepare(text))
+    return found[0] if found else None
+
+
+def split_quantity(text: str) -> Tuple[Optional[Quantity], str]:
+    """(parse_quantity(text), the lowercased text with the size words blanked out)"""
+    text = _prepare(text)
+    found = _find_quantity(text)
+    if not found:
+        return None, text
+    for start, end in found[1]:
+        text = text[:start] + " " * (end - start) + text[end:]
+    return found[0], text
+
+
+def parse_quantities(texts: Iterable[str]) -> List[Optional[Quantity]]:
+    """parse_quantity over many titles (memoized, so repeated titles are free)"""
+    return [parse_quantity(t) for t in texts]
+
+
+def unit_prices(
+    prices: Sequence[float],
+    quantities: Sequence[Optional[Quantity]],
+    multiplier: float = 1.0,
+) -> Tuple[array, List[Optional[str]]]:
+    """
+    Price per kg / l / piece for every offer in one pass: (array of unit prices,
+    basis per offer, e.g. "kg"). NaN / None where the price or size is unknown.
+    `multiplier` scales the amount (e.g. order quantity).
+    """
+    out = array("d", [_NAN]) * len(prices)
+    bases: List[Optional[str]] = [None] * len(prices)
+    for i, (price, q) in enumerate(zip(prices, quantities)):
+        if q is None or q.amount <= 0 or price is None or price != price:
+            continue
+        per, scale = PRICE_BASIS[q.unit]
+        out[i] = price / (q.amount * multiplier / scale)
+        bases[i] = per
+    return out, bases
+
+
+def common_basis(bases: Iterable[Optional[str]]) -> Optional[str]:
+    """The single basis shared by all entries, or None if any is missing or they differ"""
+    seen = set(bases)
+    if len(seen) != 1 or None in seen:
+        return None
+    return seen.pop()
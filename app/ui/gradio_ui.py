@@ -1,6 +1,7 @@
 import gradio as gr
 import requests
 import json
+import time
 import pandas as pd
 
 MASTER_CATEGORIES = ["grocery", "electronics", "fashion", "beauty"]
@@ -40,38 +41,88 @@ PRODUCTS_BY_CATEGORY = {
 API_URL = "http://127.0.0.1:8000/compare"
 ANOMALY_API_URL = "http://127.0.0.1:8000/detect-anomalies"  # 🆕 NEW
 ARBITRAGE_API_URL = "http://127.0.0.1:8000/platform-arbitrage"
+SUGGEST_API_URL = "http://127.0.0.1:8000/suggest"
+JOBS_API_URL = "http://127.0.0.1:8000/jobs"
+
+SUGGEST_MIN_CHARS = 2
+
+JOB_POLL_S = 1.0
+JOB_WAIT_S = 900  # give up polling after this; the job keeps running server-side
+
+
+def run_job(kind, params):
+    """Submit a background job and yield its status until it finishes (or we stop waiting)"""
+    r = requests.post(JOBS_API_URL, json={"kind": kind, "params": params}, timeout=10)
+    if r.status_code == 400:
+        raise ValueError(r.json().get("detail", "Invalid request"))
+    r.raise_for_status()
+    job_id = r.json()["id"]
+    give_up_at = time.monotonic() + JOB_WAIT_S
+    while True:
+        s = requests.get(f"{JOBS_API_URL}/{job_id}", timeout=10)
+        s.raise_for_status()
+        job = s.json()
+        yield job
+        if job["status"] in ("done", "failed"):
+            return
+        if time.monotonic() > give_up_at:
+            raise TimeoutError(f"job {job_id} still {job['status']} after {JOB_WAIT_S}s")
+        time.sleep(JOB_POLL_S)
+
+
+def job_progress_text(job):
+    progress = job.get("progress", {})
+    done = progress.get("completed", 0)
+    total = progress.get("total") or "?"
+    return f"⏳ {job.get('status', 'queued')}: {done}/{total} steps done"
 
 
 
 # ==================== TAB 1: EXISTING PRICE COMPARISON ====================
 def fetch_prices(master_category, category, product_name):
-    """Existing function - keep as-is"""
+    """Runs /compare as a background job and polls it, showing progress in the JSON box"""
     if not master_category or not category or not product_name:
-        return [], "[]"
-
-    response = requests.post(
-        API_URL,
-        params={
-            "master_category": master_category,
-            "category": category,
-            "product_name": product_name,
-        },
-        timeout=120,
-    )
-    response.raise_for_status()
-    data = response.json()
-
-    if isinstance(data, dict) and "error" in data:
-        return [["Error", data["error"], ""]], json.dumps({"error": data["error"]})
-
-    # Ensure data is a list before processing
-    if not isinstance(data, list):
-        return [["Error", "Invalid response format", ""]], json.dumps({"error": "Invalid response format"})
+        yield [], "[]"
+        return
+
+    params = {
+        "master_category": master_category,
+        "category": category,
+        "product_name": product_name,
+    }
+    try:
+        for job in run_job("compare", params):
+            if job["status"] == "failed":
+                yield [["Error", job.get("error", "Job failed"), ""]], json.dumps({"error": job.get("error")})
+                return
+            if job["status"] != "done":
+                yield [], job_progress_text(job)
+        data = job["result"]["results"]
+    except Exception as e:
+        yield [["Error", str(e), ""]], json.dumps({"error": str(e)})
+        return
 
     # Return both table format and JSON format
     table_data = [[r.get("platform", "Unknown"), r.get("price", "N/A"), r.get("link", "")] for r in data]
     json_data = json.dumps(data, indent=2)
-    return table_data, json_data
+    yield table_data, json_data
+
+
+def fetch_suggestions(typed, category):
+    """Typeahead for the product textbox: fills the product dropdown with canonical names"""
+    if not typed or len(typed.strip()) < SUGGEST_MIN_CHARS:
+        return gr.Dropdown()
+    try:
+        r = requests.get(
+            SUGGEST_API_URL,
+            params={"q": typed.strip(), "limit": 8, "category": category},
+            timeout=2,
+        )
+        r.raise_for_status()
+        names = [s["name"] for s in r.json().get("suggestions", [])]
+    except Exception:
+        return gr.Dropdown()
+    return gr.Dropdown(choices=names or PRODUCTS_BY_CATEGORY.get(category, []))
 
 
 # 🆕 NEW FUNCTION FOR TAB 2: ANOMALY DETECTION
@@ -82,36 +133,43 @@ def detect_anomalies(products_json_str):
     Output: Analysis report
     """
     if not products_json_str or products_json_str.strip() == "":
-        return "⚠️ Please paste products JSON from Tab 1"
+        yield "⚠️ Please paste products JSON from Tab 1"
+        return
     
     try:
         # Parse JSON
         products = json.loads(products_json_str)
         
         if not isinstance(products, list):
-            return "❌ JSON must be an array of products"
+            yield "❌ JSON must be an array of products"
+            return
         
         if not products:
-            return "⚠️ Products list is empty"
-        
-        # Call anomaly detection API
-        response = requests.post(
-            ANOMALY_API_URL,
-            json=products,
-            timeout=60,
-        )
-        response.raise_for_status()
-        data = response.json()
+            yield "⚠️ Products list is empty"
+            return
         
+        # Run anomaly detection as a background job and poll it
+        data = None
+        for job in run_job("anomaly", {"products": products}):
+            if job["status"] == "failed":
+                yield f"❌ Error: {job.get('error', 'Job failed')}"
+                return
+            if job["status"] == "done":
+                data = job["result"]
+            else:
+                yield job_progress_text(job)
+
         # Format response
         if data.get("status") == "error":
-            return f"❌ Error: {data.get('error', 'Unknown error')}"
+            yield f"❌ Error: {data.get('error', 'Unknown error')}"
+            return
         
         anomalies = data.get("anomalies", [])
         total_flagged = data.get("total_flagged", 0)
         
         if not anomalies:
-            return "✅ GOOD NEWS!\nNo price anomalies detected.\nAll prices are within normal range (±10% of average)."
+            yield "✅ GOOD NEWS!\nNo price anomalies detected.\nAll prices are within normal range (±10% of average)."
+            return
         
         # Format anomalies report
         output = f"⚠️ PRICE ANOMALIES DETECTED ({total_flagged} found):\n\n"
@@ -125,24 +183,25 @@ def detect_anomalies(products_json_str):
             output += f"   Status: {anomaly.get('flag', 'N/A')}\n"
             output += "   " + "-"*40 + "\n\n"
         
-        return output
+        yield output
     
     except json.JSONDecodeError:
-        return "❌ Invalid JSON format.\n\nHow to use:\n1. Go to Tab 1\n2. Search for products\n3. Copy the results table data\n4. Paste here as JSON"
+        yield "❌ Invalid JSON format.\n\nHow to use:\n1. Go to Tab 1\n2. Search for products\n3. Copy the results table data\n4. Paste here as JSON"
     except requests.exceptions.ConnectionError:
-        return "🔌 Cannot connect to anomaly detection server.\nMake sure FastAPI is running on port 8000"
+        yield "🔌 Cannot connect to anomaly detection server.\nMake sure FastAPI is running on port 8000"
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        yield f"❌ Error: {str(e)}"
     
 #Arbritrage detection function tab3
 
-def detect_platform_arbitrage(query, url, pincode, quantity, threshold_inr):
+def detect_platform_arbitrage(query, url, pincode, quantity, threshold_inr, verify_prices=False):
     """
     Calls FastAPI /platform-arbitrage (your async arbitrage agent).
     Returns: best_offer text, explanation text, offers table, opportunities JSON
     """
     if not query and not url:
-        return "⚠️ Provide query or URL", "", [], []
+        yield "⚠️ Provide query or URL", "", [], []
+        return
 
     payload = {
     "query": query.strip() if isinstance(query, str) else "",
@@ -150,12 +209,19 @@ def detect_platform_arbitrage(query, url, pincode, quantity, threshold_inr):
     "pincode": pincode.strip() if isinstance(pincode, str) and pincode.strip() else None,
     "quantity": int(quantity) if quantity else 1,
     "threshold_inr": float(threshold_inr) if threshold_inr is not None else 20.0,
+    "verify_prices": bool(verify_prices),
 }
 
     try:
-        r = requests.post(ARBITRAGE_API_URL, json=payload, timeout=120)
-        r.raise_for_status()
-        data = r.json()
+        data = None
+        for job in run_job("arbitrage", payload):
+            if job["status"] == "failed":
+                yield f"❌ Error: {job.get('error', 'Job failed')}", "", [], []
+                return
+            if job["status"] == "done":
+                data = job["result"]
+            else:
+                yield job_progress_text(job), "", [], []
 
         best_offer = data.get("best_offer") or {}
         best_text = (
@@ -168,7 +234,7 @@ def detect_platform_arbitrage(query, url, pincode, quantity, threshold_inr):
             o.get("platform", ""),
             o.get("title", ""),
             o.get("item_price", ""),
-            o.get("delivery_fee", ""),
+            o.get("delivery_charged", o.get("delivery_fee", "")),
             o.get("effective_price", ""),
             o.get("in_stock", ""),
             o.get("product_url", ""),
@@ -177,12 +243,12 @@ def detect_platform_arbitrage(query, url, pincode, quantity, threshold_inr):
         opportunities = data.get("opportunities", []) or []
         explanation = data.get("explanation", "")
 
-        return best_text, explanation, table_data, opportunities
+        yield best_text, explanation, table_data, opportunities
 
     except requests.exceptions.ConnectionError:
-        return "🔌 Cannot connect to server. Start FastAPI on port 8000.", "", [], []
+        yield "🔌 Cannot connect to server. Start FastAPI on port 8000.", "", [], []
     except Exception as e:
-        return f"❌ Error: {str(e)}", "", [], []
+        yield f"❌ Error: {str(e)}", "", [], []
 
 
 
@@ -221,6 +287,13 @@ def build_demo():
 
                 master.change(set_categories, master, category)
                 category.change(set_products, category, product_dropdown)
+                product_text.input(
+                    fetch_suggestions,
+                    inputs=[product_text, category],
+                    outputs=product_dropdown,
+                    trigger_mode="always_last",  # keystrokes during a lookup collapse into one
+                    show_progress="hidden",
+                )
 
                 def pick_product(typed, selected):
                     if typed and isinstance(typed, str) and typed.strip():
@@ -291,6 +364,7 @@ def build_demo():
                 with gr.Row():
                     arb_quantity = gr.Number(label="Quantity", value=1, precision=0)
                     arb_threshold = gr.Number(label="Threshold (₹)", value=20, precision=0)
+                    arb_verify = gr.Checkbox(label="Verify prices on product pages", value=False)
 
                 arb_btn = gr.Button("📈 Check Arbitrage", variant="primary")
 
@@ -306,7 +380,7 @@ def build_demo():
 
                 arb_btn.click(
                     fn=detect_platform_arbitrage,
-                    inputs=[arb_query, arb_url, arb_pincode, arb_quantity, arb_threshold],
+                    inputs=[arb_query, arb_url, arb_pincode, arb_quantity, arb_threshold, arb_verify],
                     outputs=[arb_best, arb_explanation, arb_offers, arb_opps],
                 )
    
@@ -0,0 +1,63 @@
+"""
+Cost of checking observed prices against a large alert rule set.
+
+    python benchmarks/bench_alerts.py [n_rules]
+
+"before": a linear scan over every rule per observation (what polling each
+rule would cost). "after": AlertEngine.observe(), one bisect into the sorted
+thresholds of the observed product.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.alerts import AlertEngine  # noqa: E402
+from app.services.canonical import canonical_key  # noqa: E402
+
+PLATFORMS = ["amazon", "flipkart", "jiomart", "zepto", "blinkit", "bigbasket"]
+N_PRODUCTS = 2000
+N_OBSERVATIONS = 20000
+
+
+def main(n_rules: int) -> None:
+    rnd = random.Random(7)
+    products = [f"brand{i % 50} item {i} {rnd.choice(['500g', '1kg', '1l'])}" for i in range(N_PRODUCTS)]
+    engine = AlertEngine(sinks={"log": lambda event: None})
+
+    start = time.perf_counter()
+    rules = []
+    for i in range(n_rules):
+        platform = rnd.choice([None] + PLATFORMS)
+        rules.append(engine.add_rule(products[i % N_PRODUCTS], platform=platform, target_price=rnd.uniform(10, 500)))
+    build_s = time.perf_counter() - start
+
+    observations = [(products[rnd.randrange(N_PRODUCTS)], rnd.choice(PLATFORMS), rnd.uniform(300, 1000))
+                    for _ in range(N_OBSERVATIONS)]
+    keyed = [(r.product, r.platform, r.threshold) for r in rules]
+
+    def before(product_key, platform, price):
+        return [1 for p, pl, t in keyed if p == product_key and (pl is None or pl == platform) and price <= t]
+
+    start = time.perf_counter()
+    for product, platform, price in observations[:200]:
+        before(canonical_key(product), platform, price)
+    before_us = (time.perf_counter() - start) / 200 * 1e6
+
+    start = time.perf_counter()
+    fired = 0
+    for product, platform, price in observations:
+        fired += len(engine.observe(product, platform, price))
+    after_us = (time.perf_counter() - start) / N_OBSERVATIONS * 1e6
+
+    print(f"{n_rules} rules over {N_PRODUCTS} products; built in {build_s:.2f}s")
+    print(f"{'variant':<24}{'us/observation':>16}")
+    print(f"{'before (scan)':<24}{before_us:>16.1f}")
+    print(f"{'after (bisect)':<24}{after_us:>16.1f}")
+    print(f"fired {fired}; {engine.stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300000)
@@ -0,0 +1,90 @@
+"""
+Cost of the pairwise arbitrage matrix for a batch of products.
+
+    python benchmarks/bench_arbitrage_matrix.py [n_products]
+
+"before": for every (tier, buy, instead-of) pair, re-derive both platforms'
+cheapest offer and order cost from the raw offers. "after": build_matrices(),
+one (tiers x platforms) cost array per product, pair deltas read from it.
+Pair counts can differ slightly: the matrix fixes each platform's offer by
+price per unit, the naive loop re-picks the cheapest offer for every tier.
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.arbitrage_detection.matrix import DEFAULT_TIERS, build_matrices  # noqa: E402
+from app.arbitrage_detection.offers import Offer  # noqa: E402
+from app.services.units import parse_quantity  # noqa: E402
+
+PLATFORMS = ["amazon", "flipkart", "jiomart", "zepto", "blinkit", "bigbasket"]
+OFFERS_PER_PLATFORM = 3
+SIZES = ["500 g", "1 kg", "2 x 500 g", "1 l", "500 ml"]
+
+
+def make_products(n: int):
+    rnd = random.Random(3)
+    products = {}
+    for i in range(n):
+        size = SIZES[i % len(SIZES)]
+        name = f"brand{i % 40} item {i} {size}"
+        products[name] = [
+            Offer(platform=p, title=f"{name} {p}", item_price=round(rnd.uniform(40, 400), 2),
+                  delivery_fee=rnd.choice([0.0, 25.0, 40.0]), free_delivery_threshold=rnd.choice([None, 199.0, 499.0]))
+            for p in PLATFORMS for _ in range(OFFERS_PER_PLATFORM)
+        ]
+    return products
+
+
+def naive(products, threshold):
+    found = 0
+    for name, offers in products.items():
+        ref = parse_quantity(name)
+        for tier in DEFAULT_TIERS:
+            for buy in PLATFORMS:
+                for sell in PLATFORMS:
+                    if buy == sell:
+                        continue
+                    costs = []
+                    for platform in (buy, sell):
+                        best = None
+                        for o in offers:
+                            if o.platform != platform:
+                                continue
+                            q = parse_quantity(o.title) or ref
+                            packs = max(math.ceil(tier * ref.amount / q.amount), 1)
+                            order = packs * o.item_price
+                            free_at = o.free_delivery_threshold or float("inf")
+                            cost = (order if order >= free_at else order + o.delivery_fee) / (packs * q.amount)
+                            best = cost if best is None else min(best, cost)
+                        costs.append(best)
+                    if (costs[1] - costs[0]) * tier * ref.amount >= threshold:
+                        found += 1
+    return found
+
+
+def main(n: int) -> None:
+    products = make_products(n)
+    threshold = 20.0
+
+    start = time.perf_counter()
+    before_found = naive(products, threshold)
+    before_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    matrices = build_matrices(products)
+    after_found = sum(len(m.opportunities(threshold)) for m in matrices.values())
+    after_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{n} products x {len(PLATFORMS)} platforms x {len(DEFAULT_TIERS)} tiers")
+    print(f"{'variant':<24}{'ms':>10}{'pairs >= threshold':>22}")
+    print(f"{'before (per pair)':<24}{before_ms:>10.1f}{before_found:>22}")
+    print(f"{'after (matrix)':<24}{after_ms:>10.1f}{after_found:>22}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,103 @@
+"""
+Per-request overhead of the /gradio auth layer.
+
+    python benchmarks/bench_auth_middleware.py [n_requests]
+
+"before": the old @app.middleware("http") (BaseHTTPMiddleware) checking a
+plain cookie flag. "after": SessionAuthMiddleware (pure ASGI, HMAC-signed
+cookie, static prefixes skipped). Both wrap the same trivial ASGI app and are
+driven directly with ASGI messages, so the numbers are middleware cost only.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import RedirectResponse  # noqa: E402
+
+from app.services.auth import SESSION_COOKIE, SessionAuthMiddleware, issue_session_token  # noqa: E402
+
+
+async def endpoint_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def old_protect_gradio(request, call_next):
+    path = request.url.path
+    if path.startswith("/login") or path.startswith("/docs") or path.startswith("/openapi.json"):
+        return await call_next(request)
+    if path.startswith("/gradio"):
+        if request.cookies.get(SESSION_COOKIE) != "ok":
+            return RedirectResponse(url="/login", status_code=303)
+    return await call_next(request)
+
+
+def build_before():
+    app = Starlette(middleware=[Middleware(BaseHTTPMiddleware, dispatch=old_protect_gradio)])
+    app.mount("/", endpoint_app)
+    return app
+
+
+def build_after():
+    app = Starlette(middleware=[Middleware(SessionAuthMiddleware)])
+    app.mount("/", endpoint_app)
+    return app
+
+
+def scope_for(path: str, cookie: str):
+    headers = [(b"host", b"bench"), (b"accept", b"*/*")]
+    if cookie:
+        headers.append((b"cookie", f"{SESSION_COOKIE}={cookie}".encode()))
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+
+async def run(app, scope, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(dict(scope), receive, send)
+    assert status[-1] == 200, status
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def main(n: int) -> None:
+    bare = Starlette()
+    bare.mount("/", endpoint_app)
+    before, after = build_before(), build_after()
+    token = issue_session_token("admin")
+
+    cases = [
+        ("api route (/compare)", "/compare", "", ""),
+        ("static asset", "/gradio/assets/index-abc.js", "ok", ""),
+        ("protected page", "/gradio/", "ok", token),
+    ]
+    print(f"{n} requests per case, microseconds per request")
+    print(f"{'case':<24}{'no auth':>10}{'before':>10}{'after':>10}")
+    for name, path, old_cookie, new_cookie in cases:
+        base = await run(bare, scope_for(path, new_cookie), n)
+        b = await run(before, scope_for(path, old_cookie), n)
+        a = await run(after, scope_for(path, new_cookie), n)
+        print(f"{name:<24}{base:>10.1f}{b:>10.1f}{a:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,63 @@
+"""
+LLM calls for a burst of variant-extraction prompts, with and without the gateway.
+
+    python benchmarks/bench_llm_gateway.py [n_prompts] [model_latency_ms]
+
+Uses the deterministic fake model with a fixed per-call latency, so the
+numbers show batching/caching effects only. "before": one blocking call per
+prompt (what parse_product_variants used to do). "after": the same prompts
+through LLMGateway from concurrent callers, then once more (cache).
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.llm import FakeBackend, LLMGateway, RateLimiter  # noqa: E402
+
+PRODUCTS = ["amul butter", "amul milk", "tata salt", "fortune oil", "aashirvaad atta", "surf excel", "dove soap"]
+
+
+def make_prompts(n: int):
+    # repeats are realistic: the same product shows up in many requests
+    return [f"Extract all size/pack variants for {PRODUCTS[i % len(PRODUCTS)]}: 500 ml 1 L {i % 13} g\n"
+            f"Return JSON array only." for i in range(n)]
+
+
+def main(n: int, latency_ms: float) -> None:
+    prompts = make_prompts(n)
+    limiter = RateLimiter(requests_per_min=10**6, tokens_per_min=10**9)
+
+    direct = FakeBackend(latency_s=latency_ms / 1000)
+    start = time.perf_counter()
+    for p in prompts:
+        direct.batch([p], 512)
+    before_s = time.perf_counter() - start
+
+    backend = FakeBackend(latency_s=latency_ms / 1000)
+    gateway = LLMGateway(backend=backend, limiter=limiter)
+
+    async def burst():
+        return await gateway.complete_many(prompts)
+
+    start = time.perf_counter()
+    asyncio.run(burst())
+    after_s = time.perf_counter() - start
+    calls_cold = backend.calls
+
+    start = time.perf_counter()
+    asyncio.run(burst())
+    warm_s = time.perf_counter() - start
+
+    print(f"{n} prompts, fake model latency {latency_ms:.0f}ms per call")
+    print(f"{'variant':<26}{'seconds':>10}{'model calls':>14}")
+    print(f"{'before (one call each)':<26}{before_s:>10.3f}{direct.calls:>14}")
+    print(f"{'after (gateway, cold)':<26}{after_s:>10.3f}{calls_cold:>14}")
+    print(f"{'after (gateway, cached)':<26}{warm_s:>10.3f}{backend.calls - calls_cold:>14}")
+    print(gateway.snapshot())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, float(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,95 @@
+"""
+Serialization cost of a wide /platform-arbitrage response, before and after
+response shaping.
+
+    python benchmarks/bench_serialization.py [n_offers]
+
+"before": dict offers with snippets, FastAPI's jsonable_encoder + json.dumps
+(what the endpoint used to do). "after": Offer.to_dict() without snippets,
+orjson, optionally with offer_fields / pagination / gzip.
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.arbitrage_detection.offers import Offer  # noqa: E402
+from app.services.responses import GZIP_LEVEL, dumps, paginate, select_fields, shape_offers  # noqa: E402
+
+PLATFORMS = ["amazon", "flipkart", "jiomart", "zepto", "blinkit", "bigbasket"]
+
+
+def make_offers(n: int):
+    rnd = random.Random(7)
+    offers = []
+    for i in range(n):
+        platform = PLATFORMS[i % len(PLATFORMS)]
+        offers.append({
+            "platform": platform,
+            "title": f"Amul Pasteurised Butter {rnd.choice(['100 g', '500 g', '1 kg'])} - {platform} listing {i}",
+            "product_url": f"https://www.{platform}.example/p/amul-butter/{i}?ref=serp&pos={i % 10}",
+            "item_price": round(rnd.uniform(50, 600), 2),
+            "delivery_fee": 0.0,
+            "in_stock": True,
+            "snippet": "Buy Amul Butter online at best price. ₹ 285 M.R.P: ₹ 290 (Inclusive of all taxes) "
+                       "Free delivery on orders above ₹499. " * 2,
+            "effective_price": round(rnd.uniform(50, 600), 2),
+            "quantity": 1,
+        })
+    return offers
+
+
+def timeit(fn, repeat: int = 20) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(n: int) -> None:
+    raw = make_offers(n)
+    typed = [Offer.from_dict(o) for o in raw]
+
+    def before():
+        body = {"normalized_offers": raw, "best_offer": raw[0]}
+        return json.dumps(jsonable_encoder(body)).encode()
+
+    def after():
+        return dumps({"normalized_offers": [o.to_dict() for o in typed], "best_offer": typed[0].to_dict()})
+
+    fields = ["platform", "effective_price", "product_url"]
+
+    def after_fields():
+        return dumps({"normalized_offers": shape_offers((o.to_dict() for o in typed), fields),
+                      "best_offer": select_fields(typed[0].to_dict(), fields)})
+
+    def after_page():
+        page, info = paginate(typed, 0, 50)
+        return dumps({"normalized_offers": [o.to_dict() for o in page], "offers_page": info})
+
+    def after_gzip():
+        return gzip.compress(after(), compresslevel=GZIP_LEVEL)
+
+    print(f"{n} offers")
+    print(f"{'variant':<28}{'ms':>10}{'bytes':>12}")
+    for name, fn in [
+        ("before (encoder+json)", before),
+        ("after (to_dict+orjson)", after),
+        ("after + offer_fields", after_fields),
+        ("after + offers_limit=50", after_page),
+        ("after + gzip", after_gzip),
+    ]:
+        print(f"{name:<28}{timeit(fn):>10.2f}{len(fn()):>12}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 600)
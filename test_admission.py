@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionMiddleware, EndpointGate, Shed
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_waiters_get_slots_in_order():
+    async def scenario():
+        gate = EndpointGate("t", max_inflight=1, max_queue=4)
+        await gate.acquire()
+        order = []
+
+        async def waiter(i):
+            await gate.acquire()
+            order.append(i)
+            gate.release()
+
+        tasks = [asyncio.create_task(waiter(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert gate.snapshot()["queue_depth"] == 3
+        gate.release()
+        await asyncio.gather(*tasks)
+        return order, gate.snapshot()
+
+    order, snap = run(scenario())
+    assert order == [0, 1, 2]
+    assert (snap["inflight"], snap["queue_depth"], snap["admitted"], snap["queued"]) == (0, 0, 4, 3)
+
+
+def test_full_queue_is_shed():
+    async def scenario():
+        gate = EndpointGate("t", max_inflight=1, max_queue=1)
+        await gate.acquire()
+        queued = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Shed, match="queue full"):
+            await gate.acquire()
+        gate.release()
+        await queued
+        return gate.snapshot()
+
+    assert run(scenario())["shed_queue_full"] == 1
+
+
+def test_long_estimated_wait_is_shed_at_once():
+    async def scenario():
+        gate = EndpointGate("t", max_inflight=1, max_queue=10, max_wait_s=5)
+        gate.service_s = 3.0
+        await gate.acquire()
+        queued = asyncio.create_task(gate.acquire())  # waits ~3s: admitted to the queue
+        await asyncio.sleep(0)
+        with pytest.raises(Shed) as shed:             # would wait ~6s
+            await gate.acquire()
+        gate.release()
+        await queued
+        return shed.value
+
+    shed = run(scenario())
+    assert shed.reason == "estimated wait too long" and shed.retry_after_s == 6.0
+
+
+def test_release_tracks_service_time():
+    gate = EndpointGate("t", max_inflight=2, max_queue=2)
+    run(gate.acquire())
+    gate.release(service_s=12.0)
+    assert gate.service_s == pytest.approx(2.0 + 0.2 * 10.0)
+
+
+async def _call(app, method="POST", path="/compare"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path}, receive, send)
+    return sent
+
+
+def test_middleware_sheds_with_retry_after():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def scenario():
+        controller = AdmissionController(routes={("POST", "/compare"): ("compare", 1)}, queue_per_slot=0)
+        app = AdmissionMiddleware(slow_app, controller)
+        first = asyncio.create_task(_call(app))
+        await asyncio.sleep(0)
+        shed = await _call(app)
+        ungated = asyncio.create_task(_call(app, "GET", "/metrics"))
+        await asyncio.sleep(0)
+        release.set()
+        return shed, await first, await ungated, controller.snapshot()["compare"]
+
+    shed, first, ungated, snap = run(scenario())
+    assert shed[0]["status"] == 503
+    headers = dict(shed[0]["headers"])
+    assert headers[b"retry-after"] == b"2"  # ceil of the initial 2s service time
+    assert first[0]["status"] == 200 and ungated[0]["status"] == 200
+    assert (snap["shed"], snap["inflight"]) == (1, 0)
+
+
+def test_trailing_slash_uses_the_same_gate():
+    controller = AdmissionController()
+    assert controller.gate_for("POST", "/compare/") is controller.gate_for("POST", "/compare")
+    assert controller.gate_for("GET", "/compare") is None
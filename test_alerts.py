@@ -0,0 +1,92 @@
+import pytest
+
+from app.services.alerts import AlertEngine, WebhookStubSink
+
+
+def engine() -> AlertEngine:
+    return AlertEngine(sinks={"log": lambda event: None, "webhook": WebhookStubSink()})
+
+
+def test_observation_fires_every_rule_at_or_above_the_price():
+    e = engine()
+    low = e.add_rule("Amul Butter 500 g", target_price=200)
+    mid = e.add_rule("amul butter 500g", target_price=240)
+    high = e.add_rule("AMUL butter 0.5 kg", target_price=260)
+    assert e.observe("amul butter 500 g", "amazon", 250) == [high]
+    assert e.observe("amul butter 500 g", "amazon", 240) == [mid]  # a threshold equal to the price fires
+    assert e.observe("amul butter 500 g", "amazon", 230) == []     # fired rules are disarmed
+    assert [r.rule_id for r in e.observe("amul butter 500 g", "zepto", 150)] == [low.rule_id]
+    assert (mid.triggered_price, mid.triggered_platform) == (240.0, "amazon")
+    assert e.stats()["armed"] == 0 and e.fired == 3
+
+
+def test_platform_rules_only_fire_for_their_platform():
+    e = engine()
+    rule = e.add_rule("amul butter 500g", platform="Zepto", target_price=240)
+    assert e.observe("amul butter 500g", "amazon", 200) == []
+    assert e.observe("amul butter 500g", "ZEPTO", 239) == [rule]
+
+
+def test_other_products_and_bad_prices_are_ignored():
+    e = engine()
+    e.add_rule("amul butter 500g", target_price=240)
+    assert e.observe("amul cheese 200g", "amazon", 10) == []
+    assert e.observe("amul butter 500g", "amazon", None) == []
+    assert e.observe("amul butter 500g", "amazon", True) == []
+    assert e.observations == 1
+
+
+def test_drop_rule_waits_for_a_baseline():
+    e = engine()
+    rule = e.add_rule("amul butter 500g", drop_pct=10)
+    assert rule.threshold is None and e.stats()["pending_baseline"] == 1
+    assert e.observe("amul butter 500g", "amazon", 250) == []  # becomes the baseline, doesn't fire
+    assert (rule.baseline_price, rule.threshold) == (250.0, 225.0)
+    assert e.observe("amul butter 500g", "amazon", 226) == []
+    assert e.observe("amul butter 500g", "amazon", 225) == [rule]
+
+
+def test_platform_drop_rule_takes_its_baseline_from_that_platform():
+    e = engine()
+    rule = e.add_rule("amul butter 500g", platform="zepto", drop_pct=20)
+    e.observe("amul butter 500g", "amazon", 100)
+    assert rule.threshold is None
+    e.observe("amul butter 500g", "zepto", 300)
+    assert rule.threshold == 240.0
+
+
+def test_drop_rule_uses_the_last_seen_price():
+    e = engine()
+    e.observe_many("amul butter 500g", [("amazon", 260), ("zepto", 250)])
+    rule = e.add_rule("amul butter 500g", drop_pct=10)
+    assert (rule.baseline_price, rule.threshold) == (250.0, 225.0)
+
+
+def test_removed_rules_never_fire():
+    e = engine()
+    armed = e.add_rule("amul butter 500g", target_price=240)
+    pending = e.add_rule("amul butter 500g", drop_pct=10)
+    assert e.remove_rule(armed.rule_id) and e.remove_rule(pending.rule_id)
+    assert not e.remove_rule(armed.rule_id)
+    assert e.observe("amul butter 500g", "amazon", 100) == []
+    assert e.stats()["rules"] == 0
+
+
+def test_webhook_sink_records_the_event():
+    e = engine()
+    e.add_rule("amul butter 500g", target_price=240, sink="webhook")
+    e.observe("amul butter 500g", "amazon", 199)
+    (sent,) = e.sinks["webhook"].outbox
+    assert sent["json"]["price"] == 199.0 and sent["json"]["threshold"] == 240.0
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"target_price": 100, "drop_pct": 10},
+    {"target_price": 0},
+    {"drop_pct": 100},
+    {"target_price": 100, "sink": "sms"},
+])
+def test_invalid_rules_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        engine().add_rule("amul butter 500g", **kwargs)
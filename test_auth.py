@@ -0,0 +1,55 @@
+import asyncio
+
+from app.services import auth
+from app.services.auth import SESSION_COOKIE, SessionAuthMiddleware, issue_session_token, is_admin, verify_session_token
+
+
+def test_session_token_round_trip():
+    assert verify_session_token(issue_session_token("ravi")) == "ravi"
+    assert verify_session_token(issue_session_token("रवि")) == "रवि"
+
+
+def test_bad_tokens_are_rejected():
+    token = issue_session_token("ravi")
+    payload, _, signature = token.rpartition(".")
+    assert verify_session_token(issue_session_token("ravi", ttl_s=-10)) is None
+    assert verify_session_token(f"{payload}.{signature[:-1]}x") is None
+    assert verify_session_token(f"{payload}.ä") is None  # non-ASCII signature: rejected, not an error
+    assert verify_session_token("no-dots") is None
+    assert verify_session_token(None) is None
+
+
+def test_admin_token(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_TOKEN", "s3cret")
+    assert is_admin("s3cret")
+    assert not is_admin("s3cre") and not is_admin(None) and not is_admin("sécret")
+    monkeypatch.setattr(auth, "ADMIN_TOKEN", None)
+    assert not is_admin("s3cret")
+
+
+async def _inner(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def call(path: str, cookie: str = "", kind: str = "http"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"cookie", f"{SESSION_COOKIE}={cookie}".encode())] if cookie else []
+    asyncio.run(SessionAuthMiddleware(_inner)({"type": kind, "path": path, "headers": headers}, receive, send))
+    return sent[0]
+
+
+def test_middleware_guards_only_the_ui():
+    assert call("/compare")["status"] == 200
+    assert call("/gradio/assets/index.js")["status"] == 200
+    redirect = call("/gradio/")
+    assert redirect["status"] == 303 and dict(redirect["headers"])[b"location"] == b"/login"
+    assert call("/gradio/", cookie=issue_session_token("ravi"))["status"] == 200
+    assert call("/gradio/queue/join", kind="websocket") == {"type": "websocket.close", "code": 1008}
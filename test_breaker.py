@@ -0,0 +1,95 @@
+from app.services.breaker import (ABANDONED, CLOSED, EMPTY, ERROR, HALF_OPEN, OK, OPEN,
+                                  BreakerRegistry, CircuitBreaker)
+
+
+def breaker(**kwargs) -> CircuitBreaker:
+    return CircuitBreaker(**{"window_s": 100, "min_calls": 4, "failure_rate": 0.5, "cooldown_s": 10, **kwargs})
+
+
+def open_breaker(b: CircuitBreaker, now: float = 0.0) -> None:
+    for _ in range(b.min_calls):
+        b.record(ERROR, now)
+
+
+def test_opens_at_the_failure_rate_once_enough_calls():
+    b = breaker()
+    for outcome in (ERROR, ERROR, OK):
+        b.record(outcome, 0)
+    assert b.state == CLOSED  # 3 calls < min_calls
+    b.record(ERROR, 0)
+    assert b.state == OPEN and b.times_opened == 1
+    assert not b.can_pass(5) and b.is_open(5)
+
+
+def test_outcomes_outside_the_window_are_forgotten():
+    b = breaker()
+    for _ in range(3):
+        b.record(ERROR, 0)
+    b.record(ERROR, 200)  # the first three fell out of the window
+    assert b.state == CLOSED
+
+
+def test_half_open_allows_one_probe_and_closes_on_success():
+    b = breaker()
+    open_breaker(b)
+    assert b.can_pass(10) and b.state == HALF_OPEN
+    b.on_pass()
+    assert not b.can_pass(10)  # the probe slot is taken
+    b.record(OK, 11)
+    assert b.state == CLOSED and b.cooldown_s == 10
+
+
+def test_failed_probe_doubles_the_cooldown():
+    b = breaker()
+    open_breaker(b)
+    for opened_at, cooldown in ((10, 20), (30, 40), (70, 80)):
+        assert b.can_pass(opened_at)
+        b.on_pass()
+        b.record(ERROR, opened_at)
+        assert (b.state, b.cooldown_s) == (OPEN, cooldown)
+        assert not b.can_pass(opened_at + cooldown - 1)
+
+
+def test_cooldown_is_capped():
+    b = breaker(cooldown_s=600)
+    open_breaker(b)
+    b.can_pass(600)
+    b.on_pass()
+    b.record(EMPTY, 600)
+    assert b.cooldown_s == 15 * 60
+
+
+def test_abandoned_probe_frees_the_slot_without_deciding():
+    b = breaker()
+    open_breaker(b)
+    b.can_pass(10)
+    b.on_pass()
+    b.record(ABANDONED, 10)
+    assert b.state == HALF_OPEN and b.can_pass(10)
+
+
+def test_abandoned_calls_are_not_counted():
+    b = breaker()
+    for _ in range(10):
+        b.record(ABANDONED, 0)
+    assert b.state == CLOSED and b.snapshot(0)["window_calls"] == 0
+
+
+def test_empty_results_only_trip_the_category_breaker():
+    registry = BreakerRegistry(window_s=100, min_calls=2, failure_rate=0.5, cooldown_s=10)
+    for _ in range(2):
+        assert registry.allow("Amazon", "dairy")
+        registry.record("Amazon", "dairy", EMPTY)
+    assert registry.is_open("amazon", "dairy")
+    assert not registry.is_open("amazon", "snacks") and not registry.is_open("amazon")
+    assert not registry.allow("amazon", "dairy") and registry.skipped == 1
+    assert registry.open_platforms(["amazon", "flipkart"], "dairy") == ["amazon"]
+
+
+def test_errors_trip_the_platform_for_every_category():
+    registry = BreakerRegistry(window_s=100, min_calls=2, failure_rate=0.5, cooldown_s=10)
+    for _ in range(2):
+        registry.allow("amazon", "dairy")
+        registry.record("amazon", "dairy", ERROR)
+    assert registry.is_open("amazon", "snacks")
+    assert registry.snapshot()["breakers"]["amazon"]["state"] == OPEN
@@ -0,0 +1,18 @@
+from app.services.canonical import canonical_key, canonicalize
+
+
+def test_sizes_normalize_to_one_key():
+    assert canonical_key("amul butter 500 g") == "amul butter 500g"
+    assert canonical_key("AMUL butter 0.5 kg") == "amul butter 500g"
+    assert canonical_key("Fortune oil 1,000 ml") == "fortune oil 1l"
+
+
+def test_multipacks_keep_their_words_together():
+    assert canonical_key("2 x 500 g amul butter") == "amul butter 2 x 500g"
+    assert canonical_key("Amul Butter 100g (Pack of 3)") == "amul butter 3 x 100g"
+
+
+def test_network_generation_is_not_a_size():
+    parsed = canonicalize("Samsung Galaxy S23 5G 128GB")
+    assert parsed["size"] == ""
+    assert parsed["key"] == "samsung galaxy s23 5g 128gb"
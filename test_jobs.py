@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from app.services.jobs import DONE, FAILED, JobManager, JobQueueFull, UnknownJobKind
+
+
+def wait_finished(manager: JobManager, job_id: str, timeout: float = 5.0):
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        job = manager.get(job_id)
+        if job is not None and job.status in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def manager_with(handler, **kwargs) -> JobManager:
+    manager = JobManager(workers=2, **kwargs)
+    manager.register("echo", handler)
+    return manager
+
+
+def test_identical_submissions_share_a_running_job():
+    gate = threading.Event()
+    calls = []
+
+    def handler(params, job):
+        calls.append(params)
+        gate.wait(5)
+        return params["q"]
+
+    manager = manager_with(handler)
+    first, created = manager.submit("echo", {"q": "amul", "n": 1})
+    again, created_again = manager.submit("echo", {"n": 1, "q": "amul"})  # key ignores dict order
+    other, _ = manager.submit("echo", {"q": "ghee", "n": 1})
+    gate.set()
+    assert (created, created_again) == (True, False) and again is first
+    assert other is not first
+    assert wait_finished(manager, first.id).result == "amul"
+    wait_finished(manager, other.id)
+    assert len(calls) == 2 and manager.stats["deduplicated"] == 1
+
+
+def test_finished_job_reused_only_while_fresh():
+    manager = manager_with(lambda params, job: params["q"], fresh_s=60)
+    job, _ = manager.submit("echo", {"q": "amul"})
+    done = wait_finished(manager, job.id)
+    assert done.finished_at is not None
+    assert manager.submit("echo", {"q": "amul"})[0] is job
+
+    done.finished_at -= 61
+    fresh, created = manager.submit("echo", {"q": "amul"})
+    assert created and fresh is not job
+
+
+def test_finished_jobs_expire_after_ttl():
+    manager = manager_with(lambda params, job: 1, ttl_s=30)
+    job, _ = manager.submit("echo", {"q": "amul"})
+    wait_finished(manager, job.id).finished_at -= 31
+    assert manager.get(job.id) is None
+    assert manager.stats["expired"] == 1
+
+
+def test_failures_are_reported_not_reused():
+    def handler(params, job):
+        raise RuntimeError("no results")
+
+    manager = manager_with(handler)
+    job, _ = manager.submit("echo", {"q": "amul"})
+    failed = wait_finished(manager, job.id)
+    assert failed.status == FAILED and failed.to_dict()["error"] == "no results"
+    assert manager.submit("echo", {"q": "amul"})[1] is True
+
+
+def test_progress_is_reported_per_node():
+    def handler(params, job):
+        job.expect(["search", "extract"])
+        job.node_done("search")
+        return None
+
+    manager = manager_with(handler)
+    job, _ = manager.submit("echo", {})
+    progress = wait_finished(manager, job.id).to_dict()["progress"]
+    assert (progress["completed"], progress["total"]) == (1, 2)
+    assert progress["nodes"] == {"search": "done", "extract": "pending"}
+
+
+def test_pending_limit_and_unknown_kind():
+    gate = threading.Event()
+    manager = manager_with(lambda params, job: gate.wait(5), max_pending=1)
+    manager.submit("echo", {"q": 1})
+    with pytest.raises(JobQueueFull):
+        manager.submit("echo", {"q": 2})
+    with pytest.raises(UnknownJobKind):
+        manager.submit("nope", {})
+    gate.set()
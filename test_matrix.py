@@ -0,0 +1,72 @@
+import pytest
+
+from app.arbitrage_detection.matrix import build_matrix, validate_tiers
+from app.arbitrage_detection.offers import Offer
+from app.services.units import Quantity
+
+
+def offers():
+    return [
+        # 500 g packs, ₹30 delivery below ₹500
+        Offer(platform="a", title="Amul Butter 500 g", item_price=250, delivery_fee=30, free_delivery_threshold=500),
+        # 1 kg packs, free delivery
+        Offer(platform="b", title="Amul Butter 1 kg", item_price=480),
+    ]
+
+
+def test_unit_costs_per_tier():
+    m = build_matrix(offers(), tiers=(1, 2, 5))
+    assert (m.platforms, m.basis, m.ref_amount) == (["a", "b"], "kg", 0.5)
+    # tier 1: one 500 g pack on a (+ delivery), one 1 kg pack on b
+    # tier 2: two packs on a reach free delivery; tier 5: 3 kg bought on b
+    assert m.to_dict()["unit_costs"] == {"1": [560.0, 480.0], "2": [500.0, 480.0], "5": [500.0, 480.0]}
+
+
+def test_deltas_are_savings_for_the_tier_order():
+    m = build_matrix(offers(), tiers=(1, 2, 5))
+    assert m.deltas(0) == [[0.0, -40.0], [40.0, 0.0]]
+    assert m.deltas(2)[1][0] == 50.0
+
+
+def test_opportunities_above_threshold_largest_first():
+    m = build_matrix(offers(), tiers=(1, 2, 5))
+    opps = m.opportunities(threshold_inr=30)
+    assert [(o["tier"], o["buy_on"], o["instead_of"], o["saving"]) for o in opps] == [(5, "b", "a", 50.0), (1, "b", "a", 40.0)]
+    assert opps[1]["saving_pct"] == pytest.approx(16.7)
+
+
+def test_terms_lookup_replaces_the_offer_fee():
+    m = build_matrix(offers(), tiers=(1,), terms_for=lambda platform: {"delivery_fee": 0} if platform == "a" else None)
+    assert m.to_dict()["unit_costs"]["1"] == [500.0, 480.0]
+
+
+def test_reference_size_sets_tier_one():
+    m = build_matrix(offers(), tiers=(1,), reference_size=Quantity(1000.0, "g"))
+    assert m.ref_amount == 1.0
+    assert m.deltas(0)[1][0] == 20.0
+
+
+def test_cheapest_offer_per_platform_by_unit_price():
+    extra = Offer(platform="a", title="Amul Butter 100 g", item_price=60)  # ₹600/kg: dearer than the 500 g pack
+    m = build_matrix(offers() + [extra], tiers=(1,))
+    assert m.quotes[0].item_price == 250
+
+
+def test_mixed_units_fall_back_to_packs():
+    mixed = [Offer(platform="a", title="Amul Butter 500 g", item_price=250),
+             Offer(platform="b", title="Amul Butter", item_price=240)]
+    m = build_matrix(mixed, tiers=(1,))
+    assert m.basis == "pack" and m.deltas(0)[1][0] == 10.0
+
+
+def test_needs_two_priced_platforms():
+    assert build_matrix(offers()[:1]) is None
+    assert build_matrix([offers()[0], Offer(platform="b", title="Amul Butter 1 kg")]) is None
+
+
+def test_validate_tiers():
+    assert validate_tiers(None) == (1, 2, 5)
+    assert validate_tiers([5, 1, 5]) == (1, 5)
+    for bad in ([0], [101], list(range(1, 10))):
+        with pytest.raises(ValueError):
+            validate_tiers(bad)
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.page_fetcher import PageFetcher, ValidatorCache, extract_page_offer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class StubShop(BaseHTTPRequestHandler):
+    """Serves fixture pages with an ETag; answers 304 when the client has it"""
+    pages = {}
+    hits = []
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get("If-None-Match")))
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{len(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def shop():
+    StubShop.pages = {
+        "/amul-butter": fixture("amul_butter.html"),
+        "/oil": fixture("out_of_stock.html"),
+        # price only after 64 KB of padding
+        "/big": b"<html>" + b" " * 64 * 1024 + b'"price": "99"</html>',
+    }
+    StubShop.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubShop)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def fetcher(**kwargs) -> PageFetcher:
+    # thread pool instead of the process pool: same code path, no worker start-up
+    return PageFetcher(cache=ValidatorCache(path=None), executor=ThreadPoolExecutor(2), **kwargs)
+
+
+def test_extracts_price_and_stock_from_fixtures():
+    assert extract_page_offer(fixture("amul_butter.html")) == {"price": 275.0, "in_stock": True}
+    assert extract_page_offer(fixture("out_of_stock.html"))["in_stock"] is False
+
+
+def test_conditional_get_reuses_the_cached_result(shop):
+    f = fetcher()
+    first = asyncio.run(f.fetch(f"{shop}/amul-butter"))
+    second = asyncio.run(f.fetch(f"{shop}/amul-butter"))
+    assert first == {"price": 275.0, "in_stock": True, "cached": False}
+    assert second == {"price": 275.0, "in_stock": True, "cached": True}
+    assert StubShop.hits[0][1] is None
+    assert StubShop.hits[1][1] is not None  # If-None-Match sent, 304 served
+
+
+def test_pages_are_cut_at_the_byte_cap(shop):
+    assert asyncio.run(fetcher(max_bytes=1024 * 1024).fetch(f"{shop}/big"))["price"] == 99.0
+    assert asyncio.run(fetcher(max_bytes=16 * 1024).fetch(f"{shop}/big"))["price"] is None
+
+
+def test_fetch_many_skips_missing_pages(shop):
+    pages = asyncio.run(fetcher().fetch_many([f"{shop}/amul-butter", f"{shop}/nope", f"{shop}/amul-butter"]))
+    assert pages[f"{shop}/amul-butter"]["price"] == 275.0
+    assert pages[f"{shop}/nope"] is None
+    assert len(StubShop.hits) == 2  # duplicate URL fetched once
@@ -0,0 +1,59 @@
+import random
+
+from app.services.platform_yield import PlatformYield
+
+
+def tracker(**kwargs) -> PlatformYield:
+    return PlatformYield(**{"decay": 1.0, "min_samples": 3, "threshold": 0.5, "explore_rate": 0.0,
+                            "rng": random.Random(1), **kwargs})
+
+
+def searched(y: PlatformYield, platform: str, hits: int, misses: int, category: str = "dairy", **kwargs) -> None:
+    for _ in range(hits):
+        y.record(platform, True, category, **kwargs)
+    for _ in range(misses):
+        y.record(platform, False, category, **kwargs)
+
+
+def test_low_yield_platforms_are_pruned_per_category():
+    y = tracker()
+    searched(y, "amazon", hits=1, misses=3)
+    searched(y, "zepto", hits=3, misses=0)
+    assert y.plan(["amazon", "zepto", "jiomart"], "dairy") == (["jiomart", "zepto"], ["amazon"])  # no history first
+    assert y.plan(["amazon", "zepto"], "snacks") == (["amazon", "zepto"], [])
+    assert y.pruned == 1
+
+
+def test_kept_platforms_are_ordered_by_win_rate():
+    y = tracker()
+    searched(y, "amazon", hits=3, misses=0)
+    searched(y, "zepto", hits=3, misses=0)
+    y.record_win("zepto", "dairy")
+    to_search, _ = y.plan(["amazon", "zepto", "jiomart"], "dairy")
+    assert to_search == ["jiomart", "zepto", "amazon"]  # no history first, then by wins
+
+
+def test_master_category_backs_up_a_new_category():
+    y = tracker()
+    searched(y, "amazon", hits=0, misses=3, category="butter", master_category="Grocery")
+    assert y.plan(["amazon", "zepto"], "ghee", "grocery") == (["zepto"], ["amazon"])
+
+
+def test_never_prunes_everything():
+    y = tracker()
+    searched(y, "amazon", hits=0, misses=3)
+    assert y.plan(["amazon"], "dairy") == (["amazon"], [])
+
+
+def test_exploration_keeps_pruned_platforms_fresh():
+    y = tracker(explore_rate=1.0)
+    searched(y, "amazon", hits=0, misses=3)
+    assert y.plan(["amazon", "zepto"], "dairy") == (["zepto", "amazon"], [])
+    assert y.explored == 1
+
+
+def test_old_searches_decay():
+    y = tracker(decay=0.5, min_samples=1.5)
+    searched(y, "amazon", hits=0, misses=5)
+    searched(y, "amazon", hits=3, misses=0)
+    assert y.plan(["amazon", "zepto"], "dairy")[1] == []
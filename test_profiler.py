@@ -0,0 +1,76 @@
+import contextvars
+import sys
+import threading
+import time
+
+import pytest
+
+from app.services.profiler import (ProfilerBusy, RequestProfile, collapsed, get_request_profile, profiled_call,
+                                   sample_stacks, top_frames)
+
+
+def busy_work(n: int = 20000) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_request_profile_is_kept_for_lookup():
+    with RequestProfile("compare") as profile:
+        busy_work()
+    report = get_request_profile(profile.id)
+    assert report.startswith(f"# profile {profile.id} compare")
+    assert "busy_work" in report
+
+
+def test_one_request_profile_per_thread():
+    with RequestProfile("first"):
+        with pytest.raises(ProfilerBusy):
+            RequestProfile("second").__enter__()
+    with RequestProfile("after"):  # the slot is free again
+        pass
+
+
+def test_worker_threads_are_merged():
+    with RequestProfile("fan-out") as profile:
+        def worker():
+            with profiled_call():
+                busy_work()
+        # carry the request's context over, the way asyncio.to_thread does
+        t = threading.Thread(target=contextvars.copy_context().run, args=(worker,))
+        t.start()
+        t.join()
+    if sys.version_info < (3, 12):  # 3.12+ allows one profiler at a time: the worker runs unprofiled
+        assert "busy_work" in get_request_profile(profile.id)
+
+
+def test_sample_stacks_sees_other_threads():
+    stop = threading.Event()
+    t = threading.Thread(target=stop.wait, name="idle-worker")
+    t.start()
+    try:
+        counts = sample_stacks(0.05, interval_s=0.01)
+    finally:
+        stop.set()
+        t.join()
+    assert any(stack.startswith("idle-worker;") for stack in counts)
+    assert collapsed({"a;b": 2, "a;c": 3}) == "a;c 3\na;b 2\n"
+    assert top_frames({"a;b": 1, "x;b": 1, "a;c": 2}) == [
+        {"frame": "b", "samples": 2, "share": 0.5}, {"frame": "c", "samples": 2, "share": 0.5}]
+
+
+def test_one_sampler_at_a_time():
+    started = threading.Event()
+
+    def long_sample():
+        started.set()
+        sample_stacks(0.3, interval_s=0.05)
+
+    t = threading.Thread(target=long_sample)
+    t.start()
+    started.wait()
+    try:
+        with pytest.raises(ProfilerBusy):
+            for _ in range(50):  # until the other sampler holds the lock
+                sample_stacks(0.0)
+                time.sleep(0.005)
+    finally:
+        t.join()
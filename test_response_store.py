@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from app.services.response_store import DiskTier, MemoryTier, ResponseStore, cache_key
+
+DATA = {"organic": [{"title": "Amul Butter 500 g", "price": "₹250"}]}
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return DiskTier(str(tmp_path / "serper.sqlite"), compact_interval_s=3600)
+
+
+def test_equivalent_queries_share_a_key():
+    assert cache_key({"q": "Amul  Butter ", "num": 5}) == cache_key({"num": 5, "q": "amul butter"})
+    assert cache_key({"q": "amul butter", "num": 5}) != cache_key({"q": "amul butter", "num": 10})
+
+
+def test_memory_tier_is_an_expiring_lru():
+    memory = MemoryTier(max_entries=2)
+    far = time.time() + 60
+    memory.put("a", {"n": 1}, far)
+    memory.put("b", {"n": 2}, far)
+    memory.get("a")                      # "b" is now the least recently used
+    memory.put("c", {"n": 3}, far)
+    assert memory.get("b") is None and memory.get("a") == {"n": 1}
+    memory.put("d", {"n": 4}, time.time() - 1)
+    assert memory.get("d") is None
+
+
+def test_memory_hit_then_disk_hit_after_restart(disk):
+    store = ResponseStore(ttl_s=60, memory=MemoryTier(), disk=disk)
+    store.put({"q": "Amul Butter", "num": 5}, DATA)
+    assert store.get_memory({"q": "amul butter", "num": 5}) == DATA
+    disk.flush()
+
+    restarted = ResponseStore(ttl_s=60, memory=MemoryTier(), disk=disk)
+    assert restarted.get_memory({"q": "amul butter", "num": 5}) is None  # tier 1 is per process
+    assert restarted.get({"q": "amul butter", "num": 5}) == DATA
+    assert restarted.get({"q": "amul butter", "num": 5}) == DATA        # promoted to memory
+    assert restarted.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 0, "stored": 0}
+
+
+def test_misses_and_disabled_store(disk):
+    store = ResponseStore(ttl_s=60, memory=MemoryTier(), disk=disk)
+    assert store.get({"q": "ghee", "num": 5}) is None and store.stats["misses"] == 1
+    off = ResponseStore(ttl_s=0, memory=MemoryTier(), disk=disk)
+    off.put({"q": "ghee", "num": 5}, DATA)
+    assert off.get({"q": "ghee", "num": 5}) is None and off.stats["stored"] == 0
+
+
+def test_expired_disk_entries_are_not_served(disk):
+    disk.put(cache_key({"q": "ghee"}), "ghee", DATA, time.time() - 1)
+    disk.flush()
+    store = ResponseStore(ttl_s=60, memory=MemoryTier(), disk=disk)
+    assert store.get({"q": "ghee"}) is None
+
+
+def test_compaction_drops_only_expired_rows(disk):
+    now = time.time()
+    disk.put("old", "old", DATA, now - 1)
+    disk.put("new", "new", DATA, now + 60)
+    disk.flush()
+    assert disk.count() == 2
+    assert disk.compact() == 1
+    assert disk.count() == 1 and disk.get("new") is not None
+    assert (disk.stats["compactions"], disk.stats["expired_removed"]) == (1, 1)
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import serper
+from app.services.budget import Deadline, LatencyTracker
+from app.services.response_store import ResponseStore
+from app.services.serper import SerperBatcher
+
+
+class StubSerper(BaseHTTPRequestHandler):
+    """Echoes each query back as one organic result; `slow` queries sleep first"""
+    bodies = []
+    slow = {}          # query -> seconds, applied to the first request for it only
+    drop_last = False  # answer a batch with one result too few
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.bodies.append(body)
+        queries = body if isinstance(body, list) else [body]
+        for q in queries:
+            time.sleep(self.slow.pop(q["q"], 0))
+        results = [{"organic": [{"title": q["q"]}]} for q in queries]
+        if self.drop_last:
+            results = results[:-1]
+        data = json.dumps(results if isinstance(body, list) else results[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    StubSerper.bodies, StubSerper.slow, StubSerper.drop_last = [], {}, False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSerper)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/search"
+    server.shutdown()
+
+
+def batcher(url: str, window_s: float = 0.05) -> SerperBatcher:
+    return SerperBatcher(url=url, window_s=window_s, executor=ThreadPoolExecutor(4))
+
+
+def test_queries_in_one_window_go_out_as_one_request(stub):
+    b = batcher(stub)
+    futures = [b.submit({"q": f"q{i}", "num": 3}, "key", timeout=5) for i in range(3)]
+    results = [f.result(timeout=5)[0] for f in futures]
+    assert [r["organic"][0]["title"] for r in results] == ["q0", "q1", "q2"]
+    assert len(StubSerper.bodies) == 1 and len(StubSerper.bodies[0]) == 3
+    assert (b.batches_sent, b.queries_sent) == (1, 3)
+
+
+def test_identical_payloads_are_sent_once(stub):
+    b = batcher(stub)
+    same = [b.submit({"q": "amul", "num": 3}, "key", timeout=5) for _ in range(2)]
+    other = b.submit({"q": "ghee", "num": 3}, "key", timeout=5)
+    assert [f.result(timeout=5)[0]["organic"][0]["title"] for f in same] == ["amul", "amul"]
+    assert other.result(timeout=5)[0]["organic"][0]["title"] == "ghee"
+    assert [q["q"] for q in StubSerper.bodies[0]] == ["amul", "ghee"]
+
+
+def test_result_count_mismatch_fails_every_caller(stub):
+    StubSerper.drop_last = True
+    b = batcher(stub)
+    futures = [b.submit({"q": f"q{i}", "num": 3}, "key", timeout=5) for i in range(2)]
+    for f in futures:
+        with pytest.raises(ValueError, match="expected 2 results"):
+            f.result(timeout=5)
+
+
+def test_hedge_fires_after_p95(stub, monkeypatch):
+    monkeypatch.setenv("SERPER_API_KEY", "test-key")
+    monkeypatch.setattr(serper, "_batcher", batcher(stub, window_s=0.005))
+    monkeypatch.setattr(serper, "latency", LatencyTracker(default_p95=0.1))
+    monkeypatch.setattr(serper, "get_response_store", lambda: ResponseStore(ttl_s=0))
+    StubSerper.slow = {"amul butter": 2.0}  # first request hangs, the duplicate doesn't
+
+    started = time.monotonic()
+    data = serper.hedged_search("amul butter", "amazon", Deadline(5))
+    assert data["organic"][0]["title"] == "amul butter"
+    assert time.monotonic() - started < 1.5
+    assert len(StubSerper.bodies) == 2
@@ -0,0 +1,45 @@
+import asyncio
+
+from app.anomaly_detection.streaming import StreamingAnomalyDetector, iter_ndjson_rows
+
+
+async def _chunks(parts):
+    for part in parts:
+        yield part
+
+
+def rows(parts, max_line_bytes=64):
+    async def collect():
+        counters = {}
+        out = [r async for r in iter_ndjson_rows(_chunks(parts), counters, max_line_bytes=max_line_bytes)]
+        return out, counters["bad_rows"]
+    return asyncio.run(collect())
+
+
+def test_lines_split_across_chunks():
+    assert rows([b'{"a": 1}\n{"a"', b': 2}\n', b'{"a": 3}']) == ([{"a": 1}, {"a": 2}, {"a": 3}], 0)
+
+
+def test_bad_lines_are_counted():
+    assert rows([b'{"a": 1}\nnot json\n[1, 2]\n\n{"a": 2}\n']) == ([{"a": 1}, {"a": 2}], 2)
+
+
+def test_oversized_line_is_dropped_up_to_its_newline():
+    # the rest of the long line happens to be valid JSON; it must not come back as a row
+    parts = [b'{"a": 1}\n', b"x" * 80, b"x" * 20, b'{"a": 9}\n{"a": 2}\n']
+    assert rows(parts) == ([{"a": 1}, {"a": 2}], 1)
+
+
+def test_oversized_last_line_without_newline():
+    assert rows([b'{"a": 1}\n', b"y" * 100, b"y" * 10]) == ([{"a": 1}], 1)
+
+
+def test_site_above_group_mean_is_flagged():
+    detector = StreamingAnomalyDetector(flush_on_key_change=True)
+    flagged = []
+    for site, price in [("a", 100), ("b", 100), ("c", 150), ("a", 100)]:
+        flagged += detector.add({"product": "Amul Butter", "variant": "500 g", "site": site, "price": price})
+    flagged += detector.add({"product": "Amul Cheese", "site": "a", "price": 90})
+    assert [a["site"] for a in flagged] == ["c"]
+    assert detector.finish() == []
+    assert detector.summary()["groups"] == 2
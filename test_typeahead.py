@@ -0,0 +1,45 @@
+from app.services.typeahead import TypeaheadIndex, build_catalog_index
+
+
+def index() -> TypeaheadIndex:
+    return build_catalog_index({
+        "dairy": ["Amul Butter 500g", "Amul Cheese Slices", "Mother Dairy Milk 1L"],
+        "snacks": ["Amul Dark Chocolate"],
+    })
+
+
+def names(results):
+    return [r["name"] for r in results]
+
+
+def test_every_typed_word_prefixes_a_name_word():
+    assert names(index().suggest("amu but")) == ["Amul Butter 500g"]
+    assert names(index().suggest("dairy mi")) == ["Mother Dairy Milk 1L"]
+    assert index().suggest("  ") == []
+
+
+def test_typos_fall_back_to_trigrams():
+    assert names(index().suggest("amul buter"))[0] == "Amul Butter 500g"
+
+
+def test_searches_raise_the_ranking():
+    idx = index()
+    assert names(idx.suggest("amul", limit=1)) == ["Amul Butter 500g"]  # ties: shortest first
+    idx.record("amul dark chocolate")
+    assert names(idx.suggest("amul", limit=1)) == ["Amul Dark Chocolate"]
+
+
+def test_category_filter_keeps_uncategorized_searches():
+    idx = index()
+    idx.record("Amul Ghee 1L")
+    assert names(idx.suggest("amul", category="snacks")) == ["Amul Dark Chocolate", "Amul Ghee 1L"]
+
+
+def test_least_popular_entry_is_evicted_when_full():
+    idx = TypeaheadIndex(max_entries=2)
+    idx.add("Amul Butter", weight=5)
+    idx.add("Amul Cheese", weight=1)
+    idx.add("Amul Ghee", weight=2)
+    assert len(idx) == 2
+    assert names(idx.suggest("amul")) == ["Amul Butter", "Amul Ghee"]
+    assert idx.suggest("cheese") == []
@@ -0,0 +1,29 @@
+from app.services.matching import group_titles
+from app.services.units import Quantity, parse_quantity
+
+
+def test_small_gram_sizes_are_sizes():
+    assert parse_quantity("Catch Saffron 2g") == Quantity(2.0, "g")
+    assert parse_quantity("Yeast 5g sachet") == Quantity(5.0, "g")
+    assert parse_quantity("Saffron 1g") == Quantity(1.0, "g")
+
+
+def test_network_generation_in_phone_titles():
+    assert parse_quantity("Samsung Galaxy S23 5G 128GB") is None
+    assert parse_quantity("Redmi Note 13 5G (8GB RAM)") is None
+    assert parse_quantity("Lava Agni 5G") is None
+
+
+def test_network_token_beside_another_size():
+    assert parse_quantity("Amul Butter 100g 5g") == Quantity(100.0, "g")
+
+
+def test_multipacks():
+    assert parse_quantity("2 x 500 g amul butter") == Quantity(1000.0, "g", 2)
+    assert parse_quantity("Amul Butter 100g (Pack of 3)") == Quantity(300.0, "g", 3)
+    assert parse_quantity("Fortune Oil 1 L x 2") == Quantity(2000.0, "ml", 2)
+    assert parse_quantity("Eggs 1 dozen") == Quantity(12.0, "pcs")
+
+
+def test_small_sizes_group_separately():
+    assert group_titles(["Saffron 2g", "Saffron 5g", "Saffron 1g"]) == [[0], [1], [2]]